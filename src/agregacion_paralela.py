@@ -0,0 +1,179 @@
+import os
+import weakref
+from multiprocessing import shared_memory
+
+from pool_procesos import obtener_pool
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+# Por debajo de este número de filas el groupby de pandas es más rápido que repartir el trabajo
+UMBRAL_FILAS = 2_000_000
+
+def _sumar(codigos, valores, filtro, permitidos, grupos, tramos):
+    """
+    Sumas y número de filas por código de grupo de las filas de los tramos [inicio, fin); con permitidos,
+    solo las filas cuyo código de filtro (categoría) está permitido
+    """
+    sumas, cuentas = np.zeros(grupos), np.zeros(grupos, dtype=np.int64)
+    for inicio, fin in tramos:
+        bloque, pesos = codigos[inicio:fin], valores[inicio:fin]
+        if permitidos is not None:
+            seleccion = permitidos[filtro[inicio:fin]]
+            bloque, pesos = bloque[seleccion], pesos[seleccion]
+        # groupby solo devuelve los grupos que aparecen: por eso también se cuentan las filas
+        sumas += np.bincount(bloque, weights=pesos, minlength=grupos)
+        cuentas += np.bincount(bloque, minlength=grupos)
+    return sumas, cuentas
+
+def _sumar_particion(nombre_codigos, nombre_valores, nombre_filtro, filas, grupos, tramos, permitidos):
+    """
+    Se ejecuta en un proceso trabajador: lee los arrays de la tabla desde memoria compartida (sin copiarlos)
+    y suma sus tramos de filas
+    """
+    memorias = [shared_memory.SharedMemory(name=nombre) for nombre in (nombre_codigos, nombre_valores, nombre_filtro)]
+    try:
+        codigos = np.ndarray((filas,), dtype=np.int32, buffer=memorias[0].buf)
+        valores = np.ndarray((filas,), dtype=np.float64, buffer=memorias[1].buf)
+        filtro = np.ndarray((filas,), dtype=np.int32, buffer=memorias[2].buf)
+        parcial = _sumar(codigos, valores, filtro, permitidos, grupos, tramos)
+        del codigos, valores, filtro
+        return parcial
+    finally:
+        for memoria in memorias:
+            memoria.close()
+
+def _repartir(tramos, partes):
+    """
+    Divide los tramos de filas en partes con casi el mismo número de filas (cada parte, una lista de tramos)
+    """
+    total = sum(fin - inicio for inicio, fin in tramos)
+    cortes = np.linspace(0, total, partes + 1, dtype=np.int64)
+    piezas = [[] for _ in range(partes)]
+    desplazamiento = 0
+    for inicio, fin in tramos:
+        for j in range(partes):
+            desde = max(int(cortes[j]), desplazamiento)
+            hasta = min(int(cortes[j + 1]), desplazamiento + fin - inicio)
+            if hasta > desde:
+                piezas[j].append((inicio + desde - desplazamiento, inicio + hasta - desplazamiento))
+        desplazamiento += fin - inicio
+    return [pieza for pieza in piezas if pieza]
+
+def _compartir(array):
+    memoria = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=memoria.buf)[:] = array
+    return memoria
+
+def _liberar(memorias):
+    for memoria in memorias:
+        memoria.close()
+        memoria.unlink()
+
+class TablaCompartida:
+    """
+    Códigos de las columnas de grupo e importes de un ledger copiados una sola vez a memoria compartida,
+    ordenados por particion (p. ej. type) y dentro de cada una por fecha: un tramo contiguo de filas es un
+    rango de fechas, así que el filtro de fechas son dos búsquedas binarias y los procesos solo reciben los
+    límites de sus tramos. Los códigos van desplazados (0 = nulo). La memoria se libera al recolectar la
+    tabla o con cerrar()
+    """
+    def __init__(self, df, columnas=("category", "description"), valor="amount", fecha="date", particion=None):
+        self.filas = len(df)
+        self.valor = valor
+        fechas = df[fecha].to_numpy(dtype='datetime64[ns]').view(np.int64) if fecha in df.columns \
+            else np.zeros(self.filas, dtype=np.int64)
+        if particion is not None:
+            particiones = pd.Categorical(df[particion])
+            orden = np.lexsort((fechas, particiones.codes))
+            limites = np.searchsorted(particiones.codes[orden], np.arange(len(particiones.categories) + 1))
+            self.particiones = {valor_particion: (int(limites[i]), int(limites[i + 1]))
+                                for i, valor_particion in enumerate(particiones.categories)}
+        else:
+            orden = np.argsort(fechas, kind='stable')
+            self.particiones = {None: (0, self.filas)}
+        self.fechas = fechas[orden]
+
+        self.grupos, self._memorias = {}, {}
+        valores = np.nan_to_num(df[valor].to_numpy(dtype=np.float64)[orden])
+        self._memorias[valor] = _compartir(valores)
+        for columna in columnas:
+            if columna not in df.columns:
+                continue
+            categorias = df[columna].array if isinstance(df[columna].dtype, pd.CategoricalDtype) \
+                else pd.Categorical(df[columna])
+            self.grupos[columna] = categorias.categories
+            self._memorias[columna] = _compartir((categorias.codes[orden] + 1).astype(np.int32))
+        self._finalizador = weakref.finalize(self, _liberar, list(self._memorias.values()))
+
+    def _tramos(self, particiones, inicio, fin):
+        # Tramos de filas de las particiones pedidas con fecha en [inicio, fin) (los NaT, al principio, se saltan)
+        if inicio is None and fin is not None:
+            inicio = np.iinfo(np.int64).min + 1
+        tramos = []
+        for clave in (self.particiones if particiones is None else particiones):
+            if clave not in self.particiones:
+                continue
+            desde, hasta = self.particiones[clave]
+            fechas = self.fechas[desde:hasta]
+            if fin is not None:
+                hasta = desde + int(np.searchsorted(fechas, fin))
+            if inicio is not None:
+                desde += int(np.searchsorted(fechas, inicio))
+            if hasta > desde:
+                tramos.append((desde, hasta))
+        return tramos
+
+    def sumar(self, columna, particiones=None, categorias=None, inicio=None, fin=None, procesos=None,
+              umbral=UMBRAL_FILAS):
+        """
+        groupby(columna)[valor].sum() de las filas de unas particiones y categorías (None: todas) con fecha
+        entre inicio y fin incluidos (None: sin límite), repartiendo las filas entre procesos
+        """
+        inicio = None if inicio is None else pd.Timestamp(inicio).value
+        fin = None if fin is None else (pd.Timestamp(fin) + pd.Timedelta(days=1)).value
+        tramos = self._tramos(particiones, inicio, fin)
+        grupos = self.grupos[columna]
+        permitidos = None
+        if categorias is not None:
+            permitidos = np.zeros(len(self.grupos['category']) + 1, dtype=bool)
+            permitidos[self.grupos['category'].get_indexer(list(categorias)) + 1] = True
+            permitidos[0] = False
+
+        filas = sum(fin - inicio for inicio, fin in tramos)
+        procesos = procesos or os.cpu_count() or 1
+        nombres = (self._memorias[columna].name, self._memorias[self.valor].name,
+                   self._memorias.get('category', self._memorias[columna]).name)
+        if filas < umbral or procesos == 1:
+            parciales = [_sumar_particion(*nombres, self.filas, len(grupos) + 1, tramos, permitidos)]
+        else:
+            pool = obtener_pool()
+            futuros = [pool.submit(_sumar_particion, *nombres, self.filas, len(grupos) + 1, pieza, permitidos)
+                       for pieza in _repartir(tramos, procesos)]
+            parciales = [futuro.result() for futuro in futuros]
+        sumas = sum(suma for suma, _ in parciales)
+        cuentas = sum(cuenta for _, cuenta in parciales)
+
+        # El código 0 son los valores nulos, que groupby descarta
+        resultado = pd.Series(sumas[1:], index=pd.Index(grupos, name=columna), name=self.valor)
+        return resultado[cuentas[1:] > 0]
+
+    def cerrar(self):
+        self._finalizador()
+
+def sumar_por_grupo(df, columna, valor="amount", procesos=None, umbral=UMBRAL_FILAS):
+    """
+    Equivale a df.groupby(columna)[valor].sum() para una tabla suelta; con tablas muy grandes y columnas
+    categóricas la copia a memoria compartida y reparte las filas entre procesos. El ledger de la sesión
+    tiene su propia TablaCompartida (LibroMayor.sumar_por_grupo), que se copia una sola vez
+    """
+    procesos = procesos or os.cpu_count() or 1
+    # Con columnas de texto, factorizar las cadenas (un solo hilo) cuesta casi lo mismo que el groupby entero
+    if len(df) < umbral or procesos == 1 or not isinstance(df[columna].dtype, pd.CategoricalDtype):
+        return df.groupby(columna, observed=True)[valor].sum()
+    tabla = TablaCompartida(df, (columna,), valor, fecha=None)
+    try:
+        return tabla.sumar(columna, procesos=procesos, umbral=0)
+    finally:
+        tabla.cerrar()
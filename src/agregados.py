@@ -0,0 +1,25 @@
+import calendar
+from datetime import datetime
+from carga_perezosa import importar_perezoso
+from divisas import en_moneda_base
+
+pd = importar_perezoso("pandas")
+
+def calculate_monthly_totals(data):
+    """
+    Suma los importes (en la moneda base) por año y mes (con el nombre del mes para las gráficas)
+    """
+    if not data:
+        return pd.DataFrame()
+    
+    df = en_moneda_base(pd.DataFrame(data))
+    if 'date' not in df.columns:
+        df['date'] = datetime.now().strftime("%Y-%m-%d")
+    
+    df['date'] = pd.to_datetime(df['date'])
+    df['month'] = df['date'].dt.month
+    df['year'] = df['date'].dt.year
+    
+    monthly_totals = df.groupby(['year', 'month'])['amount'].sum().reset_index()
+    monthly_totals['month_name'] = monthly_totals['month'].apply(lambda x: calendar.month_name[x])
+    return monthly_totals
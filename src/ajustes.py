@@ -0,0 +1,56 @@
+import os
+import yaml
+from yaml.loader import SafeLoader
+
+# Ruta del archivo de ajustes de la aplicación (opcional)
+AJUSTES_PATH = os.path.join('config', 'ajustes.yaml')
+
+# Valores por defecto si el archivo no existe o no define la clave
+AJUSTES_POR_DEFECTO = {
+    'motor_graficos': 'matplotlib',
+    # Tiempos por ejecución del script: panel para los usuarios indicados e histograma por página
+    'perfilado': False,
+    'perfilado_ruta': os.path.join('logs', 'latencias.json'),
+    'perfilado_usuarios': ['admin'],
+    # Métricas en formato Prometheus: servidor HTTP local (/metrics) y/o volcado a un archivo
+    'metricas': False,
+    'metricas_direccion': '127.0.0.1',
+    'metricas_puerto': 9464,
+    'metricas_ruta': None,
+    # URL del servicio de datos (servicio_datos.py); sin valor, la app lee y escribe los CSV directamente
+    'servicio_datos_url': None,
+    # Filas por página en las tablas de la app (solo se envía al navegador la página visible)
+    'filas_por_pagina': 50,
+    # Moneda (USD, EUR, GBP...) y locale de los importes (separadores); sin locale, "$1234.56" como siempre
+    'moneda': 'USD',
+    'locale': None,
+    # Tipos de cambio a la moneda base (CSV date,currency,rate) para las transacciones en otras monedas
+    'tipos_cambio_ruta': os.path.join('config', 'tipos_cambio.csv'),
+    # Meses proyectados (flujo de caja y fechas previstas de las metas) y modelo: auto, media_movil, lineal o estacional
+    'proyeccion_meses': 12,
+    'proyeccion_modelo': 'auto',
+    # Caminos Monte Carlo por meta (probabilidad de cumplir cada meta a tiempo) y procesos que se reparten los caminos
+    'simulacion_caminos': 10_000,
+    'simulacion_procesos': 1,
+    # Gastos sospechosos: desviaciones típicas sobre la media de su categoría y gastos previos necesarios para juzgar
+    'anomalias_umbral_z': 3.0,
+    'anomalias_minimo': 10,
+}
+
+_cache = {"clave": None, "ajustes": None}
+
+def cargar_ajustes():
+    """
+    Carga los ajustes de la aplicación combinando el archivo YAML con los valores por defecto;
+    el archivo se vuelve a leer solo si cambia
+    """
+    fecha = os.path.getmtime(AJUSTES_PATH) if os.path.exists(AJUSTES_PATH) else None
+    clave = (os.path.abspath(AJUSTES_PATH), fecha)
+    if _cache["clave"] != clave:
+        ajustes = dict(AJUSTES_POR_DEFECTO)
+        if fecha is not None:
+            with open(AJUSTES_PATH, 'r') as file:
+                ajustes.update(yaml.load(file, Loader=SafeLoader) or {})
+        _cache["clave"], _cache["ajustes"] = clave, ajustes
+    # Copia: quien modifique sus ajustes no cambia los de los demás
+    return dict(_cache["ajustes"])
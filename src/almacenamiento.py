@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from carga_perezosa import importar_perezoso
+from metricas import REGISTRO, CUBOS_TAMANO
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+DURACION_CSV = REGISTRO.histograma(
+    "finansmart_csv_seconds", "Tiempo de lectura/escritura de los CSV de usuario", ("operacion", "archivo"))
+BYTES_CSV = REGISTRO.contador(
+    "finansmart_csv_bytes_total", "Bytes leídos/escritos en los CSV de usuario", ("operacion", "archivo"))
+FILAS_CSV = REGISTRO.histograma(
+    "finansmart_csv_rows", "Filas por CSV de usuario leído/escrito", ("operacion", "archivo"), cubos=CUBOS_TAMANO)
+
+# Columnas de texto con pocos valores distintos que se repiten en cada fila: se guardan como categóricas
+# (un vocabulario compartido y un código entero por fila)
+COLUMNAS_CATEGORICAS = ("category", "description", "type", "merchant", "currency")
+
+def _archivo(file_path):
+    # incomes / expenses / goals: etiqueta de baja cardinalidad (sin el nombre de usuario)
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def _compartir_cadenas(df):
+    # Cada fila apunta al mismo objeto str de su categoría (pandas crearía una cadena nueva por fila al pasar a dict)
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns:
+            codigos = df[columna].cat.codes.to_numpy()
+            valores = np.asarray(df[columna].cat.categories, dtype=object).take(codigos)
+            valores[codigos < 0] = np.nan
+            df[columna] = pd.Series(valores, index=df.index, dtype=object)
+    return df
+
+def cargar_registros(file_path):
+    """
+    Carga un CSV de datos de usuario como lista de diccionarios (lista vacía si no existe o está vacío)
+    """
+    tamano = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    if tamano == 0:
+        return []
+
+    etiquetas = {"operacion": "load", "archivo": _archivo(file_path)}
+    with DURACION_CSV.medir(**etiquetas):
+        try:
+            # Las columnas de texto repetitivas se leen como categóricas: cada valor distinto se crea una sola vez
+            df = pd.read_csv(file_path, dtype=dict.fromkeys(COLUMNAS_CATEGORICAS, "category"))
+            registros = _compartir_cadenas(df).to_dict('records')
+        except pd.errors.EmptyDataError:
+            registros = []
+    BYTES_CSV.inc(tamano, **etiquetas)
+    FILAS_CSV.observe(len(registros), **etiquetas)
+    return registros
+
+def cargar_varios(rutas):
+    """
+    Carga varios CSV a la vez (uno por hilo) y devuelve {clave: registros} con las mismas claves que rutas
+    """
+    if len(rutas) <= 1:
+        return {clave: cargar_registros(ruta) for clave, ruta in rutas.items()}
+    # El parser de pandas libera el GIL durante la lectura: el tiempo total es el del archivo más lento
+    with ThreadPoolExecutor(max_workers=len(rutas), thread_name_prefix="carga") as pool:
+        futuros = {clave: pool.submit(cargar_registros, ruta) for clave, ruta in rutas.items()}
+        return {clave: futuro.result() for clave, futuro in futuros.items()}
+
+def a_dataframe(registros):
+    """
+    DataFrame de una lista de registros con las columnas de COLUMNAS_CATEGORICAS como categóricas:
+    isin, == y groupby sobre ellas comparan códigos enteros en lugar de cadenas
+    """
+    df = pd.DataFrame(registros)
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns:
+            df[columna] = df[columna].astype("category")
+    return df
+
+def concatenar(tablas):
+    """
+    pd.concat que conserva las columnas categóricas: une antes los vocabularios de cada columna
+    (concat de categóricas con categorías distintas las convierte en texto)
+    """
+    tablas = [tabla for tabla in tablas if not tabla.empty]
+    if len(tablas) <= 1:
+        return tablas[0] if tablas else pd.DataFrame()
+    tablas = [tabla.copy(deep=False) for tabla in tablas]
+    for columna in COLUMNAS_CATEGORICAS:
+        tipos = [tabla[columna].dtype for tabla in tablas if columna in tabla]
+        # Con el mismo vocabulario en todas (p. ej. type) concat ya conserva la categórica y su orden
+        if all(isinstance(tipo, pd.CategoricalDtype) for tipo in tipos) and any(tipo != tipos[0] for tipo in tipos):
+            categorias = pd.Index([]).append(
+                [tabla[columna].cat.categories for tabla in tablas if columna in tabla]).unique().sort_values()
+            for tabla in tablas:
+                if columna in tabla:
+                    tabla[columna] = tabla[columna].cat.set_categories(categorias)
+    return pd.concat(tablas)
+
+def guardar_registros(data, file_path):
+    """
+    Guarda los datos en un archivo CSV, creando el directorio si no existe
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    etiquetas = {"operacion": "save", "archivo": _archivo(file_path)}
+    with DURACION_CSV.medir(**etiquetas):
+        pd.DataFrame(data).to_csv(file_path, index=False)
+    BYTES_CSV.inc(os.path.getsize(file_path), **etiquetas)
+    FILAS_CSV.observe(len(data), **etiquetas)
@@ -0,0 +1,207 @@
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+class Welford:
+    """
+    Media y varianza acumuladas (algoritmo de Welford): O(1) por valor y numéricamente estable
+    """
+    __slots__ = ("n", "media", "m2")
+
+    def __init__(self, n=0, media=0.0, m2=0.0):
+        self.n, self.media, self.m2 = n, media, m2
+
+    def añadir(self, valor):
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+
+    @property
+    def desviacion(self):
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+    def z(self, valor):
+        desviacion = self.desviacion
+        return (valor - self.media) / desviacion if desviacion > 0 else 0.0
+
+class P2:
+    """
+    Estimación de un cuantil con el algoritmo P² (Jain y Chlamtac, 1985): cinco marcadores cuyas alturas
+    se ajustan con interpolación parabólica; memoria y tiempo constantes por valor, sin guardar la serie
+    """
+    __slots__ = ("p", "alturas", "posiciones", "deseadas", "incrementos")
+
+    def __init__(self, p):
+        self.p = p
+        self.alturas = []
+        self.posiciones = [0, 1, 2, 3, 4]
+        self.deseadas = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.incrementos = [0, p / 2, p, (1 + p) / 2, 1]
+
+    @classmethod
+    def desde_ordenados(cls, p, valores):
+        """
+        Estado de P² tras ver unos valores ya ordenados: los marcadores se colocan en sus posiciones ideales
+        (lo que P² persigue), sin recorrer los valores uno a uno
+        """
+        estimador = cls(p)
+        if len(valores) < 5:
+            for valor in valores:
+                estimador.añadir(float(valor))
+            return estimador
+        deseadas = [(len(valores) - 1) * incremento for incremento in estimador.incrementos]
+        estimador.posiciones = [int(round(posicion)) for posicion in deseadas]
+        estimador.alturas = [float(valores[posicion]) for posicion in estimador.posiciones]
+        estimador.deseadas = deseadas
+        return estimador
+
+    def _parabolica(self, i, d):
+        q, n = self.alturas, self.posiciones
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def añadir(self, valor):
+        q, n = self.alturas, self.posiciones
+        if len(q) < 5:
+            q.append(valor)
+            q.sort()
+            return
+        if valor < q[0]:
+            q[0], k = valor, 0
+        elif valor >= q[4]:
+            q[4], k = valor, 3
+        else:
+            k = next(i for i in range(4) if q[i] <= valor < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.deseadas[i] += self.incrementos[i]
+        # Los tres marcadores centrales se mueven una posición si se han alejado de la deseada
+        for i in (1, 2, 3):
+            d = self.deseadas[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                altura = self._parabolica(i, d)
+                if not q[i - 1] < altura < q[i + 1]:
+                    altura = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = altura
+                n[i] += d
+
+    def valor(self):
+        if not self.alturas:
+            return float('nan')
+        if len(self.alturas) < 5:
+            return float(np.quantile(self.alturas, self.p))
+        return self.alturas[2]
+
+class Estadisticas:
+    """
+    Estadísticas acumuladas de una categoría: media y varianza (Welford) y cuartiles (P²)
+    """
+    __slots__ = ("momentos", "q1", "q3")
+
+    def __init__(self):
+        self.momentos = Welford()
+        self.q1, self.q3 = P2(0.25), P2(0.75)
+
+    def añadir(self, valor):
+        self.momentos.añadir(valor)
+        self.q1.añadir(valor)
+        self.q3.añadir(valor)
+
+    def valla(self, factor):
+        """
+        Límite superior de Tukey: tercer cuartil más factor veces el rango intercuartílico
+        """
+        q1, q3 = self.q1.valor(), self.q3.valor()
+        return q3 + factor * (q3 - q1)
+
+class DetectorAnomalias:
+    """
+    Gastos inusualmente altos para su categoría: a la vez por encima de umbral_z desviaciones típicas
+    de la media y de la valla de Tukey (Q3 + factor_iqr * IQR), con al menos minimo gastos previos.
+    Cada gasto nuevo se evalúa y se acumula en O(1); los marcados quedan en sospechosas
+    """
+    def __init__(self, umbral_z=3.0, minimo=10, factor_iqr=3.0):
+        self.umbral_z = umbral_z
+        self.minimo = minimo
+        self.factor_iqr = factor_iqr
+        self.categorias = {}
+        self.sospechosas = []
+
+    def suficientes(self, previos):
+        """
+        Si una categoría tiene bastantes gastos previos para juzgar uno nuevo (vale con arrays): el mismo
+        umbral al insertar y al construir desde un ledger
+        """
+        return previos >= self.minimo
+
+    def evaluar(self, transaccion):
+        """
+        Puntuación z del gasto si es anómalo para su categoría (sin acumularlo); None si no lo es
+        """
+        estadisticas = self.categorias.get(transaccion.get("category"))
+        if estadisticas is None or not self.suficientes(estadisticas.momentos.n):
+            return None
+        importe = float(transaccion["amount"])
+        z = estadisticas.momentos.z(importe)
+        if z > self.umbral_z and importe > estadisticas.valla(self.factor_iqr):
+            return z
+        return None
+
+    def añadir(self, transaccion):
+        """
+        Evalúa el gasto con lo visto hasta ahora y lo acumula; devuelve su puntuación z si es anómalo
+        """
+        z = self.evaluar(transaccion)
+        if z is not None:
+            self.sospechosas.append(dict(transaccion, z_score=z))
+        self.categorias.setdefault(transaccion.get("category"), Estadisticas()).añadir(float(transaccion["amount"]))
+        return z
+
+    @classmethod
+    def desde_registros(cls, registros, **umbrales):
+        """
+        Detector de un ledger de gastos completo: un único orden por (categoría, importe) da los momentos,
+        los cuartiles y los gastos ya sospechosos de todas las categorías (juzgados con toda su historia)
+        """
+        detector = cls(**umbrales)
+        df = pd.DataFrame(registros)
+        if df.empty or not {'amount', 'category'} <= set(df.columns):
+            return detector
+        df = df[df['amount'].notna() & df['category'].notna()]
+        importes = df['amount'].to_numpy(dtype=np.float64)
+        codigos, categorias = pd.factorize(df['category'], sort=False)
+        orden = np.lexsort((importes, codigos))
+        ordenados, codigos_ordenados = importes[orden], codigos[orden]
+        cortes = np.searchsorted(codigos_ordenados, np.arange(len(categorias) + 1))
+
+        cuentas = np.bincount(codigos, minlength=len(categorias))
+        medias = np.bincount(codigos, weights=importes, minlength=len(categorias)) / cuentas
+        m2 = np.bincount(codigos, weights=(importes - medias[codigos]) ** 2, minlength=len(categorias))
+        for i, categoria in enumerate(categorias):
+            estadisticas = Estadisticas()
+            estadisticas.momentos = Welford(int(cuentas[i]), float(medias[i]), float(m2[i]))
+            valores = ordenados[cortes[i]:cortes[i + 1]]
+            estadisticas.q1, estadisticas.q3 = P2.desde_ordenados(0.25, valores), P2.desde_ordenados(0.75, valores)
+            detector.categorias[categoria] = estadisticas
+
+        # Gastos ya registrados que serían anómalos: las mismas reglas, vectorizadas por fila
+        desviaciones = np.sqrt(m2 / np.maximum(cuentas - 1, 1))
+        vallas = np.array([detector.categorias[categoria].valla(detector.factor_iqr) for categoria in categorias])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(desviaciones[codigos] > 0, (importes - medias[codigos]) / desviaciones[codigos], 0.0)
+        # Los gastos previos de cada fila son los demás de su categoría
+        marcadas = detector.suficientes(cuentas[codigos] - 1) & (z > detector.umbral_z) & (importes > vallas[codigos])
+        detector.sospechosas = df[marcadas].assign(z_score=z[marcadas]).to_dict('records')
+        return detector
+
+    def tabla(self):
+        """
+        Gastos sospechosos (los más anómalos primero)
+        """
+        return pd.DataFrame(self.sospechosas).sort_values('z_score', ascending=False, ignore_index=True) \
+            if self.sospechosas else pd.DataFrame()
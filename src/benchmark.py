@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+def pico_rss_mb():
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    factor = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * factor / 2**20
+
+def _finance(filas):
+    from datos_sinteticos import generar_ledger, generar_metas
+    from main import Finance
+    finance = Finance(autoload=False)
+    finance.incomes, finance.expenses = generar_ledger(filas)
+    finance.goals = generar_metas(20)
+    return finance
+
+# Cada caso prepara sus datos (fuera de la medición) y devuelve la función a medir
+
+def caso_finance_load_data(filas, usuarios, args):
+    from main import Finance
+    _finance(filas).save_data()
+    return lambda: Finance()
+
+def caso_finance_save_data(filas, usuarios, args):
+    return _finance(filas).save_data
+
+def caso_calculate_balance(filas, usuarios, args):
+    return _finance(filas).calculate_balance
+
+def caso_generate_recommendations(filas, usuarios, args):
+    return _finance(filas).generate_recommendations
+
+def caso_track_goals_progress(filas, usuarios, args):
+    return _finance(filas).track_goals_progress
+
+def caso_generate_monthly_report(filas, usuarios, args):
+    finance = _finance(filas)
+    return lambda: finance.generate_monthly_report(month="2025-12")
+
+def caso_streamlit_load_data(filas, usuarios, args):
+    from almacenamiento import cargar_registros
+    from datos_sinteticos import generar_dataframe
+    generar_dataframe(filas).to_csv("expenses.csv", index=False)
+    return lambda: cargar_registros("expenses.csv")
+
+def caso_calculate_monthly_totals(filas, usuarios, args):
+    from agregados import calculate_monthly_totals
+    from datos_sinteticos import generar_transacciones
+    datos = generar_transacciones(filas)
+    return lambda: calculate_monthly_totals(datos)
+
+def caso_users_load(filas, usuarios, args):
+    # Sesión inicial de muchos usuarios: cargar sus tres CSV y calcular el balance
+    from almacenamiento import cargar_registros
+    from datos_sinteticos import escribir_usuarios
+    from main import Finance
+    from usuarios import obtener_ruta_archivos_usuario
+    nombres = escribir_usuarios("data", usuarios, args.filas_por_usuario)
+
+    def cargar_todos():
+        for nombre in nombres:
+            rutas = obtener_ruta_archivos_usuario(nombre)
+            finance = Finance(autoload=False)
+            finance.incomes = cargar_registros(rutas['incomes'])
+            finance.expenses = cargar_registros(rutas['expenses'])
+            finance.goals = cargar_registros(rutas['goals'])
+            finance.calculate_balance()
+    return cargar_todos
+
+CASOS_FILAS = {
+    "finance_load_data": caso_finance_load_data,
+    "finance_save_data": caso_finance_save_data,
+    "calculate_balance": caso_calculate_balance,
+    "generate_recommendations": caso_generate_recommendations,
+    "track_goals_progress": caso_track_goals_progress,
+    "generate_monthly_report": caso_generate_monthly_report,
+    "streamlit_load_data": caso_streamlit_load_data,
+    "calculate_monthly_totals": caso_calculate_monthly_totals,
+}
+CASOS_USUARIOS = {
+    "users_load": caso_users_load,
+}
+
+def ejecutar_caso(nombre, filas, usuarios, args):
+    """
+    Ejecuta un caso en el proceso actual (dentro de un directorio temporal) y devuelve su resultado
+    """
+    casos = dict(CASOS_FILAS, **CASOS_USUARIOS)
+    with tempfile.TemporaryDirectory() as temporal:
+        os.chdir(temporal)
+        funcion = casos[nombre](filas, usuarios, args)
+        rss_preparacion = pico_rss_mb()
+        tiempos = []
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        os.chdir(DIRECTORIO)
+
+    filas_totales = filas if nombre in CASOS_FILAS else usuarios * args.filas_por_usuario
+    segundos = min(tiempos)
+    return {
+        "case": nombre,
+        "rows": filas_totales,
+        "users": usuarios,
+        "seconds": round(segundos, 6),
+        "rows_per_s": round(filas_totales / segundos, 1) if segundos > 0 else None,
+        "setup_rss_mb": round(rss_preparacion, 1),
+        "peak_rss_mb": round(pico_rss_mb(), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas críticas de FinanSmart (salida JSON)")
+    parser.add_argument("--casos", nargs="+", default=list(CASOS_FILAS) + list(CASOS_USUARIOS))
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Tamaños del ledger (hasta 10_000_000)")
+    parser.add_argument("--usuarios", type=int, nargs="+", default=[1, 10, 100],
+                        help="Número de usuarios para los casos multiusuario (hasta 10_000)")
+    parser.add_argument("--filas-por-usuario", type=int, default=100)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", default=None, help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--caso-interno", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso_interno:
+        # Proceso hijo: un único caso y tamaño, para que el pico de RSS sea el de ese caso
+        resultado = ejecutar_caso(args.caso_interno, args.filas[0], args.usuarios[0], args)
+        print(json.dumps(resultado))
+        return
+
+    resultados = []
+    for caso in args.casos:
+        tamanos = [(f, 1) for f in args.filas] if caso in CASOS_FILAS else [(0, u) for u in args.usuarios]
+        for filas, usuarios in tamanos:
+            comando = [sys.executable, os.path.abspath(__file__), "--caso-interno", caso,
+                       "--filas", str(filas), "--usuarios", str(usuarios),
+                       "--filas-por-usuario", str(args.filas_por_usuario),
+                       "--repeticiones", str(args.repeticiones)]
+            entorno = dict(os.environ, MPLBACKEND="Agg")
+            proceso = subprocess.run(comando, cwd=DIRECTORIO, env=entorno, capture_output=True, text=True)
+            if proceso.returncode != 0:
+                resultados.append({"case": caso, "rows": filas, "users": usuarios,
+                                   "error": proceso.stderr.strip().splitlines()[-1:]})
+                continue
+            resultados.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+            print(json.dumps(resultados[-1]), file=sys.stderr)
+
+    informe = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": resultados,
+    }
+    texto = json.dumps(informe, indent=2)
+    if args.salida:
+        with open(args.salida, "w") as file:
+            file.write(texto)
+    print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos pesados que no deben cargarse al arrancar
+MODULOS_PESADOS = ["pandas", "numpy", "matplotlib", "seaborn"]
+
+def importaciones_de_cabecera(ruta):
+    """
+    Devuelve el código de las importaciones de nivel superior de un script (lo que paga cada arranque)
+    """
+    with open(ruta, encoding="utf-8") as file:
+        arbol = ast.parse(file.read())
+    lineas = []
+    for nodo in arbol.body:
+        if isinstance(nodo, (ast.Import, ast.ImportFrom)):
+            lineas.append(ast.unparse(nodo))
+    return "\n".join(lineas)
+
+# Objetivos medidos: el menú del CLI y las importaciones de la app de Streamlit (página de login)
+OBJETIVOS = {
+    "cli": "import main",
+    "streamlit_login": importaciones_de_cabecera(os.path.join(DIRECTORIO, "streamlit_app.py")),
+}
+
+def medir_importacion(codigo):
+    """
+    Ejecuta el código en un intérprete nuevo con -X importtime y devuelve el tiempo propio por módulo (µs)
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=DIRECTORIO, capture_output=True, text=True, check=True
+    )
+    tiempos = {}
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, _, modulo = linea[len("import time:"):].split("|")
+        modulo = modulo.strip()
+        tiempos[modulo] = tiempos.get(modulo, 0) + int(propio)
+    return tiempos
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el tiempo de importación en frío del CLI y de la app de Streamlit")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Falla si algún objetivo supera este tiempo total de importación")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    informe = {}
+    correcto = True
+    for nombre, codigo in OBJETIVOS.items():
+        # Nos quedamos con la repetición más rápida para reducir el ruido del sistema
+        mejor = min((medir_importacion(codigo) for _ in range(args.repeticiones)), key=lambda t: sum(t.values()))
+        total_ms = sum(mejor.values()) / 1000
+        pesados = sorted({m.split(".")[0] for m in mejor if m.split(".")[0] in MODULOS_PESADOS})
+        informe[nombre] = {
+            "total_ms": round(total_ms, 1),
+            "heavy_modules_loaded": pesados,
+            "slowest_modules_ms": {
+                modulo: round(us / 1000, 1)
+                for modulo, us in sorted(mejor.items(), key=lambda item: item[1], reverse=True)[:args.top]
+            },
+        }
+        if pesados or (args.max_ms is not None and total_ms > args.max_ms):
+            correcto = False
+
+    informe["ok"] = correcto
+    print(json.dumps(informe, indent=2))
+    sys.exit(0 if correcto else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import json
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from categorizacion import Categorizador
+from taxonomia import TAXONOMIA_POR_DEFECTO
+
+CIUDADES = ["MADRID", "VALENCIA", "SEVILLA", "BILBAO", "ONLINE"]
+
+def generar_reglas(comercios_por_descripcion, semilla):
+    """
+    Reglas de palabra clave con comercios inventados para cada (categoría, descripción) de gastos, más
+    algunas regex
+    """
+    rng = np.random.default_rng(semilla)
+    letras = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    reglas, nombres = [], set()
+    for categoria, descripciones in TAXONOMIA_POR_DEFECTO["expense"].items():
+        for descripcion in descripciones:
+            comercios = []
+            while len(comercios) < comercios_por_descripcion:
+                nombre = "".join(rng.choice(letras, rng.integers(4, 10)))
+                if nombre not in nombres and nombre not in CIUDADES:
+                    nombres.add(nombre)
+                    comercios.append(nombre)
+            reglas.append({"type": "expense", "category": categoria, "description": descripcion, "keywords": comercios})
+    reglas.append({"type": "expense", "category": "Debt", "description": "Loan Payment", "regex": r"LOAN\s+\d{6}"})
+    reglas.append({"category": "Transportation", "description": "Parking Fees", "regex": r"PARKING\s+(ZONE|LOT)\s+\d+"})
+    return reglas
+
+def generar_extracto(filas, reglas, semilla):
+    """
+    Conceptos de un extracto bancario con referencias únicas (el peor caso para la memoria de textos):
+    la mayoría con un comercio, algunos de las regex y un 10% sin regla. Devuelve (df, categorías esperadas)
+    """
+    rng = np.random.default_rng(semilla + 1)
+    comercios = [(palabra, regla["category"]) for regla in reglas for palabra in regla.get("keywords", [])]
+    elegidos = rng.integers(0, len(comercios), filas)
+    tipo = rng.random(filas)
+    referencias = rng.integers(0, 10 ** 8, filas)
+    ciudades = rng.choice(CIUDADES, filas)
+    textos, esperadas = [], []
+    for i in range(filas):
+        if tipo[i] < 0.85:
+            comercio, categoria = comercios[elegidos[i]]
+            textos.append(f"CARD PAYMENT {referencias[i]:08d} {comercio} {ciudades[i]}")
+        elif tipo[i] < 0.9:
+            textos.append(f"DIRECT DEBIT LOAN {referencias[i] % 10 ** 6:06d}")
+            categoria = "Debt"
+        else:
+            textos.append(f"TRANSFER {referencias[i]:08d}")
+            categoria = "Other"
+        esperadas.append(categoria)
+    df = pd.DataFrame({"date": "2025-01-01", "amount": 10.0, "description": textos})
+    return df, np.array(esperadas, dtype=object)
+
+def ingenuo(reglas, texto):
+    # Sin combinar: cada regla por separado, en orden, con su propia búsqueda
+    for regla in reglas:
+        for palabra in regla.get("keywords", []):
+            if re.search(rf"(?<!\w){re.escape(palabra)}(?!\w)", texto, re.IGNORECASE):
+                return regla["category"]
+        if regla.get("regex") and re.search(regla["regex"], texto, re.IGNORECASE):
+            return regla["category"]
+    return "Other"
+
+def main():
+    parser = argparse.ArgumentParser(description="Categorización automática de un extracto: filas por minuto en un núcleo")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--comercios", type=int, default=20, help="Comercios (palabras clave) por descripción")
+    parser.add_argument("--bloque", type=int, default=100_000, help="Filas por bloque, como la importación por partes")
+    parser.add_argument("--muestra-ingenua", type=int, default=500)
+    parser.add_argument("--limite", type=float, default=1_000_000, help="Filas por minuto mínimas")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    reglas = generar_reglas(args.comercios, args.semilla)
+    df, esperadas = generar_extracto(args.filas, reglas, args.semilla)
+
+    inicio = time.perf_counter()
+    categorizador = Categorizador(reglas)
+    bloques = [categorizador.categorizar_df(df.iloc[i:i + args.bloque], "expense")
+               for i in range(0, len(df), args.bloque)]
+    segundos = time.perf_counter() - inicio
+    categorias = pd.concat(bloques)['category'].to_numpy(dtype=object)
+
+    # Fila a fila (la importación de la línea de comandos), con un categorizador nuevo (sin memoria)
+    filas = df.head(args.bloque).to_dict('records')
+    inicio = time.perf_counter()
+    fila_a_fila = Categorizador(reglas)
+    por_filas = [fila_a_fila.categorizar(fila, "expense")["category"] for fila in filas]
+    segundos_filas = time.perf_counter() - inicio
+
+    muestra = df['description'].head(args.muestra_ingenua).tolist()
+    inicio = time.perf_counter()
+    ingenuas = [ingenuo(reglas, texto) for texto in muestra]
+    segundos_ingenuo = (time.perf_counter() - inicio) / len(muestra) * args.filas
+
+    aciertos = bool((categorias == esperadas).all()) and por_filas == list(esperadas[:len(filas)]) \
+        and ingenuas == list(esperadas[:len(muestra)])
+    por_minuto = args.filas / segundos * 60
+    print(json.dumps({
+        "rows": args.filas,
+        "keyword_rules": sum(len(regla.get("keywords", [])) for regla in reglas),
+        "regex_rules": sum(1 for regla in reglas if regla.get("regex")),
+        "seconds": round(segundos, 3),
+        "rows_per_minute": int(por_minuto),
+        "row_by_row_rows_per_minute": int(len(filas) / segundos_filas * 60),
+        "naive_estimated_seconds": round(segundos_ingenuo, 1),
+        "all_correct": aciertos,
+        "limit_rows_per_minute": int(args.limite),
+    }, indent=2))
+    sys.exit(0 if aciertos and por_minuto >= args.limite else 1)
+
+if __name__ == "__main__":
+    main()
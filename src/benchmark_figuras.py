@@ -0,0 +1,105 @@
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+from io import BytesIO
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+
+from graficos import figura
+
+MESES = ["January", "February", "March", "April", "May", "June"]
+
+def rss_actual():
+    """
+    Memoria residente actual del proceso en bytes (Linux); en otros sistemas usa el pico de memoria
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        factor = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * factor
+
+def figuras_vivas():
+    """
+    Figuras de matplotlib que siguen en memoria tras una recolección: si un rerun deja una, la cuenta sube
+    """
+    gc.collect()
+    return sum(isinstance(objeto, Figure) for objeto in gc.get_objects())
+
+def dibujar(fig, ax, progreso):
+    # Reproduce los gráficos de un rerun del Dashboard y de la página de metas
+    ax.bar(MESES, [1000 + 10 * i for i in range(len(MESES))], alpha=0.6, label='Income', color='blue')
+    ax.bar(MESES, [800 + 5 * i for i in range(len(MESES))], alpha=0.6, label='Expenses', color='red')
+    ax.pie([progreso, 100 - progreso], colors=['green', '#f0f0f0'], startangle=90, counterclock=False,
+           radius=0.3, center=(2, 900))
+    ax.add_artist(Circle((2, 900), 0.2, fc='white'))
+    ax.legend()
+    ax.tick_params(axis='x', rotation=45)
+    fig.tight_layout()
+    # st.pyplot serializa la figura como PNG
+    fig.savefig(BytesIO(), format="png")
+
+def rerun_figura():
+    with figura(figsize=(10, 6)) as (fig, ax):
+        dibujar(fig, ax, 42)
+
+def rerun_pyplot():
+    # Patrón anterior: plt.subplots sin plt.close, la figura queda en el registro de pyplot
+    fig, ax = plt.subplots(figsize=(10, 6))
+    dibujar(fig, ax, 42)
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprueba que la memoria se mantiene plana al renderizar figuras en cada rerun")
+    parser.add_argument("--reruns", type=int, default=10_000)
+    parser.add_argument("--calentamiento", type=int, default=200)
+    parser.add_argument("--max-crecimiento-mb", type=float, default=20.0)
+    parser.add_argument("--modo", choices=["figura", "pyplot"], default="figura")
+    args = parser.parse_args()
+
+    rerun = rerun_figura if args.modo == "figura" else rerun_pyplot
+
+    # El calentamiento absorbe cachés de fuentes y del backend Agg, pero el asignador sigue creciendo un
+    # tiempo después: la referencia es la memoria a mitad de los reruns medidos (ya en la meseta) y el
+    # crecimiento se mide en la segunda mitad, donde una fuga de figuras seguiría sumando
+    for _ in range(args.calentamiento):
+        rerun()
+    figuras_inicio = figuras_vivas()
+
+    muestras = []
+    mitad = max(1, args.reruns // 2)
+    rss_mitad = None
+    for i in range(args.reruns):
+        rerun()
+        if i + 1 == mitad:
+            gc.collect()
+            rss_mitad = rss_actual()
+        if (i + 1) % max(1, args.reruns // 10) == 0:
+            gc.collect()
+            muestras.append({"rerun": i + 1, "rss_mb": round(rss_actual() / 2**20, 1)})
+
+    gc.collect()
+    crecimiento_mb = (rss_actual() - rss_mitad) / 2**20
+    figuras_abiertas = len(plt.get_fignums())
+    figuras_nuevas = figuras_vivas() - figuras_inicio
+    resultado = {
+        "mode": args.modo,
+        "reruns": args.reruns,
+        "rss_growth_second_half_mb": round(crecimiento_mb, 2),
+        "open_pyplot_figures": figuras_abiertas,
+        "leaked_figures": figuras_nuevas,
+        "samples": muestras,
+        "ok": crecimiento_mb <= args.max_crecimiento_mb and figuras_abiertas == 0 and figuras_nuevas == 0,
+    }
+    print(json.dumps(resultado, indent=2))
+    sys.exit(0 if resultado["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import timedelta
+
+from datos_sinteticos import generar_transacciones
+from libro_mayor import LibroMayor
+
+def filtrar_con_mascaras(df, inicio, fin, categoria, minimo, maximo, ordenar_por, ascendente):
+    # Lo que hacía la página View Tables: máscaras encadenadas sobre todas las filas y orden del resultado completo
+    filtrado = df.loc[(df['date'].dt.date >= inicio) & (df['date'].dt.date <= fin)]
+    if categoria is not None:
+        filtrado = filtrado[filtrado['category'] == categoria]
+    filtrado = filtrado[(filtrado['amount'] >= minimo) & (filtrado['amount'] <= maximo)]
+    return filtrado.sort_values(by=ordenar_por, ascending=ascendente)
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtros de View Tables: máscaras de pandas frente al índice")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--consultas", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    libro = LibroMayor([], generar_transacciones(args.filas, "expense", args.semilla))
+    inicio_construccion = time.perf_counter()
+    indice = libro.indice_filtros("Expense")
+    construccion = time.perf_counter() - inicio_construccion
+    df = indice.df
+
+    aleatorio = random.Random(args.semilla)
+    primera, ultima = (fecha.date() for fecha in indice.fechas_extremas())
+    segundos_mascaras = segundos_indice = 0.0
+    discrepancias = 0
+    for _ in range(args.consultas):
+        inicio = primera + timedelta(days=aleatorio.randint(0, (ultima - primera).days))
+        fin = min(ultima, inicio + timedelta(days=aleatorio.choice([0, 7, 31, 365])))
+        consulta = (inicio, fin, aleatorio.choice([None] + indice.categorias()),
+                    aleatorio.choice([0.0, 100.0]), aleatorio.choice([500.0, 1e9]),
+                    aleatorio.choice(["date", "amount", "category"]), aleatorio.random() < 0.5)
+
+        inicio_consulta = time.perf_counter()
+        esperado = filtrar_con_mascaras(df, *consulta)
+        segundos_mascaras += time.perf_counter() - inicio_consulta
+        inicio_consulta = time.perf_counter()
+        obtenido = indice.filtrar(*consulta)
+        segundos_indice += time.perf_counter() - inicio_consulta
+
+        ordenar_por = consulta[5]
+        if sorted(esperado.index) != sorted(obtenido.index) or \
+                esperado[ordenar_por].tolist() != obtenido[ordenar_por].tolist():
+            discrepancias += 1
+
+    print(json.dumps({
+        "rows": args.filas,
+        "queries": args.consultas,
+        "index_build_seconds": round(construccion, 4),
+        "masks_ms_per_query": round(segundos_mascaras / args.consultas * 1000, 3),
+        "index_ms_per_query": round(segundos_indice / args.consultas * 1000, 3),
+        "speedup": round(segundos_mascaras / segundos_indice, 1),
+        "mismatches": discrepancias,
+    }, indent=2))
+    sys.exit(0 if discrepancias == 0 else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import json
+import time
+import warnings
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from graficos import figura, spec_barras, spec_tarta, spec_lineas, spec_histograma, spec_intervalos
+from histogramas import Boceto
+
+# Ignorar FutureWarning de seaborn/pandas durante las mediciones
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+CATEGORIAS = ["Food", "Transportation", "Housing", "Entertainment", "Health", "Education", "Utilities",
+              "Insurance", "Debt", "Savings", "Gifts", "Travel", "Other"]
+
+def generar_gastos(filas, semilla=0):
+    """
+    Genera un DataFrame de gastos reproducible para medir el coste de cada gráfico
+    """
+    rng = np.random.default_rng(semilla)
+    fechas = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, filas), unit="D")
+    return pd.DataFrame({
+        "amount": np.round(rng.gamma(2.0, 40.0, filas), 2),
+        "category": rng.choice(CATEGORIAS, filas),
+        "date": fechas,
+    })
+
+def _png(fig):
+    # st.pyplot serializa la figura como PNG antes de enviarla al navegador
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+def matplotlib_barras(df):
+    totales = df.groupby("category")["amount"].sum().reset_index().sort_values("amount", ascending=False)
+    with figura(figsize=(12, 6)) as (fig, ax):
+        sns.barplot(x="category", y="amount", data=totales, palette="viridis", ax=ax)
+        return _png(fig)
+
+def matplotlib_tarta(df):
+    totales = df.groupby("category")["amount"].sum()
+    with figura(figsize=(12, 6)) as (fig, ax):
+        ax.pie(totales, labels=totales.index, autopct='%1.1f%%', startangle=90)
+        return _png(fig)
+
+def matplotlib_lineas(df):
+    totales = df.groupby(df["date"].dt.strftime('%Y-%m'))["amount"].sum()
+    with figura(figsize=(12, 6)) as (fig, ax):
+        ax.plot(totales.index, totales.values, marker='o', linestyle='-')
+        return _png(fig)
+
+def matplotlib_histograma(df):
+    with figura(figsize=(12, 6)) as (fig, ax):
+        sns.histplot(df["amount"], bins=20, kde=True, ax=ax)
+        return _png(fig)
+
+def matplotlib_boceto(df):
+    # Como Custom Analysis: barras ya agrupadas desde el boceto, sin KDE por fila
+    conteos, limites = Boceto.desde_importes(df["amount"]).intervalos(bins=20)
+    with figura(figsize=(12, 6)) as (fig, ax):
+        ax.bar(limites[:-1], conteos, width=np.diff(limites), align='edge')
+        return _png(fig)
+
+def vega_barras(df):
+    totales = df.groupby("category")["amount"].sum().reset_index()
+    return json.dumps(spec_barras(totales, "category", "amount", "Expense by Category")).encode()
+
+def vega_tarta(df):
+    totales = df.groupby("category")["amount"].sum()
+    return json.dumps(spec_tarta(totales, "Expense Distribution by Category")).encode()
+
+def vega_lineas(df):
+    totales = df.groupby(df["date"].dt.strftime('%Y-%m'))["amount"].sum().rename_axis("period").reset_index()
+    return json.dumps(spec_lineas(totales, "period", "amount", "Monthly Expense Trend")).encode()
+
+def vega_histograma(df):
+    return json.dumps(spec_histograma(df["amount"], "Expense Amount Distribution")).encode()
+
+def vega_boceto(df):
+    conteos, limites = Boceto.desde_importes(df["amount"]).intervalos(bins=20)
+    return json.dumps(spec_intervalos(conteos, limites, "Expense Amount Distribution")).encode()
+
+GRAFICOS = {
+    "bar": (matplotlib_barras, vega_barras),
+    "pie": (matplotlib_tarta, vega_tarta),
+    "line": (matplotlib_lineas, vega_lineas),
+    "histogram": (matplotlib_histograma, vega_histograma),
+    "histogram_sketch": (matplotlib_boceto, vega_boceto),
+}
+
+def medir(funcion, df, repeticiones):
+    """
+    Devuelve el tiempo de CPU medio por ejecución (segundos) y el tamaño del contenido enviado (bytes)
+    """
+    contenido = funcion(df)
+    inicio = time.process_time()
+    for _ in range(repeticiones):
+        funcion(df)
+    return (time.process_time() - inicio) / repeticiones, len(contenido)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el coste de CPU en servidor entre matplotlib y Vega-Lite")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    resultados = []
+    for filas in args.filas:
+        df = generar_gastos(filas)
+        for nombre, (funcion_matplotlib, funcion_vega) in GRAFICOS.items():
+            cpu_mpl, bytes_mpl = medir(funcion_matplotlib, df, args.repeticiones)
+            cpu_vega, bytes_vega = medir(funcion_vega, df, args.repeticiones)
+            resultados.append({
+                "chart": nombre,
+                "rows": filas,
+                "matplotlib_cpu_s": round(cpu_mpl, 6),
+                "vega_cpu_s": round(cpu_vega, 6),
+                "matplotlib_payload_bytes": bytes_mpl,
+                "vega_payload_bytes": bytes_vega,
+                "cpu_speedup": round(cpu_mpl / cpu_vega, 2) if cpu_vega > 0 else None,
+            })
+    print(json.dumps(resultados, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from agregacion_paralela import TablaCompartida
+from datos_sinteticos import generar_dataframe
+
+def medir(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalado del groupby paralelo por categoría frente a pandas")
+    parser.add_argument("--filas", type=int, default=20_000_000)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    df = generar_dataframe(args.filas)
+    base_texto, _ = medir(lambda: df.groupby("category")["amount"].sum(), args.repeticiones)
+    # El camino paralelo trabaja con los códigos de una columna categórica
+    df["category"] = df["category"].astype("category")
+    df["date"] = pd.to_datetime(df["date"])
+    base, esperado = medir(lambda: df.groupby("category", observed=True)["amount"].sum(), args.repeticiones)
+
+    # La tabla compartida se copia una vez (como la del ledger de la sesión) y sirve a todas las consultas
+    inicio = time.perf_counter()
+    tabla = TablaCompartida(df)
+    segundos_tabla = time.perf_counter() - inicio
+
+    # Consulta con filtros (un trimestre y algunas categorías), comprobada contra pandas
+    categorias = list(df["category"].cat.categories[::2])
+    desde, hasta = pd.Timestamp("2025-04-01"), pd.Timestamp("2025-06-30")
+    filtro = df["category"].isin(categorias) & (df["date"] >= desde) & (df["date"] <= hasta)
+    esperado_filtrado = df[filtro].groupby("description", observed=True)["amount"].sum()
+
+    resultados = []
+    for procesos in args.procesos:
+        # Calentamiento: arranca los procesos del pool fuera de la medición
+        tabla.sumar("category", procesos=procesos, umbral=0)
+        segundos, obtenido = medir(lambda: tabla.sumar("category", procesos=procesos, umbral=0), args.repeticiones)
+        filtrado = tabla.sumar("description", categorias=categorias, inicio=desde, fin=hasta,
+                               procesos=procesos, umbral=0)
+        correcto = all(np.allclose(a.to_numpy(), b.to_numpy()) and list(map(str, a.index)) == list(map(str, b.index))
+                       for a, b in ((esperado, obtenido), (esperado_filtrado, filtrado)))
+        resultados.append({
+            "processes": procesos,
+            "seconds": round(segundos, 4),
+            "speedup_vs_pandas": round(base / segundos, 2),
+            "matches_pandas": correcto,
+        })
+    tabla.cerrar()
+    # Eficiencia respecto al groupby categórico de pandas en un núcleo: 1.0 es escalado lineal
+    for resultado in resultados:
+        resultado["scaling_efficiency"] = round(resultado["speedup_vs_pandas"] / resultado["processes"], 2)
+
+    print(json.dumps({
+        "rows": args.filas,
+        "cpus": os.cpu_count(),
+        "pandas_object_seconds": round(base_texto, 4),
+        "pandas_categorical_seconds": round(base, 4),
+        "shared_table_build_seconds": round(segundos_tabla, 4),
+        "results": resultados,
+    }, indent=2))
+    sys.exit(0 if all(r["matches_pandas"] for r in resultados) else 1)
+
+if __name__ == "__main__":
+    main()
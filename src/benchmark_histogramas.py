@@ -0,0 +1,84 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from datos_sinteticos import FECHA_INICIO, DIAS, generar_ledger
+from libro_mayor import LibroMayor
+
+CUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+def consultas(libro, n, semilla):
+    """
+    Selecciones al azar como las de Custom Analysis: tipo, algunas categorías y un rango de fechas cualquiera
+    """
+    rng = np.random.default_rng(semilla)
+    categorias = libro.df['category'].unique().tolist()
+    inicio = pd.Timestamp(FECHA_INICIO)
+    for _ in range(n):
+        tipo = rng.choice(["Income", "Expense", None])
+        elegidas = list(rng.choice(categorias, rng.integers(1, len(categorias) + 1), replace=False))
+        desde, hasta = np.sort(rng.integers(0, DIAS, 2))
+        yield tipo, elegidas, (inicio + pd.Timedelta(days=int(desde))).date(), (inicio + pd.Timedelta(days=int(hasta))).date()
+
+def exacto(df, tipo, categorias, desde, hasta):
+    # Lo que hace Custom Analysis sin el índice: filtrar las filas del ledger
+    fechas = df['date'].dt.date
+    filtro = df['category'].isin(categorias) & (fechas >= desde) & (fechas <= hasta)
+    if tipo is not None:
+        filtro &= df['type'] == tipo
+    return df.loc[filtro, 'amount'].to_numpy()
+
+def main():
+    parser = argparse.ArgumentParser(description="Histogramas y cuantiles desde el índice de bocetos frente a filtrar las filas")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--consultas", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    ingresos, gastos = generar_ledger(args.filas, args.semilla)
+    libro = LibroMayor(ingresos, gastos)
+    inicio = time.perf_counter()
+    indice = libro.indice_distribuciones()
+    segundos_indice = time.perf_counter() - inicio
+
+    tiempo_exacto = tiempo_boceto = 0.0
+    error_maximo = 0.0
+    conteos_iguales = True
+    for tipo, categorias, desde, hasta in consultas(libro, args.consultas, args.semilla):
+        inicio = time.perf_counter()
+        importes = exacto(libro.df, tipo, categorias, desde, hasta)
+        esperado, _ = np.histogram(importes, bins=20)
+        tiempo_exacto += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        boceto = indice.boceto(None if tipo is None else [tipo], categorias, desde, hasta)
+        conteos, _ = boceto.intervalos(bins=20)
+        tiempo_boceto += time.perf_counter() - inicio
+
+        conteos_iguales &= boceto.n == len(importes) and int(conteos.sum()) == int(esperado.sum())
+        if len(importes):
+            # Cuantil de rango más bajo (como el del boceto) frente al del boceto: error relativo
+            ordenados = np.sort(np.maximum(importes, 0.01))
+            for q in CUANTILES:
+                real = ordenados[int(q * (len(ordenados) - 1))]
+                error_maximo = max(error_maximo, abs(boceto.cuantil(q) - real) / real)
+
+    print(json.dumps({
+        "rows": args.filas,
+        "queries": args.consultas,
+        "index_build_seconds": round(segundos_indice, 4),
+        "exact_seconds_per_query": round(tiempo_exacto / args.consultas, 6),
+        "sketch_seconds_per_query": round(tiempo_boceto / args.consultas, 6),
+        "speedup": round(tiempo_exacto / tiempo_boceto, 2) if tiempo_boceto > 0 else None,
+        "counts_match": conteos_iguales,
+        "max_quantile_relative_error": round(error_maximo, 5),
+        "relative_error_bound": indice.error,
+    }, indent=2))
+    sys.exit(0 if conteos_iguales and error_maximo <= indice.error + 1e-9 else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from almacenamiento import BYTES_CSV, DURACION_CSV, FILAS_CSV, cargar_registros, guardar_registros
+from datos_sinteticos import generar_dataframe
+from metricas import iniciar_servidor
+
+def peticion(rutas):
+    # Lo que hace una sesión nueva de la app: cargar los tres CSV del usuario y guardar uno
+    datos = [cargar_registros(ruta) for ruta in rutas]
+    guardar_registros(datos[1], rutas[1])
+
+def coste_metricas(repeticiones):
+    """
+    Tiempo (s) de las operaciones de métricas que hace una petición: 4 × (medir + inc + observe)
+    """
+    etiquetas = {"operacion": "load", "archivo": "expenses"}
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for _ in range(4):
+            with DURACION_CSV.medir(**etiquetas):
+                pass
+            BYTES_CSV.inc(1000, **etiquetas)
+            FILAS_CSV.observe(100, **etiquetas)
+    return (time.perf_counter() - inicio) / repeticiones
+
+def raspar(url, parar, resultados):
+    # Raspado periódico, como haría Prometheus, mientras se atienden peticiones
+    while not parar.is_set():
+        with urllib.request.urlopen(url) as respuesta:
+            resultados.append(respuesta.read().decode())
+        parar.wait(0.05)
+
+def cargas_expenses(texto):
+    # Cargas de expenses contadas en una exposición (0 si aún no hay ninguna)
+    prefijo = 'finansmart_csv_seconds_count{operacion="load",archivo="expenses"} '
+    return next((int(float(linea[len(prefijo):])) for linea in texto.splitlines() if linea.startswith(prefijo)), 0)
+
+def medir(filas, peticiones):
+    """
+    Atiende peticiones mientras se raspa /metrics en local y compara el coste de las métricas con el de
+    una petición. Devuelve el resultado (sin "ok")
+    """
+    with tempfile.TemporaryDirectory() as temporal:
+        rutas = []
+        for nombre, tipo in (("incomes", "income"), ("expenses", "expense"), ("goals", "expense")):
+            ruta = os.path.join(temporal, "data", "bench", f"{nombre}.csv")
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            generar_dataframe(filas, tipo).to_csv(ruta, index=False)
+            rutas.append(ruta)
+
+        servidor = iniciar_servidor(0)
+        url = "http://{}:{}/metrics".format(*servidor.server_address)
+        # Las cargas anteriores (otra medición en el mismo proceso) siguen en el registro
+        antes = cargas_expenses(urllib.request.urlopen(url).read().decode())
+        parar, raspados = threading.Event(), []
+        hilo = threading.Thread(target=raspar, args=(url, parar, raspados), daemon=True)
+        hilo.start()
+
+        peticion(rutas)
+        inicio = time.perf_counter()
+        for _ in range(peticiones):
+            peticion(rutas)
+        tiempo_peticion = (time.perf_counter() - inicio) / peticiones
+        parar.set()
+        hilo.join()
+
+    # El raspado debe reflejar todas las cargas hechas (una por petición y archivo, más la de calentamiento)
+    despues = cargas_expenses(urllib.request.urlopen(url).read().decode())
+
+    coste = coste_metricas(peticiones * 10)
+    return {
+        "request_ms": round(tiempo_peticion * 1000, 3),
+        "metrics_us_per_request": round(coste * 1e6, 3),
+        "overhead": round(coste / tiempo_peticion, 6),
+        "scrapes": len(raspados),
+        "exposition_ok": despues - antes == peticiones + 1,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprueba que recoger métricas cuesta menos del 1% de cada petición")
+    parser.add_argument("--filas", type=int, default=1000, help="Filas por archivo de usuario")
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--max-sobrecoste", type=float, default=0.01)
+    args = parser.parse_args()
+
+    resultado = medir(args.filas, args.peticiones)
+    resultado["ok"] = resultado["overhead"] < args.max_sobrecoste and resultado["exposition_ok"] and resultado["scrapes"] > 0
+    print(json.dumps(resultado))
+    sys.exit(0 if resultado["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from datos_sinteticos import FECHA_INICIO, DIAS, generar_ledger
+from libro_mayor import LibroMayor
+from simulacion import flujos_mensuales, probabilidades_metas
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación Monte Carlo de metas: tiempo de una ejecución completa")
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--metas", type=int, default=20)
+    parser.add_argument("--caminos", type=int, default=10_000)
+    parser.add_argument("--procesos", type=int, default=2, help="Procesos de la ejecución paralela que se compara")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--limite", type=float, default=1.0, help="Segundos máximos de la ejecución secuencial")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    ingresos, gastos = generar_ledger(args.filas, args.semilla)
+    # Las metas de ahorro avanzan con los ingresos en Savings (como su progreso): los de Investment hacen de ahorro
+    ingresos = [dict(ingreso, category="Savings") if ingreso["category"] == "Investment" else ingreso
+                for ingreso in ingresos]
+    libro = LibroMayor(ingresos, gastos)
+    # "Hoy" es el final de los datos sintéticos: la historia no termina en meses vacíos
+    hoy = pd.Timestamp(FECHA_INICIO) + pd.Timedelta(days=DIAS)
+    rng = np.random.default_rng(args.semilla)
+    # Objetivos cerca de lo que se aporta de media hasta su fecha límite (probabilidades intermedias)
+    flujos, _ = flujos_mensuales(libro.df, hoy)
+    medias = flujos.mean(axis=1)
+    horizontes = rng.integers(1, 121, args.metas)
+    actuales = rng.uniform(0, 1_000, args.metas)
+    metas = [{"name": f"goal_{i}",
+              "target_amount": float(actuales[i] + medias[i % 2] * horizontes[i] * rng.uniform(0.9, 1.1)),
+              "deadline": (hoy + pd.DateOffset(months=int(horizontes[i]))).strftime("%Y-%m-%d"),
+              "category": "saving" if i % 2 == 0 else "other"} for i in range(args.metas)]
+
+    tiempos = []
+    for _ in range(args.repeticiones):
+        inicio = time.perf_counter()
+        secuencial = probabilidades_metas(metas, libro.df, actuales, args.caminos, args.semilla, procesos=1, hoy=hoy)
+        tiempos.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    paralelo = probabilidades_metas(metas, libro.df, actuales, args.caminos, args.semilla, procesos=args.procesos, hoy=hoy)
+    segundos_paralelo = time.perf_counter() - inicio
+
+    # Los bloques de caminos tienen semillas fijas: el resultado no depende del número de procesos
+    coinciden = secuencial == paralelo
+    en_rango = all(p is not None and 0.0 <= p <= 1.0 for p in secuencial)
+    print(json.dumps({
+        "rows": args.filas,
+        "goals": args.metas,
+        "paths": args.caminos,
+        "seconds": round(min(tiempos), 4),
+        "parallel_seconds": round(segundos_paralelo, 4),
+        "parallel_matches": coinciden,
+        "probabilities": [round(p, 4) for p in secuencial],
+        "limit_seconds": args.limite,
+    }, indent=2))
+    sys.exit(0 if coinciden and en_rango and min(tiempos) <= args.limite else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import importlib
+import sys
+import types
+
+class ModuloPerezoso(types.ModuleType):
+    """
+    Módulo sustituto que importa el módulo real la primera vez que se accede a uno de sus atributos
+    """
+    def __init__(self, nombre):
+        super().__init__(nombre)
+        self._nombre_real = nombre
+
+    def __getattr__(self, atributo):
+        modulo = importlib.import_module(self._nombre_real)
+        # Copiar los atributos para que los siguientes accesos no pasen por __getattr__
+        self.__dict__.update(modulo.__dict__)
+        return getattr(modulo, atributo)
+
+def importar_perezoso(nombre):
+    """
+    Devuelve el módulo si ya está cargado o un sustituto que lo cargará al usarse por primera vez
+    """
+    modulo = sys.modules.get(nombre)
+    if modulo is not None:
+        return modulo
+    return ModuloPerezoso(nombre)
@@ -0,0 +1,291 @@
+import os
+import re
+import yaml
+from yaml.loader import SafeLoader
+from taxonomia import cargar_taxonomia
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+# Reglas de categorización automática de las importaciones (lista de reglas con keywords o regex)
+REGLAS_PATH = os.path.join('config', 'categorizacion.yaml')
+# Categoría de las filas sin regla que coincida (existe en los dos tipos de la taxonomía por defecto)
+CATEGORIA_SIN_REGLA = "Other"
+# Textos distintos recordados con su regla; al llenarse se vacía (los extractos repiten mucho los conceptos)
+MEMO_MAXIMO = 200_000
+
+def _vacio(valor):
+    return valor is None or valor != valor or str(valor).strip() == ""
+
+def _referencias_numeradas(expresion):
+    """
+    Si la regex usa grupos por número (\\1, (?(1)...)): dentro de la expresión combinada los números cambian
+    """
+    i, en_clase = 0, False
+    while i < len(expresion):
+        letra = expresion[i]
+        if letra == "\\":
+            if not en_clase and expresion[i + 1:i + 2].isdigit() and expresion[i + 1] != "0":
+                return True
+            i += 2
+            continue
+        if en_clase:
+            en_clase = letra != "]"
+        elif letra == "[":
+            en_clase = True
+            # Un ] justo al principio de la clase es literal
+            if expresion[i + 1:i + 2] == "]" or expresion[i + 1:i + 3] == "^]":
+                i += 2 if expresion[i + 1] == "]" else 3
+                continue
+        elif expresion.startswith("(?(", i) and expresion[i + 3:i + 4].isdigit():
+            return True
+        i += 1
+    return False
+
+def _combinable(expresion):
+    # Dentro de una alternativa fallan las banderas globales que no van al principio ((?i)...)
+    try:
+        re.compile(f"(?:)|({expresion})")
+    except re.error:
+        return False
+    return not _referencias_numeradas(expresion)
+
+def validar_regla(regla):
+    """
+    Normaliza una regla (type opcional, category, description y merchant opcionales, keywords y/o regex);
+    lanza ValueError si no es válida
+    """
+    tipo = None if _vacio(regla.get("type")) else str(regla["type"]).strip().lower()
+    if tipo not in (None, "income", "expense"):
+        raise ValueError(f"tipo no válido en la regla: '{regla.get('type')}' (income/expense)")
+    if _vacio(regla.get("category")):
+        raise ValueError("la regla no tiene categoría")
+    palabras = regla.get("keywords") or []
+    if isinstance(palabras, str):
+        palabras = [palabras]
+    palabras = [str(palabra).strip() for palabra in palabras if not _vacio(palabra)]
+    expresion = None if _vacio(regla.get("regex")) else str(regla["regex"])
+    if not palabras and expresion is None:
+        raise ValueError(f"la regla de '{regla['category']}' no tiene keywords ni regex")
+    if expresion is not None:
+        try:
+            re.compile(expresion)
+        except re.error as e:
+            raise ValueError(f"regex no válida en la regla de '{regla['category']}': {e}")
+    return {
+        "type": tipo,
+        "category": str(regla["category"]).strip(),
+        "description": None if _vacio(regla.get("description")) else str(regla["description"]).strip(),
+        "merchant": None if _vacio(regla.get("merchant")) else str(regla["merchant"]).strip(),
+        "keywords": palabras,
+        "regex": expresion,
+        # Las regex que no se pueden meter en la expresión combinada se buscan aparte
+        "aparte": expresion is not None and not _combinable(expresion),
+    }
+
+def reglas_taxonomia(taxonomia):
+    """
+    Una regla de palabra clave por comercio del árbol de categorías (tipo, categoría, descripción, comercio)
+    """
+    return [{"type": tipo, "category": categoria, "description": descripcion, "merchant": comercio,
+             "keywords": [comercio]}
+            for tipo, categorias in taxonomia.arbol.items()
+            for categoria, descripciones in categorias.items()
+            for descripcion, comercios in descripciones.items()
+            for comercio in comercios]
+
+def _trie(palabras):
+    """
+    Alternativa regex con forma de trie (prefijos comunes factorizados): el motor de re no prueba cada
+    palabra en cada posición, sigue una sola rama por carácter, como un autómata de Aho-Corasick
+    """
+    arbol = {}
+    for palabra in palabras:
+        nodo = arbol
+        for letra in palabra:
+            nodo = nodo.setdefault(letra, {})
+        nodo[""] = {}
+
+    def patron(nodo):
+        ramas = [re.escape(letra) + patron(hijo) for letra, hijo in sorted(nodo.items()) if letra]
+        if not ramas:
+            return ""
+        cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+        # Una palabra que termina aquí y es prefijo de otras: el resto es opcional (codicioso, la más larga primero)
+        return f"(?:{cuerpo})?" if "" in nodo else cuerpo
+
+    return patron(arbol)
+
+class Categorizador:
+    """
+    Asigna category (y description / merchant si la regla los da) a las transacciones sin categoría a partir
+    de su texto. Las reglas de cada tipo se compilan en una única expresión: las palabras clave (palabras
+    completas, sin distinguir mayúsculas) en un trie y cada regex en su propio grupo, así que cada texto
+    se recorre una sola vez sea cual sea el número de reglas. Gana la coincidencia que empieza antes en
+    el texto; en la misma posición, las palabras clave (la más larga) y después las regex por orden.
+    Las regex con referencias por número, banderas globales ((?i)...) o nombres de grupo ya usados por otra
+    regla se buscan por separado y compiten por la posición con la combinada (en empate gana la combinada).
+    Los textos ya vistos se recuerdan
+    """
+    def __init__(self, reglas, columna="description", sin_regla=CATEGORIA_SIN_REGLA):
+        self.reglas = [validar_regla(regla) for regla in reglas]
+        self.columna = columna
+        self.sin_regla = sin_regla
+        self._automatas = {}
+        self._memo = {}
+
+    def _automata(self, tipo):
+        # (expresión combinada, {palabra: regla}, {grupo: regla}, [(regla, expresión aparte)]) de las reglas de
+        # un tipo y las de cualquier tipo (sin tipo, todas)
+        if tipo not in self._automatas:
+            indices = [i for i, regla in enumerate(self.reglas) if tipo is None or regla["type"] in (None, tipo)]
+            palabras, grupos, partes, aparte, nombres = {}, {}, [], [], set()
+            for i in indices:
+                for palabra in self.reglas[i]["keywords"]:
+                    palabras.setdefault(palabra.lower(), i)
+            if palabras:
+                partes.append(rf"(?<!\w)({_trie(palabras)})(?!\w)")
+            siguiente = len(partes) + 1
+            for i in indices:
+                expresion = self.reglas[i]["regex"]
+                if expresion is None:
+                    continue
+                sola = re.compile(expresion, re.IGNORECASE)
+                if self.reglas[i]["aparte"] or nombres & set(sola.groupindex):
+                    aparte.append((i, sola))
+                    continue
+                nombres |= set(sola.groupindex)
+                partes.append(f"({expresion})")
+                grupos[siguiente] = i
+                # Los grupos de la propia regex van detrás del suyo
+                siguiente += 1 + sola.groups
+            compilada = re.compile("|".join(partes), re.IGNORECASE) if partes else None
+            self._automatas[tipo] = (compilada, palabras, grupos, aparte)
+        return self._automatas[tipo]
+
+    def indice_regla(self, texto, tipo=None):
+        """
+        Índice de la regla que categoriza el texto (-1 si ninguna)
+        """
+        clave = (tipo, texto)
+        indice = self._memo.get(clave)
+        if indice is None:
+            compilada, palabras, grupos, aparte = self._automata(tipo)
+            coincidencia = compilada.search(texto) if compilada is not None else None
+            if coincidencia is None:
+                indice, inicio = -1, len(texto) + 1
+            elif palabras and coincidencia.lastindex == 1:
+                indice, inicio = palabras.get(coincidencia.group(1).lower(), -1), coincidencia.start()
+            else:
+                # lastindex es el grupo exterior de la regex que ha coincidido
+                indice, inicio = grupos[coincidencia.lastindex], coincidencia.start()
+            for i, sola in aparte:
+                coincidencia = sola.search(texto)
+                if coincidencia is not None and coincidencia.start() < inicio:
+                    indice, inicio = i, coincidencia.start()
+            if len(self._memo) >= MEMO_MAXIMO:
+                self._memo.clear()
+            self._memo[clave] = indice
+        return indice
+
+    def regla(self, texto, tipo=None):
+        indice = self.indice_regla(texto, tipo)
+        return self.reglas[indice] if indice >= 0 else None
+
+    def categorizar(self, transaccion, tipo=None):
+        """
+        La transacción con su categoría: si ya la trae se devuelve tal cual; si no, la de la regla que
+        coincide con su texto o sin_regla (el texto se queda como descripción si no la tiene)
+        """
+        if not _vacio(transaccion.get("category")):
+            return transaccion
+        tipo = tipo or (None if _vacio(transaccion.get("type")) else str(transaccion["type"]).strip().lower())
+        texto = "" if _vacio(transaccion.get(self.columna)) else str(transaccion[self.columna])
+        regla = self.regla(texto, tipo)
+        fila = dict(transaccion, category=self.sin_regla if regla is None else regla["category"])
+        if regla is not None and regla["description"] is not None:
+            fila["description"] = regla["description"]
+        elif _vacio(fila.get("description")):
+            fila["description"] = texto
+        if regla is not None and regla["merchant"] is not None:
+            fila["merchant"] = regla["merchant"]
+        return fila
+
+    def categorizar_df(self, df, tipo=None):
+        """
+        categorizar para un DataFrame (p. ej. un bloque de un CSV leído por partes): cada texto distinto
+        se busca una vez y el resultado se reparte a sus filas con un take
+        """
+        if df.empty or self.columna not in df.columns:
+            return df
+        df = df.copy()
+        pendientes = np.ones(len(df), dtype=bool) if 'category' not in df.columns else \
+            (df['category'].isna() | (df['category'].astype(str).str.strip() == "")).to_numpy()
+        if not pendientes.any():
+            return df
+        if tipo is not None or 'type' not in df.columns:
+            tipos = pd.Series(tipo, index=df.index, dtype=object)
+        else:
+            tipos = df['type'].astype(str).str.strip().str.lower().where(df['type'].notna())
+        textos = df[self.columna].fillna("").astype(str)
+
+        # Índice de regla de cada fila pendiente (-1 sin regla), buscando cada (tipo, texto) distinto una vez
+        filas = np.flatnonzero(pendientes)
+        indices = np.full(len(filas), -1, dtype=np.int64)
+        codigos_tipo, valores_tipo = pd.factorize(tipos.iloc[filas])
+        for codigo in range(-1, len(valores_tipo)):
+            grupo = np.flatnonzero(codigos_tipo == codigo)
+            if len(grupo):
+                codigos, unicos = pd.factorize(textos.iloc[filas[grupo]])
+                valor = valores_tipo[codigo] if codigo >= 0 else None
+                indices[grupo] = np.array([self.indice_regla(texto, valor) for texto in unicos], dtype=np.int64)[codigos]
+
+        # Una columna vacía en el CSV se lee como float64 y una categórica no admite valores nuevos: se pasan
+        # a object antes de escribir los textos
+        for columna in ('category', 'description', 'merchant'):
+            if columna in df.columns and (isinstance(df[columna].dtype, pd.CategoricalDtype)
+                                          or not pd.api.types.is_string_dtype(df[columna].dtype)):
+                df[columna] = df[columna].astype(object)
+
+        # Valores de cada regla por índice; la última posición es la de sin regla
+        categorias = np.array([regla["category"] for regla in self.reglas] + [self.sin_regla], dtype=object)
+        descripciones = np.array([regla["description"] for regla in self.reglas] + [None], dtype=object)[indices]
+        comercios = np.array([regla["merchant"] for regla in self.reglas] + [None], dtype=object)[indices]
+        df.loc[df.index[filas], 'category'] = categorias[indices]
+        if 'description' in df.columns:
+            actuales = df['description'].iloc[filas]
+            actuales = actuales.where(actuales.notna() & (actuales.astype(str).str.strip() != ""), textos.iloc[filas])
+        else:
+            actuales = textos.iloc[filas]
+        df.loc[df.index[filas], 'description'] = np.where(pd.isna(descripciones), actuales.to_numpy(dtype=object),
+                                                          descripciones)
+        con_comercio = ~pd.isna(comercios)
+        if con_comercio.any():
+            df.loc[df.index[filas[con_comercio]], 'merchant'] = comercios[con_comercio]
+        return df
+
+def cargar_reglas(ruta=REGLAS_PATH):
+    """
+    Reglas de config/categorizacion.yaml (lista de reglas o {rules: [...]}); ninguna si no existe
+    """
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, 'r') as file:
+        contenido = yaml.load(file, Loader=SafeLoader) or []
+    return contenido.get("rules", []) if isinstance(contenido, dict) else contenido
+
+_cache = {"clave": None, "categorizador": None}
+
+def cargar_categorizador(columna="description"):
+    """
+    Categorizador con las reglas del usuario seguidas de los comercios de la taxonomía; se vuelve a compilar
+    solo si cambian las reglas, la taxonomía o la columna de texto
+    """
+    taxonomia = cargar_taxonomia()
+    fecha = os.path.getmtime(REGLAS_PATH) if os.path.exists(REGLAS_PATH) else None
+    clave = (os.path.abspath(REGLAS_PATH), fecha, id(taxonomia), columna)
+    if _cache["clave"] != clave:
+        _cache["categorizador"] = Categorizador(cargar_reglas() + reglas_taxonomia(taxonomia), columna)
+        _cache["clave"] = clave
+    return _cache["categorizador"]
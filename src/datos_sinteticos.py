@@ -0,0 +1,82 @@
+import os
+from carga_perezosa import importar_perezoso
+from main import EXPENSE_CATEGORIES
+from taxonomia import TAXONOMIA_POR_DEFECTO
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+# Periodo cubierto por los datos generados (fijo para que los resultados sean reproducibles)
+FECHA_INICIO = "2024-01-01"
+DIAS = 731
+
+def _pares_categoria_descripcion(tipo):
+    return [
+        (categoria, descripcion)
+        for categoria, descripciones in TAXONOMIA_POR_DEFECTO[tipo].items()
+        for descripcion in descripciones
+    ]
+
+def generar_dataframe(filas, tipo="expense", semilla=0):
+    """
+    Genera un DataFrame de transacciones reproducible con la taxonomía de main.py
+    """
+    rng = np.random.default_rng([semilla, 0 if tipo == "income" else 1])
+    pares = _pares_categoria_descripcion(tipo)
+    indices = rng.integers(0, len(pares), filas)
+    categorias = np.array([c for c, _ in pares], dtype=object)[indices]
+    descripciones = np.array([d for _, d in pares], dtype=object)[indices]
+    escala = 900.0 if tipo == "income" else 45.0
+    fechas = (np.datetime64(FECHA_INICIO) + rng.integers(0, DIAS, filas)).astype(str)
+    return pd.DataFrame({
+        "amount": np.round(rng.gamma(2.0, escala, filas), 2),
+        "description": descripciones,
+        "category": categorias,
+        "date": fechas,
+    })
+
+def generar_transacciones(filas, tipo="expense", semilla=0):
+    """
+    Igual que generar_dataframe pero como lista de diccionarios (el formato que usan Finance y la app)
+    """
+    return generar_dataframe(filas, tipo, semilla).to_dict('records')
+
+def generar_ledger(filas, semilla=0, proporcion_ingresos=0.2):
+    """
+    Devuelve (ingresos, gastos) con el número total de filas indicado
+    """
+    filas_ingresos = int(filas * proporcion_ingresos)
+    return (generar_transacciones(filas_ingresos, "income", semilla),
+            generar_transacciones(filas - filas_ingresos, "expense", semilla))
+
+def generar_metas(cantidad, semilla=0):
+    """
+    Genera metas de ahorro y de reducción de gastos con el formato de Finance.goals
+    """
+    rng = np.random.default_rng([semilla, 2])
+    metas = []
+    for i in range(cantidad):
+        if i % 2 == 0:
+            metas.append({"name": f"goal_{i}", "target_amount": float(rng.integers(1_000, 50_000)),
+                          "deadline": "2026-12-31", "category": "saving", "created_date": FECHA_INICIO})
+        else:
+            categoria = EXPENSE_CATEGORIES[i % len(EXPENSE_CATEGORIES)]
+            metas.append({"name": f"reduce_{categoria}", "target_amount": float(rng.integers(1_000, 50_000)),
+                          "deadline": "2026-12-31", "category": "expense_reduction", "created_date": FECHA_INICIO})
+    return metas
+
+def escribir_usuarios(directorio, usuarios, filas_por_usuario, semilla=0):
+    """
+    Crea la estructura data/<usuario>/{incomes,expenses,goals}.csv para varios usuarios
+    """
+    nombres = []
+    for i in range(usuarios):
+        nombre = f"user{i:05d}"
+        ruta = os.path.join(directorio, nombre)
+        os.makedirs(ruta, exist_ok=True)
+        filas_ingresos = max(1, filas_por_usuario // 5)
+        generar_dataframe(filas_ingresos, "income", semilla + i).to_csv(os.path.join(ruta, 'incomes.csv'), index=False)
+        generar_dataframe(filas_por_usuario - filas_ingresos, "expense", semilla + i).to_csv(os.path.join(ruta, 'expenses.csv'), index=False)
+        pd.DataFrame(generar_metas(2, semilla + i)).to_csv(os.path.join(ruta, 'goals.csv'), index=False)
+        nombres.append(nombre)
+    return nombres
@@ -0,0 +1,88 @@
+import os
+from ajustes import cargar_ajustes
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+class TablaCambios:
+    """
+    Tipos de cambio a la moneda base por moneda y fecha (date,currency,rate: 1 unidad de currency = rate
+    unidades de la moneda base). Cada moneda guarda sus fechas ordenadas: el tipo de una fecha es el último
+    publicado hasta ese día (búsqueda binaria), y antes del primero se usa el primero
+    """
+    def __init__(self, base, tipos=None):
+        self.base = base
+        self.fechas = {}
+        self.tasas = {}
+        self._cache = {}
+        if tipos is not None and not tipos.empty:
+            tipos = tipos.assign(date=pd.to_datetime(tipos['date'])).sort_values(['currency', 'date'], kind='stable')
+            for divisa, filas in tipos.groupby('currency', sort=False):
+                self.fechas[divisa] = filas['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+                self.tasas[divisa] = filas['rate'].to_numpy(dtype=np.float64)
+
+    def divisas(self):
+        return [self.base] + sorted(divisa for divisa in self.tasas if divisa != self.base)
+
+    def _tasas(self, divisa, fechas):
+        if divisa == self.base:
+            return np.ones(len(fechas))
+        if divisa not in self.tasas:
+            raise ValueError(f"No hay tipos de cambio de {divisa} a {self.base}")
+        posiciones = np.searchsorted(self.fechas[divisa], fechas, side='right') - 1
+        return self.tasas[divisa][np.maximum(posiciones, 0)]
+
+    def tasa(self, divisa, fecha):
+        """
+        Tipo de cambio de una moneda en una fecha (con caché por moneda y fecha)
+        """
+        clave = (divisa, str(fecha))
+        if clave not in self._cache:
+            self._cache[clave] = float(self._tasas(divisa, np.array([pd.Timestamp(fecha).value]))[0])
+        return self._cache[clave]
+
+    def convertir(self, importes, divisas, fechas):
+        """
+        Importes en la moneda base: una búsqueda vectorizada por cada moneda distinta, no una por fila.
+        Las filas sin moneda ya están en la moneda base
+        """
+        importes = np.asarray(importes, dtype=np.float64)
+        codigos = pd.Categorical(divisas)
+        fechas = pd.to_datetime(pd.Series(fechas)).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        tasas = np.ones(len(importes))
+        for codigo, divisa in enumerate(codigos.categories):
+            filas = np.flatnonzero(codigos.codes == codigo)
+            tasas[filas] = self._tasas(divisa, fechas[filas])
+        return importes * tasas
+
+_cache = {"clave": None, "tabla": None}
+
+def cargar_tipos_cambio():
+    """
+    Tabla de tipos de cambio del archivo de los ajustes (tipos_cambio_ruta) hacia la moneda de los ajustes;
+    se vuelve a leer solo si cambia el archivo o la moneda base
+    """
+    ajustes = cargar_ajustes()
+    ruta = ajustes['tipos_cambio_ruta']
+    fecha = os.path.getmtime(ruta) if ruta and os.path.exists(ruta) else None
+    clave = (ajustes['moneda'], ruta and os.path.abspath(ruta), fecha)
+    if _cache["clave"] != clave:
+        tipos = pd.read_csv(ruta) if fecha is not None else None
+        _cache["clave"], _cache["tabla"] = clave, TablaCambios(ajustes['moneda'], tipos)
+    return _cache["tabla"]
+
+def en_moneda_base(df, tabla=None):
+    """
+    DataFrame de transacciones con amount en la moneda base (original_amount guarda el importe en su moneda).
+    Sin columna currency, o si todas las filas están en la moneda base, devuelve el mismo DataFrame
+    """
+    if df.empty or 'currency' not in df.columns:
+        return df
+    tabla = tabla or cargar_tipos_cambio()
+    divisas = df['currency']
+    if divisas.isna().all() or bool((divisas.dropna() == tabla.base).all()):
+        return df
+    fechas = df['date'] if 'date' in df.columns else pd.Series(pd.Timestamp.now(), index=df.index)
+    return df.assign(original_amount=df['amount'],
+                     amount=tabla.convertir(df['amount'].to_numpy(), divisas, fechas))
@@ -0,0 +1,125 @@
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+# Símbolo de cada moneda admitida
+MONEDAS = {"USD": "$", "EUR": "€", "GBP": "£", "JPY": "¥", "MXN": "$", "CHF": "CHF"}
+
+# Por locale: (separador de miles, separador decimal, plantilla); None es el formato de siempre ("$1234.56")
+LOCALES = {
+    None: ("", ".", "{simbolo}{numero}"),
+    "en_US": (",", ".", "{simbolo}{numero}"),
+    "en_GB": (",", ".", "{simbolo}{numero}"),
+    "es_ES": (".", ",", "{numero} {simbolo}"),
+    "es_MX": (",", ".", "{simbolo}{numero}"),
+    "de_DE": (".", ",", "{numero} {simbolo}"),
+    "fr_FR": (" ", ",", "{numero} {simbolo}"),
+}
+
+# Importes que, en unidades de la última cifra decimal, llegan aquí (y los infinitos) se formatean uno a
+# uno con format(): por encima, el producto en float64 ya no distingue unidades y el int64 acaba desbordando
+LIMITE_VECTORIZADO = 2.0 ** 52
+
+# Tablas de búsqueda: los grupos de tres cifras y las partes decimales se toman ya formateados
+_GRUPOS = None
+
+def _grupos():
+    global _GRUPOS
+    if _GRUPOS is None:
+        _GRUPOS = np.array([f"{i:03d}" for i in range(1000)])
+    return _GRUPOS
+
+class Formato:
+    """
+    Formato de importes y porcentajes según la moneda y el locale de los ajustes. Las columnas se formatean
+    enteras con operaciones de cadenas de NumPy (tablas de búsqueda y concatenaciones vectorizadas)
+    en lugar de un f-string por fila
+    """
+    def __init__(self, moneda="USD", locale=None):
+        if locale not in LOCALES:
+            raise ValueError(f"Locale no admitido: {locale}")
+        self.simbolo = MONEDAS.get(moneda, moneda)
+        self.miles, self.decimal, plantilla = LOCALES[locale]
+        self.prefijo, _, self.sufijo = plantilla.format(simbolo=self.simbolo, numero="\0").partition("\0")
+
+    def _numeros(self, valores, decimales):
+        valores = np.asarray(valores, dtype=np.float64)
+        escala = 10 ** decimales
+        finitos = np.where(np.isfinite(valores), np.abs(valores), 0.0)
+        # Un finito cercano al máximo de float64 pasa a inf al escalarlo: también es grande, sin aviso
+        with np.errstate(over='ignore'):
+            grandes = np.isinf(valores) | (finitos * escala >= LIMITE_VECTORIZADO)
+        absolutos = np.where(grandes, 0.0, finitos)
+        unidades = np.round(absolutos * escala).astype(np.int64)
+        # Cerca de media unidad, absolutos * escala puede redondear distinto que el valor exacto:
+        # esas filas (pocas) se redondean como format()
+        dudosos = np.flatnonzero(np.abs(absolutos * escala % 1 - 0.5) < 1e-6)
+        for i in dudosos:
+            unidades[i] = int(f"{absolutos[i]:.{decimales}f}".replace(".", ""))
+        enteros = unidades // escala
+
+        # Parte entera: grupos de tres cifras con el separador de miles, sin los ceros de la izquierda
+        grupos = _grupos()
+        cifras = len(str(int(enteros.max()))) if enteros.size else 1
+        texto = None
+        for _ in range((cifras + 2) // 3):
+            grupo = grupos[enteros % 1000]
+            enteros = enteros // 1000
+            texto = grupo if texto is None else np.strings.add(np.strings.add(grupo, self.miles), texto)
+        texto = np.strings.lstrip(texto, "0" + self.miles)
+        texto[texto == ""] = "0"
+
+        if decimales:
+            fraccion = np.array([f"{self.decimal}{i:0{decimales}d}" for i in range(escala)])[unidades % escala]
+            texto = np.strings.add(texto, fraccion)
+        # Cada operación sobre el array copia todas las cadenas: solo se hace si alguna fila lo necesita
+        negativos = (valores < 0) & (unidades > 0)
+        if negativos.any():
+            texto = np.where(negativos, np.strings.add("-", texto), texto)
+        if grandes.any():
+            escalares = [self._escalar(valor, decimales) for valor in valores[grandes]]
+            # Las cadenas de NumPy tienen ancho fijo: se amplía antes de asignar las más largas
+            texto = texto.astype(f"<U{max(texto.dtype.itemsize // 4, max(map(len, escalares)))}")
+            texto[grandes] = escalares
+        return texto
+
+    def _escalar(self, valor, decimales):
+        # El format() de siempre con los separadores del locale
+        texto = f"{valor:,.{decimales}f}"
+        return texto.replace(",", "\0").replace(".", self.decimal).replace("\0", self.miles)
+
+    def _resultado(self, valores, texto, prefijo, sufijo):
+        if prefijo:
+            texto = np.strings.add(prefijo, texto)
+        if sufijo:
+            texto = np.strings.add(texto, sufijo)
+        nulos = np.isnan(np.asarray(valores, dtype=np.float64))
+        if np.ndim(valores) == 0:
+            return "" if nulos else str(texto[0])
+        if nulos.any():
+            texto = texto.astype(object)
+            texto[nulos] = ""
+        if isinstance(valores, pd.Series):
+            return pd.Series(texto, index=valores.index, name=valores.name)
+        return texto
+
+    def moneda(self, valores, decimales=2):
+        """
+        Importes con el símbolo de la moneda: acepta un número, un array o una Series (devuelve lo mismo)
+        """
+        return self._resultado(valores, self._numeros(np.atleast_1d(valores), decimales), self.prefijo, self.sufijo)
+
+    def porcentaje(self, valores, decimales=1):
+        return self._resultado(valores, self._numeros(np.atleast_1d(valores), decimales), "", "%")
+
+    def columnas(self, df, monedas=(), porcentajes=()):
+        """
+        Copia de df con las columnas indicadas ya formateadas (para st.table / st.dataframe)
+        """
+        df = df.copy()
+        for columna in monedas:
+            df[columna] = self.moneda(df[columna])
+        for columna in porcentajes:
+            df[columna] = self.porcentaje(df[columna])
+        return df
@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+
+# Esquema de Vega-Lite que entiende st.vega_lite_chart
+VEGA_LITE_SCHEMA = "https://vega.github.io/schema/vega-lite/v5.json"
+
+# Motores de renderizado disponibles
+MOTORES_GRAFICOS = ["matplotlib", "vega"]
+
+@contextmanager
+def figura(nrows=1, ncols=1, **kwargs):
+    """
+    Crea una figura con la API orientada a objetos de matplotlib, sin pasar por el registro
+    global de pyplot, y libera sus artistas al salir del bloque aunque se produzca una excepción
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(**kwargs)
+    axes = fig.subplots(nrows, ncols)
+    try:
+        yield fig, axes
+    finally:
+        fig.clear()
+
+def _registros(df):
+    """
+    Convierte un DataFrame agregado en una lista de registros serializables a JSON
+    """
+    registros = []
+    for fila in df.to_dict('records'):
+        registros.append({
+            clave: (valor.item() if isinstance(valor, np.generic) else valor)
+            for clave, valor in fila.items()
+        })
+    return registros
+
+def _base(titulo, registros):
+    return {
+        "$schema": VEGA_LITE_SCHEMA,
+        "title": titulo,
+        "data": {"values": registros},
+    }
+
+def spec_barras(df, x, y, titulo, color=None, esquema="viridis", horizontal=False, orden="valor", titulo_valor="Amount ($)"):
+    """
+    Gráfico de barras a partir de datos ya agregados (una fila por barra).
+    Con orden=None se respeta el orden de las filas recibidas.
+    """
+    spec = _base(titulo, _registros(df))
+    if orden == "valor":
+        orden = "-x" if horizontal else "-y"
+    eje_categorias = {"field": x, "type": "nominal", "sort": orden}
+    eje_valores = {"field": y, "type": "quantitative", "title": titulo_valor}
+    spec["mark"] = {"type": "bar", "tooltip": True}
+    spec["encoding"] = {
+        "x": eje_valores if horizontal else eje_categorias,
+        "y": eje_categorias if horizontal else eje_valores,
+    }
+    if color is None:
+        spec["encoding"]["color"] = {"field": x, "type": "nominal", "scale": {"scheme": esquema}, "legend": None}
+    else:
+        spec["encoding"]["color"] = {"field": color, "type": "nominal", "scale": {"scheme": esquema}}
+        spec["encoding"]["yOffset" if horizontal else "xOffset"] = {"field": color}
+    return spec
+
+def spec_tarta(serie, titulo, esquema="viridis", colores=None, donut=False):
+    """
+    Gráfico de tarta a partir de una serie agregada (índice = etiqueta, valor = importe)
+    """
+    registros = [{"label": str(etiqueta), "amount": float(valor)} for etiqueta, valor in serie.items()]
+    escala = {"range": colores} if colores else {"scheme": esquema}
+    spec = _base(titulo, registros)
+    spec["mark"] = {"type": "arc", "tooltip": True, "innerRadius": 50 if donut else 0}
+    spec["encoding"] = {
+        "theta": {"field": "amount", "type": "quantitative", "stack": "normalize"},
+        "color": {"field": "label", "type": "nominal", "title": None, "scale": escala, "sort": None},
+    }
+    return spec
+
+def spec_lineas(df, x, y, titulo, color=None, x_titulo="Period"):
+    """
+    Gráfico de líneas a partir de datos agregados por periodo (formato largo si se indica color)
+    """
+    spec = _base(titulo, _registros(df))
+    spec["mark"] = {"type": "line", "point": True, "tooltip": True}
+    spec["encoding"] = {
+        "x": {"field": x, "type": "ordinal", "title": x_titulo, "axis": {"labelAngle": -45}},
+        "y": {"field": y, "type": "quantitative", "title": "Amount ($)"},
+    }
+    if color is not None:
+        spec["encoding"]["color"] = {"field": color, "type": "nominal"}
+    return spec
+
+def spec_histograma(valores, titulo, bins=20):
+    """
+    Histograma pre-agrupado en el servidor: solo se envían los límites y conteos de cada intervalo
+    """
+    conteos, limites = np.histogram(np.asarray(valores, dtype=float), bins=bins)
+    return spec_intervalos(conteos, limites, titulo)
+
+def spec_intervalos(conteos, limites, titulo, curva=None):
+    """
+    Histograma de conteos ya agrupados (p. ej. de un histogramas.Boceto); curva es un par opcional (x, y)
+    que se dibuja como línea sobre las barras (la densidad escalada a conteos)
+    """
+    registros = [
+        {"bin_start": float(limites[i]), "bin_end": float(limites[i + 1]), "count": int(conteos[i])}
+        for i in range(len(conteos))
+    ]
+    spec = _base(titulo, registros)
+    spec["mark"] = {"type": "bar", "tooltip": True}
+    spec["encoding"] = {
+        "x": {"field": "bin_start", "type": "quantitative", "bin": {"binned": True}, "title": "Amount ($)"},
+        "x2": {"field": "bin_end"},
+        "y": {"field": "count", "type": "quantitative", "title": "Frequency"},
+    }
+    if curva is None:
+        return spec
+    barras = {"data": spec.pop("data"), "mark": spec.pop("mark"), "encoding": spec.pop("encoding")}
+    linea = {
+        "data": {"values": [{"amount": float(x), "count": float(y)} for x, y in zip(*curva)]},
+        "mark": {"type": "line", "color": "#d62728"},
+        "encoding": {
+            "x": {"field": "amount", "type": "quantitative"},
+            "y": {"field": "count", "type": "quantitative", "title": "Frequency"},
+        },
+    }
+    spec["layer"] = [barras, linea]
+    return spec
+
+def spec_indicador(progreso, color, titulo, texto=None):
+    """
+    Indicador circular (gauge) de progreso entre 0 y 100
+    """
+    progreso = float(min(100, max(0, progreso)))
+    registros = [
+        {"part": "progress", "value": progreso},
+        {"part": "remaining", "value": 100 - progreso},
+    ]
+    spec = _base(titulo, registros)
+    spec["layer"] = [
+        {
+            "mark": {"type": "arc", "innerRadius": 45, "outerRadius": 65},
+            "encoding": {
+                "theta": {"field": "value", "type": "quantitative", "stack": True},
+                "color": {"field": "part", "type": "nominal", "legend": None,
+                          "scale": {"domain": ["progress", "remaining"], "range": [color, "#f0f0f0"]}},
+                "order": {"field": "part", "sort": "ascending"},
+            },
+        },
+        {
+            "data": {"values": [{}]},
+            "mark": {"type": "text", "fontSize": 16, "fontWeight": "bold", "color": color},
+            "encoding": {"text": {"value": texto if texto is not None else f"{progreso:.1f}%"}},
+        },
+    ]
+    spec["view"] = {"stroke": None}
+    return spec
@@ -0,0 +1,177 @@
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+# Error relativo de los cuantiles: cada importe cae en una cubeta logarítmica [γ^(i-1), γ^i) con γ = (1+α)/(1-α)
+ERROR_RELATIVO = 0.01
+# Los importes menores (o nulos) se cuentan en la primera cubeta
+IMPORTE_MINIMO = 0.01
+
+def _log_gamma(error):
+    return np.log((1 + error) / (1 - error))
+
+def cubetas(importes, error=ERROR_RELATIVO):
+    """
+    Índice de cubeta logarítmica de cada importe
+    """
+    importes = np.maximum(np.asarray(importes, dtype=np.float64), IMPORTE_MINIMO)
+    return np.ceil(np.log(importes) / _log_gamma(error)).astype(np.int64)
+
+class Boceto:
+    """
+    Histograma de cubetas logarítmicas (como DDSketch): da cuantiles con error relativo acotado, histogramas
+    y una densidad aproximada sin guardar los importes, y dos bocetos se mezclan sumando sus conteos.
+    conteos[j] es el número de importes de la cubeta primera + j
+    """
+    def __init__(self, conteos, primera, minimo, maximo, error=ERROR_RELATIVO):
+        self.conteos = np.asarray(conteos, dtype=np.int64)
+        self.primera = primera
+        self.minimo = minimo
+        self.maximo = maximo
+        self.error = error
+
+    @classmethod
+    def desde_importes(cls, importes, error=ERROR_RELATIVO):
+        importes = np.asarray(importes, dtype=np.float64)
+        if not len(importes):
+            return cls([], 0, np.nan, np.nan, error)
+        indices = cubetas(importes, error)
+        primera = int(indices.min())
+        return cls(np.bincount(indices - primera), primera, float(importes.min()), float(importes.max()), error)
+
+    @property
+    def n(self):
+        return int(self.conteos.sum())
+
+    def representantes(self):
+        """
+        Valor de cada cubeta: el que está a error relativo de todos los importes de la cubeta, dentro de [mínimo, máximo]
+        """
+        gamma = (1 + self.error) / (1 - self.error)
+        indices = np.arange(self.primera, self.primera + len(self.conteos))
+        return np.clip(2 * gamma ** indices / (gamma + 1), self.minimo, self.maximo)
+
+    def cuantil(self, q):
+        acumulados = np.cumsum(self.conteos)
+        if not len(acumulados) or acumulados[-1] == 0:
+            return float('nan')
+        posicion = np.searchsorted(acumulados, q * (acumulados[-1] - 1), side='right')
+        return float(self.representantes()[posicion])
+
+    def intervalos(self, bins=20):
+        """
+        (conteos, límites) de un histograma de bins intervalos iguales entre el mínimo y el máximo
+        """
+        if self.n == 0:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+        conteos, limites = np.histogram(self.representantes(), bins=bins, range=(self.minimo, self.maximo),
+                                        weights=self.conteos)
+        return conteos.astype(np.int64), limites
+
+    def densidad(self, puntos=200):
+        """
+        Estimación de densidad (KDE gaussiana) agrupada: un núcleo por cubeta con su conteo como peso,
+        en lugar de uno por importe. Ancho de banda de Scott. Devuelve (x, densidad)
+        """
+        x = np.linspace(self.minimo, self.maximo, puntos)
+        n = self.n
+        if n < 2:
+            return x, np.zeros(puntos)
+        ocupadas = self.conteos > 0
+        valores, pesos = self.representantes()[ocupadas], self.conteos[ocupadas]
+        media = np.average(valores, weights=pesos)
+        desviacion = np.sqrt(np.average((valores - media) ** 2, weights=pesos))
+        ancho = 1.06 * desviacion * n ** (-1 / 5) or 1.0
+        nucleos = np.exp(-0.5 * ((x[:, None] - valores[None, :]) / ancho) ** 2)
+        return x, nucleos @ pesos / (n * ancho * np.sqrt(2 * np.pi))
+
+class IndiceDistribuciones:
+    """
+    Conteos por cubeta de cada (type, category, mes) de un ledger (matriz grupos x cubetas, con mínimo y máximo
+    por grupo): el boceto de una selección suma las filas de sus meses completos; los días sueltos de los meses
+    de los extremos se cuentan desde las filas de esos días (ordenadas por fecha), así que el resultado es el
+    mismo que con los importes filtrados
+    """
+    def __init__(self, df, error=ERROR_RELATIVO):
+        self.error = error
+        df = df[df['amount'].notna()] if 'amount' in df.columns else df.iloc[:0]
+        fechas = pd.to_datetime(df['date']) if 'date' in df.columns else pd.Series(pd.NaT, index=df.index)
+        tipos = df['type'] if 'type' in df.columns else pd.Series("", index=df.index)
+        categorias = df['category'] if 'category' in df.columns else pd.Series("", index=df.index)
+        meses = (fechas.dt.year * 12 + fechas.dt.month - 1).fillna(-1).astype(np.int64).to_numpy()
+        # Códigos de cada columna combinados en un entero: factorizar enteros es mucho más rápido que tuplas
+        codigos_tipo, valores_tipo = pd.factorize(tipos, use_na_sentinel=False)
+        codigos_categoria, valores_categoria = pd.factorize(categorias, use_na_sentinel=False)
+        primer_mes = int(meses.min()) if len(meses) else 0
+        n_meses = int(meses.max()) - primer_mes + 1 if len(meses) else 1
+        combinados = (codigos_tipo.astype(np.int64) * len(valores_categoria) + codigos_categoria) * n_meses \
+            + (meses - primer_mes)
+        codigos, unicos = pd.factorize(combinados)
+        resto, mes = np.divmod(unicos, n_meses)
+        tipo, categoria = np.divmod(resto, max(len(valores_categoria), 1))
+        self.grupos = pd.DataFrame({'type': np.asarray(valores_tipo, dtype=object)[tipo].astype(str),
+                                    'category': np.asarray(valores_categoria, dtype=object)[categoria].astype(str),
+                                    'month': mes + primer_mes})
+        self._importes = df['amount'].to_numpy(dtype=np.float64)
+        indices = cubetas(self._importes, error)
+        self.primera = int(indices.min()) if len(indices) else 0
+        self._cubetas = indices - self.primera
+        self._grupo = codigos
+        ancho = int(self._cubetas.max()) + 1 if len(indices) else 1
+        self.matriz = np.bincount(codigos * ancho + self._cubetas,
+                                  minlength=len(unicos) * ancho).reshape(len(unicos), ancho)
+        extremos = pd.Series(self._importes).groupby(codigos).agg(['min', 'max'])
+        self.minimos = extremos['min'].to_numpy()
+        self.maximos = extremos['max'].to_numpy()
+        # Filas ordenadas por fecha para los días sueltos de los extremos
+        self._fechas = fechas.to_numpy(dtype='datetime64[ns]')
+        self._orden = np.argsort(self._fechas, kind='stable')
+        self._fechas_ordenadas = self._fechas[self._orden]
+
+    def _filas_entre(self, inicio, fin):
+        # Filas con fecha en [inicio, fin) (búsqueda binaria sobre las fechas ordenadas)
+        desde, hasta = np.searchsorted(self._fechas_ordenadas, [np.datetime64(inicio, 'ns'), np.datetime64(fin, 'ns')])
+        return self._orden[desde:hasta]
+
+    def boceto(self, tipos=None, categorias=None, inicio=None, fin=None):
+        """
+        Boceto de los importes de unos tipos y categorías (None: todos) entre dos fechas incluidas (None: sin límite)
+        """
+        seleccion = np.ones(len(self.grupos), dtype=bool)
+        if tipos is not None:
+            seleccion &= self.grupos['type'].isin([str(tipo) for tipo in tipos]).to_numpy()
+        if categorias is not None:
+            seleccion &= self.grupos['category'].isin([str(categoria) for categoria in categorias]).to_numpy()
+        meses = self.grupos['month'].to_numpy()
+
+        # Meses enteros dentro del rango: se suman sus filas de la matriz
+        inicio = pd.Timestamp(inicio) if inicio is not None else None
+        fin = pd.Timestamp(fin) + pd.Timedelta(days=1) if fin is not None else None
+        primer_mes = -np.inf if inicio is None else inicio.year * 12 + inicio.month - 1 + (inicio.day > 1)
+        ultimo_mes = np.inf if fin is None else fin.year * 12 + fin.month - 2
+        completos = seleccion & (meses >= primer_mes) & (meses <= ultimo_mes)
+        conteos = self.matriz[completos].sum(axis=0)
+        minimo = self.minimos[completos].min() if completos.any() else np.inf
+        maximo = self.maximos[completos].max() if completos.any() else -np.inf
+
+        # Días de meses incompletos: desde las filas de esos días
+        tramos = []
+        if primer_mes > ultimo_mes:
+            tramos.append((inicio, fin))
+        else:
+            if inicio is not None and inicio.day > 1:
+                tramos.append((inicio, (inicio + pd.offsets.MonthBegin(1)).normalize()))
+            if fin is not None and fin.day > 1:
+                tramos.append((fin.normalize().replace(day=1), fin))
+        for desde, hasta in tramos:
+            filas = self._filas_entre(desde, hasta)
+            filas = filas[seleccion[self._grupo[filas]]]
+            if len(filas):
+                conteos = conteos + np.bincount(self._cubetas[filas], minlength=self.matriz.shape[1])
+                minimo = min(minimo, self._importes[filas].min())
+                maximo = max(maximo, self._importes[filas].max())
+
+        if not conteos.any():
+            return Boceto([], self.primera, np.nan, np.nan, self.error)
+        return Boceto(conteos, self.primera, float(minimo), float(maximo), self.error)
@@ -0,0 +1,125 @@
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+class IndiceFiltros:
+    """
+    Índices de una tabla de transacciones para filtrar por rango de fechas, categoría y rango de importes
+    sin recorrer todas las filas: fechas e importes ordenados (búsqueda binaria) y, por categoría, la lista
+    ordenada de sus filas en orden de fecha. La tabla debe tener las fechas ya convertidas a datetime
+    """
+    def __init__(self, df):
+        self.df = df
+        filas = len(df)
+        # Orden estable por fecha; los NaT (valor mínimo de int64) quedan al principio y se saltan
+        fechas = df['date'].to_numpy(dtype='datetime64[ns]').view(np.int64) if 'date' in df.columns \
+            else np.zeros(filas, dtype=np.int64)
+        self.orden_fecha = np.argsort(fechas, kind='stable')
+        self.fechas = fechas[self.orden_fecha]
+        self.primera_fecha = int(np.searchsorted(self.fechas, np.iinfo(np.int64).min, side='right'))
+        # Posición en orden de fecha de cada fila (permutación inversa)
+        self.rango_de_fila = np.empty(filas, dtype=np.int64)
+        self.rango_de_fila[self.orden_fecha] = np.arange(filas)
+
+        # Listas por categoría: rangos (posiciones en orden de fecha) de sus filas, ya ordenados
+        self.listas = {}
+        self.codigo_de_fila = np.full(filas, -1, dtype=np.int64)
+        self.codigos = {}
+        if 'category' in df.columns:
+            categorias = pd.Categorical(df['category'])
+            self.codigo_de_fila = categorias.codes.astype(np.int64)
+            codigos_por_fecha = self.codigo_de_fila[self.orden_fecha]
+            rangos = np.argsort(codigos_por_fecha, kind='stable')
+            limites = np.searchsorted(codigos_por_fecha[rangos], np.arange(len(categorias.categories) + 1))
+            self.codigos = {categoria: i for i, categoria in enumerate(categorias.categories)}
+            self.listas = {categoria: rangos[limites[i]:limites[i + 1]]
+                           for i, categoria in enumerate(categorias.categories)}
+
+        # Importes ordenados (los NaN quedan al final y se excluyen de los rangos)
+        importes = df['amount'].to_numpy(dtype=np.float64) if 'amount' in df.columns else np.zeros(filas)
+        self.importes_por_fecha = importes[self.orden_fecha]
+        self.orden_importe = np.argsort(importes, kind='stable')
+        self.importes = importes[self.orden_importe]
+        self.validos = int(np.count_nonzero(~np.isnan(importes)))
+
+    def categorias(self):
+        return sorted(self.listas)
+
+    def importe_maximo(self):
+        return float(self.importes[self.validos - 1]) if self.validos else None
+
+    def fechas_extremas(self):
+        if self.primera_fecha >= len(self.fechas):
+            return None, None
+        return pd.Timestamp(self.fechas[self.primera_fecha]), pd.Timestamp(self.fechas[-1])
+
+    def _rango_fechas(self, inicio, fin):
+        # Posiciones [desde, hasta) en orden de fecha para los días inicio..fin (ambos incluidos)
+        desde = self.primera_fecha
+        hasta = len(self.fechas)
+        if inicio is not None:
+            desde = max(desde, int(np.searchsorted(self.fechas, pd.Timestamp(inicio).value, side='left')))
+        if fin is not None:
+            limite = (pd.Timestamp(fin) + pd.Timedelta(days=1)).value
+            hasta = int(np.searchsorted(self.fechas, limite, side='left'))
+        return desde, max(desde, hasta)
+
+    def _rango_importes(self, minimo, maximo):
+        desde = 0 if minimo is None else int(np.searchsorted(self.importes[:self.validos], minimo, side='left'))
+        hasta = self.validos if maximo is None else int(np.searchsorted(self.importes[:self.validos], maximo, side='right'))
+        return desde, max(desde, hasta)
+
+    def seleccionar(self, inicio=None, fin=None, categoria=None, minimo=None, maximo=None):
+        """
+        Posiciones de las filas con fecha en [inicio, fin], la categoría dada (None = todas) e importe en
+        [minimo, maximo], junto con la columna por la que ya salen ordenadas ('date' o 'amount').
+        Recorre solo la selección más pequeña (rango de fechas, lista de la categoría o rango de importes)
+        y comprueba las demás condiciones sobre esas filas
+        """
+        desde, hasta = self._rango_fechas(inicio, fin)
+        desde_importe, hasta_importe = self._rango_importes(minimo, maximo)
+        lista = None
+        if categoria is not None:
+            lista = self.listas.get(categoria, np.empty(0, dtype=np.int64))
+            lista = lista[np.searchsorted(lista, desde):np.searchsorted(lista, hasta)]
+
+        candidatos_fecha = len(lista) if lista is not None else hasta - desde
+        if hasta_importe - desde_importe < candidatos_fecha:
+            # Conduce el rango de importes: las filas salen en orden de importe
+            filas = self.orden_importe[desde_importe:hasta_importe]
+            rango = self.rango_de_fila[filas]
+            filas = filas[(rango >= desde) & (rango < hasta)]
+            if categoria is not None:
+                filas = filas[self.codigo_de_fila[filas] == self.codigos.get(categoria, -2)]
+            por = 'amount'
+        else:
+            # Conduce la fecha (o la lista de la categoría): las filas salen en orden de fecha
+            rango = lista if lista is not None else np.arange(desde, hasta)
+            if minimo is not None or maximo is not None:
+                importes = self.importes_por_fecha[rango]
+                dentro = ~np.isnan(importes)
+                if minimo is not None:
+                    dentro &= importes >= minimo
+                if maximo is not None:
+                    dentro &= importes <= maximo
+                rango = rango[dentro]
+            filas = self.orden_fecha[rango]
+            por = 'date'
+
+        return filas, por
+
+    def tabla(self, seleccion, ordenar_por='date', ascendente=False):
+        """
+        Filas de una selección ordenadas por ordenar_por
+        """
+        filas, por = seleccion
+        resultado = self.df.iloc[filas]
+        if ordenar_por == por:
+            return resultado if ascendente else resultado.iloc[::-1]
+        # Solo se ordena la selección, no la tabla entera
+        return resultado.sort_values(by=ordenar_por, ascending=ascendente, kind='stable')
+
+    def filtrar(self, inicio=None, fin=None, categoria=None, minimo=None, maximo=None,
+                ordenar_por='date', ascendente=False):
+        return self.tabla(self.seleccionar(inicio, fin, categoria, minimo, maximo), ordenar_por, ascendente)
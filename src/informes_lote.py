@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from multiprocessing import Pool
+
+from almacenamiento import cargar_registros
+from main import Finance
+from pool_procesos import iniciar_trabajador
+from recurrentes import con_recurrentes
+from usuarios import obtener_ruta_archivos_usuario
+
+# Directorio donde usuarios.py guarda los datos de cada usuario
+DATA_PATH = 'data'
+
+def listar_usuarios():
+    """
+    Devuelve los nombres de usuario que tienen carpeta de datos
+    """
+    if not os.path.isdir(DATA_PATH):
+        return []
+    return sorted(
+        nombre for nombre in os.listdir(DATA_PATH)
+        if os.path.isdir(os.path.join(DATA_PATH, nombre))
+    )
+
+def cargar_progreso(ruta_progreso):
+    """
+    Devuelve los usuarios cuyo informe ya se generó correctamente en una ejecución anterior
+    """
+    completados = set()
+    if os.path.exists(ruta_progreso):
+        with open(ruta_progreso, 'r') as file:
+            for linea in file:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Línea incompleta si el proceso se interrumpió mientras escribía
+                    continue
+                if entrada.get('status') == 'ok':
+                    completados.add(entrada['username'])
+    return completados
+
+def _escribir_json(datos, ruta):
+    # Escritura atómica para que un informe nunca quede a medias
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w') as file:
+        json.dump(datos, file, indent=2, default=str)
+    os.replace(temporal, ruta)
+
+def generar_informe_usuario(tarea):
+    """
+    Genera el informe mensual (JSON) y el gráfico de gastos (PNG) de un usuario
+    """
+    username, month, destino = tarea
+    try:
+        rutas = obtener_ruta_archivos_usuario(username)
+        finance = Finance(autoload=False)
+        reglas = cargar_registros(rutas['recurring'])
+        finance.incomes = con_recurrentes(cargar_registros(rutas['incomes']), reglas, "income")
+        finance.expenses = con_recurrentes(cargar_registros(rutas['expenses']), reglas, "expense")
+        finance.goals = cargar_registros(rutas['goals'])
+
+        chart_path = os.path.join(destino, f'{username}.png')
+        report = finance.generate_monthly_report(month=month, chart_path=chart_path)
+        if isinstance(report, str):
+            report = {"month": month, "message": report}
+        else:
+            report = {
+                clave: (float(valor) if clave in ('total_income', 'total_expense', 'balance') else valor)
+                for clave, valor in report.items()
+            }
+            if os.path.exists(chart_path):
+                report['chart'] = os.path.basename(chart_path)
+        report['username'] = username
+        _escribir_json(report, os.path.join(destino, f'{username}.json'))
+        return {"username": username, "status": "ok"}
+    except MemoryError:
+        return {"username": username, "status": "error", "error": "memory limit exceeded"}
+    except Exception as e:
+        return {"username": username, "status": "error", "error": str(e)}
+
+def generar_informes(month, destino='informes', procesos=None, limite_memoria_mb=None,
+                     tareas_por_proceso=100, reiniciar=False):
+    """
+    Genera los informes mensuales de todos los usuarios en paralelo, retomando el progreso previo
+    """
+    destino_mes = os.path.join(destino, month)
+    os.makedirs(destino_mes, exist_ok=True)
+    ruta_progreso = os.path.join(destino_mes, 'progreso.jsonl')
+    if reiniciar and os.path.exists(ruta_progreso):
+        os.remove(ruta_progreso)
+
+    completados = cargar_progreso(ruta_progreso)
+    pendientes = [u for u in listar_usuarios() if u not in completados]
+    resumen = {"month": month, "skipped": len(completados), "ok": 0, "error": 0}
+    if not pendientes:
+        return resumen
+
+    tareas = [(username, month, destino_mes) for username in pendientes]
+    # maxtasksperchild recicla los trabajadores para que la memoria no crezca en lotes largos
+    with Pool(processes=procesos, initializer=iniciar_trabajador, initargs=(limite_memoria_mb,),
+              maxtasksperchild=tareas_por_proceso) as pool, open(ruta_progreso, 'a') as progreso:
+        for resultado in pool.imap_unordered(generar_informe_usuario, tareas, chunksize=8):
+            progreso.write(json.dumps(resultado) + '\n')
+            progreso.flush()
+            resumen[resultado['status']] += 1
+    return resumen
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los informes mensuales de todos los usuarios sin interacción")
+    parser.add_argument("--mes", default=datetime.now().strftime('%Y-%m'), help="Mes del informe (YYYY-MM)")
+    parser.add_argument("--destino", default="informes", help="Directorio de salida")
+    parser.add_argument("--procesos", type=int, default=None, help="Número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--memoria-mb", type=int, default=None, help="Límite de memoria por proceso trabajador")
+    parser.add_argument("--tareas-por-proceso", type=int, default=100)
+    parser.add_argument("--reiniciar", action="store_true", help="Ignora el progreso guardado y empieza de cero")
+    args = parser.parse_args(argv)
+
+    try:
+        datetime.strptime(args.mes, '%Y-%m')
+    except ValueError:
+        parser.error("El mes debe tener el formato YYYY-MM")
+
+    resumen = generar_informes(args.mes, args.destino, args.procesos, args.memoria_mb,
+                               args.tareas_por_proceso, args.reiniciar)
+    print(json.dumps(resumen))
+    return 0 if resumen['error'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+from datetime import date, datetime
+from almacenamiento import a_dataframe, concatenar
+from divisas import en_moneda_base
+from recurrentes import expandir
+from indice_filtros import IndiceFiltros
+from proyecciones import proyectar
+from simulacion import probabilidades_metas
+from histogramas import IndiceDistribuciones
+from agregacion_paralela import UMBRAL_FILAS, TablaCompartida
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+class LibroMayor:
+    """
+    Ingresos y gastos en un único DataFrame (primero los ingresos, después los gastos) con una columna type
+    categórica, las fechas ya convertidas y los importes en la moneda base: las vistas por tipo son slices
+    y la vista combinada es el propio DataFrame, sin copias ni concat en cada rerun.
+    Las reglas recurrentes se expanden aquí, en memoria, hasta hoy (o hasta la fecha indicada): sus
+    ocurrencias llevan recurring=True y no se escriben en los archivos
+    """
+    TIPOS = ("Income", "Expense")
+
+    def __init__(self, ingresos, gastos, recurrentes=(), hasta=None):
+        tipos = pd.CategoricalDtype(list(self.TIPOS))
+        hasta = hasta or datetime.now()
+        tablas = []
+        for codigo, registros in enumerate((ingresos, gastos)):
+            tabla = concatenar([a_dataframe(registros),
+                                a_dataframe(expandir(recurrentes, self.TIPOS[codigo].lower(), hasta))])
+            tablas.append(tabla.assign(type=pd.Categorical.from_codes(np.full(len(tabla), codigo, dtype=np.int8),
+                                                                      dtype=tipos)))
+        self.df = concatenar(tablas).reset_index(drop=True)
+        if 'recurring' in self.df.columns:
+            self.df['recurring'] = self.df['recurring'].fillna(False).astype(bool)
+        if 'date' in self.df.columns:
+            self.df['date'] = pd.to_datetime(self.df['date'])
+        # Las transacciones en otras monedas se convierten una vez, con una búsqueda por moneda
+        self.df = en_moneda_base(self.df)
+        self.n_ingresos = len(tablas[0])
+        self._indices = {}
+        self._proyecciones = {}
+        self._distribuciones = None
+        self._tabla_compartida = None
+        self._probabilidades = {}
+
+    @property
+    def ingresos(self):
+        return self.df.iloc[:self.n_ingresos]
+
+    @property
+    def gastos(self):
+        return self.df.iloc[self.n_ingresos:]
+
+    @property
+    def todo(self):
+        return self.df
+
+    def indice_filtros(self, tipo):
+        """
+        Índice de filtros de las filas de un tipo ("Income" / "Expense"), construido la primera vez que se pide
+        """
+        if tipo not in self._indices:
+            vista = self.ingresos if tipo == "Income" else self.gastos
+            self._indices[tipo] = IndiceFiltros(vista.drop(columns='type', errors='ignore'))
+        return self._indices[tipo]
+
+    def proyeccion(self, meses=12, modelo="auto"):
+        """
+        Proyección mensual por tipo y categoría (proyecciones.proyectar), calculada una vez por horizonte y modelo
+        """
+        if (meses, modelo) not in self._proyecciones:
+            self._proyecciones[meses, modelo] = proyectar(self.df, meses, modelo)
+        return self._proyecciones[meses, modelo]
+
+    def probabilidades_metas(self, metas, actuales, caminos=10_000, procesos=1):
+        """
+        Probabilidad de cumplir cada meta (simulacion.probabilidades_metas), calculada una vez por metas, importes
+        actuales, caminos y día: el ledger se reconstruye cuando cambian los datos, así que no hace falta más clave
+        """
+        clave = (tuple((str(meta.get("category")), str(meta.get("target_amount")), str(meta.get("deadline")))
+                       for meta in metas), tuple(float(actual) for actual in actuales), caminos, date.today())
+        if clave not in self._probabilidades:
+            self._probabilidades[clave] = probabilidades_metas(metas, self.df, actuales, caminos, procesos=procesos)
+        return list(self._probabilidades[clave])
+
+    def indice_distribuciones(self):
+        """
+        Índice de histogramas por tipo, categoría y mes (histogramas.IndiceDistribuciones), construido la primera vez
+        """
+        if self._distribuciones is None:
+            self._distribuciones = IndiceDistribuciones(self.df)
+        return self._distribuciones
+
+    def sumar_por_grupo(self, columna, tipos=None, categorias=None, inicio=None, fin=None, procesos=None):
+        """
+        Importes por category / description de unos tipos y categorías (None: todos) entre dos fechas incluidas
+        (None: sin límite), los mismos filtros que boceto(). Con ledgers muy grandes las filas se reparten entre
+        procesos desde una TablaCompartida (ordenada por tipo y fecha) que se copia la primera vez
+        """
+        if len(self.df) >= UMBRAL_FILAS:
+            if self._tabla_compartida is None:
+                self._tabla_compartida = TablaCompartida(self.df, particion='type')
+            return self._tabla_compartida.sumar(columna, tipos, categorias, inicio, fin, procesos)
+        filtro = np.ones(len(self.df), dtype=bool)
+        if tipos is not None:
+            filtro &= self.df['type'].isin(tipos).to_numpy()
+        if categorias is not None:
+            filtro &= self.df['category'].isin(categorias).to_numpy()
+        if inicio is not None:
+            filtro &= (self.df['date'] >= pd.Timestamp(inicio)).to_numpy()
+        if fin is not None:
+            filtro &= (self.df['date'] < pd.Timestamp(fin) + pd.Timedelta(days=1)).to_numpy()
+        return self.df[filtro].groupby(columna, observed=True)['amount'].sum()
+
+    def total(self, tipo, categoria=None, inicio=None, fin=None):
+        """
+        Suma de importes (moneda base) de un tipo, opcionalmente de una categoría y de las fechas [inicio, fin)
+        """
+        vista = self.ingresos if tipo == "Income" else self.gastos
+        if vista.empty:
+            return 0.0
+        filtro = np.ones(len(vista), dtype=bool)
+        if categoria is not None and 'category' in vista.columns:
+            filtro &= (vista['category'] == categoria).to_numpy()
+        if inicio is not None:
+            filtro &= (vista['date'] >= pd.Timestamp(inicio)).to_numpy()
+        if fin is not None:
+            filtro &= (vista['date'] < pd.Timestamp(fin)).to_numpy()
+        return float(vista['amount'].to_numpy()[filtro].sum())
+
+    def importe_firmado(self):
+        """
+        Importes con signo (gastos en negativo) a partir de type (comparación de códigos), sin columnas nuevas
+        """
+        importes = self.df['amount'].to_numpy(dtype=np.float64)
+        return np.where((self.df['type'] == "Expense").to_numpy(), -importes, importes)
+
+    def recientes(self, n):
+        """
+        Las n transacciones más recientes (a igual fecha, en el orden del ledger) sin ordenar el ledger entero
+        """
+        if self.df.empty:
+            return self.df
+        return self.df.loc[self.df['date'].nlargest(n, keep='first').index]
@@ -0,0 +1,142 @@
+import argparse
+import csv
+import json
+import sys
+
+from main import Finance
+from categorizacion import cargar_categorizador
+
+COLUMNAS = ["type", "amount", "description", "category", "date", "currency", "merchant"]
+
+def leer_lote(origen, formato=None, tipo=None):
+    """
+    Lee transacciones de un archivo CSV o JSON Lines ('-' para la entrada estándar)
+    """
+    if formato is None:
+        formato = "jsonl" if origen.endswith((".jsonl", ".json")) else "csv"
+
+    file = sys.stdin if origen == "-" else open(origen, "r", newline="")
+    try:
+        if formato == "jsonl":
+            filas = [json.loads(linea) for linea in file if linea.strip()]
+        else:
+            filas = list(csv.DictReader(file))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+    # Archivos sin columna "type" (p. ej. incomes.csv de la app web)
+    if tipo is not None:
+        for fila in filas:
+            fila.setdefault("type", tipo)
+    return filas
+
+def escribir_salida(texto, salida):
+    if salida in (None, "-"):
+        sys.stdout.write(texto)
+    else:
+        with open(salida, "w", newline="") as file:
+            file.write(texto)
+
+def comando_add(finance, args):
+    return finance.add_transactions([{
+        "type": args.type, "amount": args.amount, "category": args.category,
+        "description": args.description, "date": args.date,
+    }])
+
+def comando_import(finance, args):
+    filas = []
+    for origen in args.archivos:
+        filas.extend(leer_lote(origen, args.formato, args.tipo))
+    if args.categorizar:
+        # Extractos sin categoría: reglas de config/categorizacion.yaml y comercios de la taxonomía
+        categorizador = cargar_categorizador(args.columna_texto)
+        filas = [categorizador.categorizar(fila) for fila in filas]
+    return finance.add_transactions(filas)
+
+def comando_report(finance, args):
+    # Sin --grafico no se dibuja nada: la línea de comandos nunca abre ventanas
+    report = finance.generate_monthly_report(month=args.mes, chart_path=args.grafico, show_chart=False)
+    if isinstance(report, str):
+        report = {"message": report}
+    return {clave: (float(valor) if isinstance(valor, (int, float)) else valor) for clave, valor in report.items()}
+
+def comando_balance(finance, args):
+    # Los tres importes en la moneda base, con la misma conversión
+    total_income = finance.total_amount(finance.incomes)
+    total_expense = finance.total_amount(finance.expenses)
+    return {"total_income": total_income, "total_expense": total_expense, "balance": total_income - total_expense}
+
+def comando_export(finance, args):
+    filas = [dict(item, type="income") for item in finance.incomes] + \
+            [dict(item, type="expense") for item in finance.expenses]
+    if args.formato == "xlsx":
+        import pandas as pd
+        if args.salida in (None, "-"):
+            raise ValueError("La exportación a Excel necesita --salida")
+        with pd.ExcelWriter(args.salida) as writer:
+            pd.DataFrame(finance.incomes).to_excel(writer, sheet_name="Ingresos", index=False)
+            pd.DataFrame(finance.expenses).to_excel(writer, sheet_name="Gastos", index=False)
+    elif args.formato == "jsonl":
+        escribir_salida("".join(json.dumps({c: fila[c] for c in COLUMNAS if c in fila}) + "\n" for fila in filas), args.salida)
+    else:
+        with (sys.stdout if args.salida in (None, "-") else open(args.salida, "w", newline="")) as file:
+            writer = csv.DictWriter(file, fieldnames=COLUMNAS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(filas)
+    return None
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="finansmart", description="FinanSmart en modo no interactivo")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    add = subparsers.add_parser("add", help="Añade una transacción")
+    add.add_argument("type", choices=["income", "expense"])
+    add.add_argument("amount", type=float)
+    add.add_argument("category")
+    add.add_argument("description")
+    add.add_argument("--date", default=None, help="Fecha YYYY-MM-DD (por defecto, hoy)")
+    add.set_defaults(funcion=comando_add)
+
+    importar = subparsers.add_parser("import", help="Importa un lote de transacciones en una sola escritura")
+    importar.add_argument("archivos", nargs="*", default=["-"], help="Archivos CSV/JSONL ('-' = entrada estándar)")
+    importar.add_argument("--formato", choices=["csv", "jsonl"], default=None)
+    importar.add_argument("--tipo", choices=["income", "expense"], default=None,
+                          help="Tipo para las filas que no tienen columna 'type'")
+    importar.add_argument("--categorizar", action="store_true",
+                          help="Categoriza las filas sin categoría con las reglas de config/categorizacion.yaml")
+    importar.add_argument("--columna-texto", default="description",
+                          help="Columna con el concepto que leen las reglas (por defecto, description)")
+    importar.set_defaults(funcion=comando_import)
+
+    report = subparsers.add_parser("report", help="Informe mensual en JSON")
+    report.add_argument("--mes", default=None, help="Mes YYYY-MM (por defecto, el actual)")
+    report.add_argument("--grafico", default=None, help="Ruta donde guardar el gráfico de gastos")
+    report.set_defaults(funcion=comando_report)
+
+    balance = subparsers.add_parser("balance", help="Totales y balance en JSON")
+    balance.set_defaults(funcion=comando_balance)
+
+    export = subparsers.add_parser("export", help="Exporta todas las transacciones")
+    export.add_argument("--formato", choices=["csv", "jsonl", "xlsx"], default="csv")
+    export.add_argument("--salida", default=None, help="Archivo de salida ('-' o nada = salida estándar)")
+    export.set_defaults(funcion=comando_export)
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    finance = Finance()
+    try:
+        resultado = args.funcion(finance, args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if isinstance(resultado, int):
+        print(json.dumps({"added": resultado}))
+    elif resultado is not None:
+        print(json.dumps(resultado))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
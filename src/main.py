@@ -1,20 +1,48 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import csv
+import math
+import os
+import sys
 from datetime import datetime
 import warnings
+from carga_perezosa import importar_perezoso
+from graficos import figura, spec_barras, spec_tarta, spec_lineas
+from taxonomia import TAXONOMIA_POR_DEFECTO, cargar_taxonomia
+from divisas import cargar_tipos_cambio, en_moneda_base
+from libro_mayor import LibroMayor
+from proyecciones import fechas_metas
+from presupuestos import LIMITE_RECOMENDACION_POR_DEFECTO, LIMITES_RECOMENDACION, Presupuestos
+
+# pandas, matplotlib y seaborn se cargan la primera vez que se usan (el menú del CLI no los necesita)
+pd = importar_perezoso("pandas")
+plt = importar_perezoso("matplotlib.pyplot")
+sns = importar_perezoso("seaborn")
 
 # Ignorar FutureWarning de pandas
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
+# Categorías y descripciones por defecto (la taxonomía configurable está en config/taxonomia.yaml)
+INCOME_CATEGORIES = list(TAXONOMIA_POR_DEFECTO["income"])
+EXPENSE_CATEGORIES = list(TAXONOMIA_POR_DEFECTO["expense"])
+# Diccionario plano por compatibilidad: "Other" existe en los dos tipos y se queda con el de gastos
+DESCRIPTIONS = {
+    categoria: list(descripciones)
+    for tipo in ("income", "expense")
+    for categoria, descripciones in TAXONOMIA_POR_DEFECTO[tipo].items()
+}
+
 class Finance:
-    def __init__(self):
+    def __init__(self, autoload=True):
         self.incomes = []
         self.expenses = []
         self.goals = []
-        self.load_data()
-        self.load_goals()
+        # Presupuestos mensuales por categoría (filas category, limit)
+        self.budgets = []
+        # Ledger unificado de las listas actuales (ver libro_mayor)
+        self._libro = None
+        # Con autoload=False los datos se asignan desde fuera (p. ej. los CSV de cada usuario)
+        if autoload:
+            self.load_data()
+            self.load_goals()
 
     def add_income(self, amount, description, category, date=None):
         if date is None:
@@ -28,14 +56,80 @@ class Finance:
         self.expenses.append({"amount": amount, "description": description, "category": category, "date": date})
         self.save_data()
 
+    def validate_transaction(self, transaction, taxonomia=None, tabla=None):
+        # Los lotes cargan la taxonomía y los tipos de cambio una vez y los pasan a cada fila
+        type = str(transaction.get("type", "")).strip().lower()
+        if type not in ("income", "expense"):
+            raise ValueError(f"tipo no válido '{transaction.get('type')}' (income/expense)")
+        try:
+            amount = float(transaction.get("amount", ""))
+        except (TypeError, ValueError):
+            raise ValueError(f"cantidad no válida '{transaction.get('amount')}'")
+        if not math.isfinite(amount) or amount <= 0:
+            raise ValueError("la cantidad debe ser un número positivo")
+        category = str(transaction.get("category", "")).strip()
+        categories = (taxonomia or cargar_taxonomia()).categorias(type)
+        if category not in categories:
+            raise ValueError(f"categoría no válida para {type}: '{category}'")
+        description = str(transaction.get("description", "")).strip()
+        if not description:
+            raise ValueError("falta la descripción")
+        date = str(transaction.get("date") or "").strip() or datetime.now().strftime("%Y-%m-%d")
+        datetime.strptime(date, "%Y-%m-%d")
+        # Sin moneda, la moneda base; una moneda sin tipos de cambio no se podría convertir después
+        tabla = tabla or cargar_tipos_cambio()
+        currency = str(transaction.get("currency") or "").strip().upper() or tabla.base
+        if currency not in tabla.divisas():
+            raise ValueError(f"moneda sin tipos de cambio: '{currency}' (disponibles: {', '.join(tabla.divisas())})")
+        row = {"amount": amount, "description": description, "category": category, "date": date, "currency": currency}
+        merchant = str(transaction.get("merchant") or "").strip()
+        if merchant:
+            row["merchant"] = merchant
+        return type, row
+
+    def add_transactions(self, transactions):
+        # Se valida todo el lote antes de aplicar nada y se escribe el archivo una sola vez
+        validated = []
+        errors = []
+        taxonomia, tabla = cargar_taxonomia(), cargar_tipos_cambio()
+        for i, transaction in enumerate(transactions, 1):
+            try:
+                validated.append(self.validate_transaction(transaction, taxonomia, tabla))
+            except ValueError as e:
+                errors.append(f"Fila {i}: {e}")
+        if errors:
+            raise ValueError("\n".join(errors))
+
+        for type, row in validated:
+            if type == "income":
+                self.incomes.append(row)
+            else:
+                self.expenses.append(row)
+        self.save_data()
+        return len(validated)
+
+    def total_amount(self, records, category=None):
+        """
+        Suma de importes en la moneda base: las transacciones con otra moneda (campo currency) se convierten
+        con la tabla de tipos de cambio, todas a la vez
+        """
+        if category is not None:
+            records = [item for item in records if item.get("category") == category]
+        base = cargar_tipos_cambio().base
+        if all(item.get("currency", base) == base for item in records):
+            return sum(item["amount"] for item in records)
+        return float(en_moneda_base(pd.DataFrame(records))["amount"].sum())
+
     def calculate_balance(self):
-        total_incomes = sum(item["amount"] for item in self.incomes)
-        total_expenses = sum(item["amount"] for item in self.expenses)
-        return total_incomes - total_expenses
+        return self.total_amount(self.incomes) - self.total_amount(self.expenses)
 
-    def generate_charts(self):
-        df_incomes = pd.DataFrame(self.incomes)
-        df_expenses = pd.DataFrame(self.expenses)
+    def generate_charts(self, backend="matplotlib"):
+        df_incomes = en_moneda_base(pd.DataFrame(self.incomes))
+        df_expenses = en_moneda_base(pd.DataFrame(self.expenses))
+
+        # Con backend="vega" se devuelven las especificaciones Vega-Lite con los datos ya agregados
+        if backend == "vega":
+            return self.generate_chart_specs(df_incomes, df_expenses)
 
         fig, ax = plt.subplots(4, 1, figsize=(12, 24))
 
@@ -78,6 +172,23 @@ class Finance:
 
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
+
+    def generate_chart_specs(self, df_incomes, df_expenses):
+        specs = []
+        if not df_incomes.empty:
+            incomes_grouped = df_incomes.groupby(["description", "category"])["amount"].sum().reset_index()
+            specs.append(spec_barras(incomes_grouped, "description", "amount", "Incomes", color="category"))
+        if not df_expenses.empty:
+            expenses_grouped = df_expenses.groupby(["description", "category"])["amount"].sum().reset_index()
+            specs.append(spec_barras(expenses_grouped, "description", "amount", "Expenses", color="category", esquema="magma"))
+            specs.append(spec_tarta(df_expenses.groupby("description")["amount"].sum(), "Expense Distribution", esquema="magma"))
+
+            df_expenses = df_expenses.assign(month_year=pd.to_datetime(df_expenses['date']).dt.to_period('M').astype(str))
+            df_expenses_grouped_monthly = df_expenses.groupby(['month_year', 'category'])['amount'].sum().reset_index()
+            specs.append(spec_lineas(df_expenses_grouped_monthly, "month_year", "amount", "Monthly Expense Evolution",
+                                     color="category", x_titulo="Month-Year"))
+        return specs
 
     def generate_table(self):
         df_incomes = pd.DataFrame(self.incomes)
@@ -91,9 +202,9 @@ class Finance:
         if not self.incomes and not self.expenses:
             return ["No data available to generate recommendations. Please add your income and expenses."]
 
-        balance = self.calculate_balance()
-        total_incomes = sum(item["amount"] for item in self.incomes)
-        total_expenses = sum(item["amount"] for item in self.expenses)
+        total_incomes = self.total_amount(self.incomes)
+        total_expenses = self.total_amount(self.expenses)
+        balance = total_incomes - total_expenses
         recommendations = []
 
         if balance > 0:
@@ -117,28 +228,11 @@ class Finance:
             recommendations.append("Review your expenses and look for areas where you can cut back to increase your savings.")
 
         # Specific recommendations by category
-        categories = ["Food", "Transportation", "Housing", "Entertainment", "Health", "Education", "Utilities", "Insurance", "Debt", "Savings", "Gifts", "Travel", "Other"]
-        category_limits = {
-            "Food": 15,
-            "Transportation": 10,
-            "Housing": 30,
-            "Entertainment": 10,
-            "Health": 10,
-            "Education": 10,
-            "Utilities": 10,
-            "Insurance": 10,
-            "Debt": 10,
-            "Savings": 20,
-            "Gifts": 5,
-            "Travel": 5,
-            "Other": 5
-        }
-
-        for category in categories:
-            total_category = sum(expense["amount"] for expense in self.expenses if expense["category"] == category)
+        for category in LIMITES_RECOMENDACION:
+            total_category = self.total_amount(self.expenses, category)
             if total_category > 0 and total_expenses > 0:
                 category_percentage = (total_category / total_expenses) * 100
-                limit = category_limits.get(category, 10)
+                limit = LIMITES_RECOMENDACION.get(category, LIMITE_RECOMENDACION_POR_DEFECTO)
                 if category_percentage > limit:
                     recommendations.append(f"You have spent {category_percentage:.2f}% on {category}. Consider reducing these expenses if they are high.")
 
@@ -151,37 +245,54 @@ class Finance:
                 recommendations.append("Great job! Your savings rate is more than 20%. Keep up the good work.")
 
         if any(expense["category"] == "Debt" for expense in self.expenses):
-            total_debt = sum(expense["amount"] for expense in self.expenses if expense["category"] == "Debt")
+            total_debt = self.total_amount(self.expenses, "Debt")
             debt_percentage = (total_debt / total_expenses) * 100
             if debt_percentage > 20:
                 recommendations.append(f"You have spent {debt_percentage:.2f}% on debt payments. Consider strategies to reduce your debt.")
 
         if any(expense["category"] == "Savings" for expense in self.expenses):
-            total_savings = sum(expense["amount"] for expense in self.expenses if expense["category"] == "Savings")
+            total_savings = self.total_amount(self.expenses, "Savings")
             savings_percentage = (total_savings / total_expenses) * 100
             if savings_percentage < 10:
                 recommendations.append(f"You have saved {savings_percentage:.2f}% of your income. Try to increase your savings rate.")
 
+        # Presupuestos del usuario superados este mes
+        if self.budgets:
+            budgets = Presupuestos.desde_registros(en_moneda_base(pd.DataFrame(self.expenses)),
+                                                   Presupuestos.limites_desde_registros(self.budgets))
+            for category, spent, limit in budgets.alertas(datetime.now()):
+                recommendations.append(f"You are over your {category} budget this month: {spent:.2f} spent of {limit:.2f}.")
+
         return recommendations
 
     def save_data(self):
-        with open('finances.csv', mode='w', newline='') as file:
+        # Se escribe en un temporal y se reemplaza, así el archivo nunca queda a medias.
+        # currency y merchant van vacíos en las filas que no los tienen (moneda base, sin comercio)
+        with open('finances.csv.tmp', mode='w', newline='') as file:
             writer = csv.writer(file)
-            writer.writerow(["type", "amount", "description", "category", "date"])
-            for income in self.incomes:
-                writer.writerow(["income", income["amount"], income["description"], income["category"], income["date"]])
-            for expense in self.expenses:
-                writer.writerow(["expense", expense["amount"], expense["description"], expense["category"], expense["date"]])
+            writer.writerow(["type", "amount", "description", "category", "date", "currency", "merchant"])
+            for type, records in (("income", self.incomes), ("expense", self.expenses)):
+                for item in records:
+                    writer.writerow([type, item["amount"], item["description"], item["category"], item["date"],
+                                     item.get("currency", ""), item.get("merchant", "")])
+        os.replace('finances.csv.tmp', 'finances.csv')
 
     def load_data(self):
         try:
             with open('finances.csv', mode='r') as file:
                 reader = csv.DictReader(file)
                 for row in reader:
+                    # Las categorías y descripciones se repiten en cada fila: todas comparten la misma cadena
+                    transaction = {"amount": float(row["amount"]), "description": sys.intern(row["description"]),
+                                   "category": sys.intern(row["category"]), "date": row["date"]}
+                    # Archivos anteriores sin estas columnas: moneda base y sin comercio
+                    for field in ("currency", "merchant"):
+                        if row.get(field):
+                            transaction[field] = sys.intern(row[field])
                     if row["type"] == "income":
-                        self.incomes.append({"amount": float(row["amount"]), "description": row["description"], "category": row["category"], "date": row["date"]})
+                        self.incomes.append(transaction)
                     elif row["type"] == "expense":
-                        self.expenses.append({"amount": float(row["amount"]), "description": row["description"], "category": row["category"], "date": row["date"]})
+                        self.expenses.append(transaction)
         except FileNotFoundError:
             pass
 
@@ -220,20 +331,39 @@ class Finance:
         except FileNotFoundError:
             self.goals = []
 
-    def track_goals_progress(self):
+    def libro_mayor(self):
+        """
+        LibroMayor de los ingresos y gastos actuales, reutilizado (con sus proyecciones y simulaciones) mientras
+        no cambien: Finance solo añade filas a las listas, y quien las cambia desde fuera las sustituye
+        """
+        tamanos = (len(self.incomes), len(self.expenses))
+        if self._libro is None or self._libro[0] is not self.incomes or self._libro[1] is not self.expenses \
+                or self._libro[2] != tamanos:
+            self._libro = (self.incomes, self.expenses, tamanos, LibroMayor(self.incomes, self.expenses))
+        return self._libro[3]
+
+    def forecast(self, months=12, model="auto"):
+        """
+        Proyección mensual por tipo y categoría (ver proyecciones.proyectar), con los importes en la moneda base
+        """
+        return self.libro_mayor().proyeccion(months, model)
+
+    def track_goals_progress(self, months=24, paths=10_000):
         if not self.goals:
             return "No hay metas financieras establecidas."
         
         results = []
+        current_amounts = []
         for goal in self.goals:
+            current_savings = None
             if goal["category"] == "saving":
                 # Para metas de ahorro
-                current_savings = sum(item["amount"] for item in self.incomes if item["category"] == "Savings")
+                current_savings = self.total_amount(self.incomes, "Savings")
                 progress = (current_savings / goal["target_amount"]) * 100
             elif goal["category"] == "expense_reduction":
                 # Para metas de reducción de gastos
                 category = goal["name"].split("_")[-1]
-                current_expense = sum(item["amount"] for item in self.expenses if item["category"] == category)
+                current_expense = self.total_amount(self.expenses, category)
                 progress = 100 - (current_expense / goal["target_amount"]) * 100
             else:
                 # Meta genérica
@@ -241,21 +371,33 @@ class Finance:
             
             results.append({
                 "name": goal["name"],
-                "target": goal["target_amount"],
+                "target": float(goal["target_amount"]),
                 "deadline": goal["deadline"],
-                "progress": min(100, max(0, progress))
+                "progress": float(min(100, max(0, progress)))
             })
+            current_amounts.append(current_savings if current_savings is not None
+                                   else goal["target_amount"] * results[-1]["progress"] / 100)
+        
+        # Fecha prevista de cada meta con la proyección de los próximos meses y probabilidad de llegar
+        # a tiempo (Monte Carlo sobre los meses de la historia), todas las metas a la vez
+        ledger = self.libro_mayor()
+        projected, on_track = fechas_metas(self.goals, ledger.proyeccion(months), current_amounts)
+        chances = ledger.probabilidades_metas(self.goals, current_amounts, paths)
+        for result, date, in_time, chance in zip(results, projected, on_track, chances):
+            result["projected_date"] = date
+            result["on_track"] = in_time
+            result["probability"] = chance
         
         return results
 
     # Función para generar reporte mensual
-    def generate_monthly_report(self):
+    def generate_monthly_report(self, month=None, chart_path=None, show_chart=True):
         if not self.incomes and not self.expenses:
             return "No hay datos para generar un informe mensual."
         
-        # Convertir a DataFrame
-        df_incomes = pd.DataFrame(self.incomes)
-        df_expenses = pd.DataFrame(self.expenses)
+        # Convertir a DataFrame (importes en la moneda base)
+        df_incomes = en_moneda_base(pd.DataFrame(self.incomes))
+        df_expenses = en_moneda_base(pd.DataFrame(self.expenses))
         
         # Añadir fechas
         if not df_incomes.empty:
@@ -266,8 +408,8 @@ class Finance:
             df_expenses['date'] = pd.to_datetime(df_expenses['date'])
             df_expenses['month'] = df_expenses['date'].dt.strftime('%Y-%m')
         
-        # Obtener mes actual
-        current_month = datetime.now().strftime('%Y-%m')
+        # Obtener mes del informe (por defecto el actual)
+        current_month = month or datetime.now().strftime('%Y-%m')
         
         # Filtrar para el mes actual
         month_incomes = df_incomes[df_incomes['month'] == current_month] if not df_incomes.empty else pd.DataFrame()
@@ -279,8 +421,19 @@ class Finance:
         month_balance = total_month_income - total_month_expense
         
         # Crear gráfico de donut para gastos del mes
-        if not month_expenses.empty:
-            plt.figure(figsize=(10, 6))
+        if not month_expenses.empty and chart_path is not None:
+            # Sin ventana: se guarda el gráfico en un archivo
+            with figura(figsize=(10, 6)) as (fig, ax):
+                category_totals = month_expenses.groupby('category')['amount'].sum()
+                ax.pie(category_totals, labels=category_totals.index, autopct='%1.1f%%',
+                       startangle=90, wedgeprops=dict(width=0.5))
+                ax.set_title(f'Distribución de gastos - {current_month}')
+                ax.axis('equal')
+                fig.tight_layout()
+                fig.savefig(chart_path)
+        elif not month_expenses.empty and show_chart:
+            # Menú interactivo: se abre la ventana del gráfico
+            fig = plt.figure(figsize=(10, 6))
             category_totals = month_expenses.groupby('category')['amount'].sum()
             plt.pie(category_totals, labels=category_totals.index, autopct='%1.1f%%', 
                     startangle=90, wedgeprops=dict(width=0.5))
@@ -288,6 +441,7 @@ class Finance:
             plt.axis('equal')
             plt.tight_layout()
             plt.show()
+            plt.close(fig)
         
         return {
             "month": current_month,
@@ -357,8 +511,8 @@ def add_transaction(finance, type, categories, descriptions):
 
 def display_balance(finance):
     balance = finance.calculate_balance()
-    total_income = sum(item["amount"] for item in finance.incomes)
-    total_expenses = sum(item["amount"] for item in finance.expenses)
+    total_income = finance.total_amount(finance.incomes)
+    total_expenses = finance.total_amount(finance.expenses)
     
     print("\n===== RESUMEN FINANCIERO =====")
     print(f"Ingresos totales: {total_income:.2f}")
@@ -426,6 +580,11 @@ def display_goals(finance):
         print(f"  Objetivo: {goal['target']:.2f}")
         print(f"  Fecha límite: {goal['deadline']}")
         print(f"  Progreso: {goal['progress']:.2f}%")
+        if goal.get('projected_date'):
+            estado = "a tiempo" if goal['on_track'] else "fuera de plazo"
+            print(f"  Fecha prevista: {goal['projected_date']} ({estado})")
+        if goal.get('probability') is not None:
+            print(f"  Probabilidad de cumplirla a tiempo: {goal['probability'] * 100:.1f}%")
         
         # Visualización simple de la barra de progreso
         progress_bar = "█" * int(goal['progress'] / 5) + "░" * (20 - int(goal['progress'] / 5))
@@ -434,27 +593,9 @@ def display_goals(finance):
 
 def main():
     finance = Finance()
-    income_categories = ["Salary", "Bonus", "Investment", "Other"]
-    expense_categories = ["Food", "Transportation", "Housing", "Entertainment", "Health", "Education", "Utilities", "Insurance", "Debt", "Savings", "Gifts", "Travel", "Other"]
-    descriptions = {
-        "Salary": ["Monthly Salary", "Freelance Work", "Part-time Job", "Consulting"],
-        "Bonus": ["Year-end Bonus", "Performance Bonus", "Referral Bonus", "Holiday Bonus"],
-        "Investment": ["Stock Dividends", "Real Estate Income", "Interest Income", "Cryptocurrency Gains"],
-        "Other": ["Gift", "Lottery", "Inheritance", "Found Money"],
-        "Food": ["Groceries", "Dining Out", "Snacks", "Beverages"],
-        "Transportation": ["Gas", "Public Transport", "Car Maintenance", "Parking Fees"],
-        "Housing": ["Rent", "Mortgage", "Property Taxes", "Home Repairs"],
-        "Entertainment": ["Movies", "Concerts", "Streaming Services", "Games"],
-        "Health": ["Doctor Visit", "Medication", "Health Insurance", "Gym Membership"],
-        "Education": ["Tuition", "Books", "Online Courses", "Workshops"],
-        "Utilities": ["Electricity", "Water", "Internet", "Phone"],
-        "Insurance": ["Car Insurance", "Home Insurance", "Life Insurance", "Health Insurance"],
-        "Debt": ["Credit Card Payment", "Loan Payment", "Mortgage Payment", "Student Loan Payment"],
-        "Savings": ["Emergency Fund", "Retirement Fund", "Investment Account", "Savings Account"],
-        "Gifts": ["Birthday Gifts", "Holiday Gifts", "Wedding Gifts", "Charity"],
-        "Travel": ["Flights", "Hotels", "Car Rental", "Activities"],
-        "Other": ["Miscellaneous", "Unexpected Expenses", "Pet Expenses", "Subscriptions"]
-    }
+    taxonomia = cargar_taxonomia()
+    income_categories = taxonomia.categorias("income")
+    expense_categories = taxonomia.categorias("expense")
     
     while True:
         print("\n===== FINANSMART MENU =====")
@@ -472,9 +613,9 @@ def main():
         option = input("\nSelecciona una opción: ").strip()
         
         if option == "1":
-            add_transaction(finance, "income", income_categories, descriptions)
+            add_transaction(finance, "income", income_categories, taxonomia.descripciones_por_categoria("income"))
         elif option == "2":
-            add_transaction(finance, "expense", expense_categories, descriptions)
+            add_transaction(finance, "expense", expense_categories, taxonomia.descripciones_por_categoria("expense"))
         elif option == "3":
             display_balance(finance)
         elif option == "4":
@@ -509,4 +650,8 @@ def main():
             print("Opción no válida. Inténtalo de nuevo.")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Modo no interactivo: python main.py <subcomando> ...
+        from linea_comandos import main as main_linea_comandos
+        sys.exit(main_linea_comandos(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -0,0 +1,203 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Cubos por defecto (segundos), los mismos que usan los clientes oficiales de Prometheus
+CUBOS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Cubos para tamaños (filas, bytes): potencias de 4
+CUBOS_TAMANO = tuple(4 ** i for i in range(1, 13))
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+def _formatear_etiquetas(nombres, valores, extra=None):
+    pares = list(zip(nombres, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    texto = ",".join(
+        '{}="{}"'.format(nombre, str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for nombre, valor in pares
+    )
+    return "{" + texto + "}"
+
+def _formatear_numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._cerrojo = threading.Lock()
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._cerrojo:
+            for clave, valor in sorted(self._valores.items()):
+                lineas.extend(self._lineas(clave, valor))
+        return lineas
+
+    def _lineas(self, clave, valor):
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}"]
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._cerrojo:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+class Indicador(_Metrica):
+    tipo = "gauge"
+
+    def set(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._cerrojo:
+            self._valores[clave] = valor
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._cerrojo:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubos=CUBOS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubos = tuple(sorted(cubos))
+
+    def observe(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        indice = bisect.bisect_left(self.cubos, valor)
+        with self._cerrojo:
+            entrada = self._valores.get(clave)
+            if entrada is None:
+                # [cuentas por cubo (sin acumular, la última es +Inf), suma, número de observaciones]
+                entrada = self._valores[clave] = [[0] * (len(self.cubos) + 1), 0.0, 0]
+            entrada[0][indice] += 1
+            entrada[1] += valor
+            entrada[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """
+        Observa la duración (segundos) del bloque
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **etiquetas)
+
+    def _lineas(self, clave, valor):
+        cuentas, suma, total = valor
+        lineas = []
+        acumulado = 0
+        for limite, cuenta in zip(self.cubos + (float("inf"),), cuentas):
+            acumulado += cuenta
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave, ("le", _formatear_numero(float(limite))))
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+        etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+        lineas.append(f"{self.nombre}_sum{etiquetas} {_formatear_numero(float(suma))}")
+        lineas.append(f"{self.nombre}_count{etiquetas} {total}")
+        return lineas
+
+class Registro:
+    """
+    Conjunto de métricas de la aplicación; obtener la misma métrica dos veces devuelve la misma instancia
+    """
+    def __init__(self):
+        self._metricas = {}
+        self._cerrojo = threading.Lock()
+
+    def _obtener(self, clase, nombre, ayuda, etiquetas, **kwargs):
+        with self._cerrojo:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, ayuda, etiquetas, **kwargs)
+            elif not isinstance(metrica, clase):
+                raise ValueError(f"La métrica {nombre} ya existe con otro tipo")
+            return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def indicador(self, nombre, ayuda, etiquetas=()):
+        return self._obtener(Indicador, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), cubos=CUBOS_SEGUNDOS):
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, cubos=cubos)
+
+    def exponer(self):
+        """
+        Devuelve todas las métricas en el formato de texto de Prometheus
+        """
+        with self._cerrojo:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in sorted(metricas, key=lambda m: m.nombre):
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+    def volcar(self, ruta):
+        """
+        Escribe las métricas en un archivo (p. ej. para el textfile collector de node_exporter)
+        """
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w') as file:
+            file.write(self.exponer())
+        os.replace(temporal, ruta)
+
+# Registro compartido por todos los módulos del proceso
+REGISTRO = Registro()
+
+_servidores = {}
+_cerrojo_servidores = threading.Lock()
+
+def iniciar_servidor(puerto, direccion="127.0.0.1", registro=REGISTRO):
+    """
+    Sirve /metrics en un hilo en segundo plano; solo se arranca un servidor por dirección y puerto
+    """
+    with _cerrojo_servidores:
+        if (direccion, puerto) in _servidores:
+            return _servidores[(direccion, puerto)]
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = registro.exponer().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", TIPO_CONTENIDO)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+        _servidores[(direccion, puerto)] = servidor
+        return servidor
@@ -5,6 +5,10 @@ import bcrypt
 from yaml.loader import SafeLoader
 from usuarios import cargar_configuracion, crear_usuario, crear_estructura_archivos_usuario, inicializar_sistema
 from verificar_config import inicializar_config
+from metricas import REGISTRO
+
+DURACION_BCRYPT = REGISTRO.histograma("finansmart_bcrypt_verify_seconds", "Tiempo de bcrypt.checkpw al iniciar sesión")
+INICIOS_SESION = REGISTRO.contador("finansmart_logins_total", "Intentos de inicio de sesión", ("resultado",))
 
 def mostrar_pagina_registro():
     """
@@ -44,17 +48,19 @@ def verificar_password(password, hashed_password):
     """
     Verifica si la contraseña es correcta
     """
-    return bcrypt.checkpw(password.encode(), hashed_password.encode())
+    with DURACION_BCRYPT.medir():
+        return bcrypt.checkpw(password.encode(), hashed_password.encode())
 
 def autenticar_usuario():
     """
     Maneja la autenticación de usuarios con un sistema simplificado
     """
-    # Primero verificamos la configuración
-    inicializar_config()
-    
-    # Inicializar el sistema si es necesario
-    inicializar_sistema()
+    # Verificar la configuración e inicializar el sistema una sola vez por sesión
+    # (cargar_configuracion vuelve a inicializarlo si el archivo desaparece)
+    if not st.session_state.get('sistema_inicializado'):
+        inicializar_config()
+        inicializar_sistema()
+        st.session_state['sistema_inicializado'] = True
     
     # Cargar la configuración de usuarios
     config = cargar_configuracion()
@@ -97,14 +103,17 @@ def autenticar_usuario():
                 st.session_state['username'] = username
                 st.session_state['name'] = user_data['name']
                 authentication_status = True
+                INICIOS_SESION.inc(resultado="ok")
                 st.rerun()
             else:
                 # Contraseña incorrecta
+                INICIOS_SESION.inc(resultado="wrong_password")
                 st.session_state['authentication_status'] = False
                 authentication_status = False
                 st.error("Usuario o contraseña incorrectos")
         else:
             # Usuario no existe
+            INICIOS_SESION.inc(resultado="unknown_user")
             st.session_state['authentication_status'] = False
             authentication_status = False
             st.error("Usuario o contraseña incorrectos")
@@ -0,0 +1,23 @@
+def firma(df):
+    """
+    Identifica un resultado (número de filas, primera y última etiqueta, columnas) sin recorrerlo:
+    si cambia el filtro o el orden, el cursor guardado deja de valer
+    """
+    if df.empty:
+        return (0, tuple(df.columns))
+    return (len(df), df.index[0], df.index[-1], tuple(df.columns))
+
+def paginar(df, cursor, tamano):
+    """
+    Devuelve (página de df que empieza en el cursor, cursor de la anterior, cursor de la siguiente, (inicio, fin));
+    los cursores son None si no hay página anterior o siguiente.
+    Un cursor es {"firma": firma del resultado, "inicio": primera fila}; uno de otro resultado vuelve a la
+    primera página. Solo se copian las filas de la página: el coste no depende del tamaño de df
+    """
+    actual = firma(df)
+    inicio = cursor["inicio"] if cursor and cursor.get("firma") == actual else 0
+    inicio = min(max(inicio, 0), max(len(df) - 1, 0) // tamano * tamano)
+    fin = min(inicio + tamano, len(df))
+    anterior = {"firma": actual, "inicio": max(inicio - tamano, 0)} if inicio > 0 else None
+    siguiente = {"firma": actual, "inicio": fin} if fin < len(df) else None
+    return df.iloc[inicio:fin], anterior, siguiente, (inicio, fin)
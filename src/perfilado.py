@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Límites superiores (ms) de los cubos del histograma de latencias por página
+CUBOS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Streamlit ejecuta cada sesión en un hilo del mismo proceso: el archivo se actualiza con un cerrojo
+_cerrojo_histogramas = threading.Lock()
+
+class Perfilador:
+    """
+    Mide tramos de una ejecución del script (autenticación, carga de datos, secciones, renderizado)
+    """
+    def __init__(self, activo=True):
+        self.activo = activo
+        self.inicio = time.perf_counter()
+        self.tramos = []
+        self._profundidad = 0
+
+    @contextmanager
+    def tramo(self, nombre):
+        if not self.activo:
+            yield
+            return
+        inicio = time.perf_counter()
+        self._profundidad += 1
+        try:
+            yield
+        finally:
+            self._profundidad -= 1
+            self.tramos.append({
+                "nombre": nombre,
+                "profundidad": self._profundidad,
+                "ms": (time.perf_counter() - inicio) * 1000,
+            })
+
+    def envolver(self, funcion, nombre=None):
+        """
+        Devuelve la función envuelta en un tramo con su nombre
+        """
+        nombre = nombre or funcion.__name__
+
+        @wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with self.tramo(nombre):
+                return funcion(*args, **kwargs)
+        return envuelta
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def resumen(self):
+        """
+        Agrupa los tramos por nombre: número de llamadas, tiempo total y máximo, ordenados por tiempo total
+        """
+        agrupados = {}
+        for tramo in self.tramos:
+            entrada = agrupados.setdefault(tramo["nombre"], {"tramo": tramo["nombre"], "llamadas": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entrada["llamadas"] += 1
+            entrada["total_ms"] += tramo["ms"]
+            entrada["max_ms"] = max(entrada["max_ms"], tramo["ms"])
+        return sorted(agrupados.values(), key=lambda e: e["total_ms"], reverse=True)
+
+def registrar_latencia(pagina, ms, ruta):
+    """
+    Suma la latencia de una ejecución al histograma de su página en el archivo JSON indicado
+    """
+    with _cerrojo_histogramas:
+        histogramas = {}
+        if os.path.exists(ruta):
+            try:
+                with open(ruta, 'r') as file:
+                    histogramas = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                histogramas = {}
+
+        entrada = histogramas.setdefault(pagina, {
+            "cubos_ms": CUBOS_MS, "cuentas": [0] * (len(CUBOS_MS) + 1), "n": 0, "suma_ms": 0.0, "max_ms": 0.0,
+        })
+        indice = next((i for i, limite in enumerate(CUBOS_MS) if ms <= limite), len(CUBOS_MS))
+        entrada["cuentas"][indice] += 1
+        entrada["n"] += 1
+        entrada["suma_ms"] += ms
+        entrada["max_ms"] = max(entrada["max_ms"], ms)
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w') as file:
+            json.dump(histogramas, file, indent=2)
+        os.replace(temporal, ruta)
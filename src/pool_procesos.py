@@ -0,0 +1,45 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Trabajadores del pool compartido: fijo, para que ningún cálculo tenga que recrearlo (y cerrar el de otro)
+TRABAJADORES = os.cpu_count() or 1
+
+_pool = None
+_cerrojo = threading.Lock()
+
+def obtener_pool():
+    """
+    Pool de procesos único del proceso, compartido por los cálculos en paralelo (agregación por grupos,
+    simulación de metas). Cada cálculo reparte su trabajo en tantos bloques como procesos quiera; si envía
+    más bloques que trabajadores, esperan en la cola. "spawn" porque Streamlit atiende las sesiones en hilos
+    y fork no es seguro con hilos
+    """
+    global _pool
+    with _cerrojo:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=TRABAJADORES, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def iniciar_trabajador(limite_memoria_mb=None):
+    """
+    Configura cada proceso trabajador de los pools con initializer (informes por lotes, servicio de datos):
+    backend sin ventanas y límite de memoria
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    if limite_memoria_mb:
+        try:
+            import resource
+            limite = limite_memoria_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+        except (ImportError, ValueError, OSError):
+            # Plataformas sin RLIMIT_AS (p. ej. Windows): se continúa sin límite
+            pass
+
+@atexit.register
+def _cerrar_pool():
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
@@ -0,0 +1,124 @@
+from carga_perezosa import importar_perezoso
+
+pd = importar_perezoso("pandas")
+
+# Porcentaje máximo del gasto total por categoría antes de que las recomendaciones lo señalen
+LIMITES_RECOMENDACION = {
+    "Food": 15,
+    "Transportation": 10,
+    "Housing": 30,
+    "Entertainment": 10,
+    "Health": 10,
+    "Education": 10,
+    "Utilities": 10,
+    "Insurance": 10,
+    "Debt": 10,
+    "Savings": 20,
+    "Gifts": 5,
+    "Travel": 5,
+    "Other": 5
+}
+LIMITE_RECOMENDACION_POR_DEFECTO = 10
+
+# Porcentaje del gasto a partir del cual Spending Insights da un consejo concreto para la categoría
+UMBRALES_CONSEJOS = {
+    "Food": 20,
+    "Housing": 40,
+    "Entertainment": 15,
+    "Transportation": 15,
+    "Shopping": 10
+}
+
+def _mes(fecha):
+    # "YYYY-MM" de una fecha en texto (YYYY-MM-DD) o Timestamp
+    return str(fecha)[:7]
+
+class Presupuestos:
+    """
+    Límites mensuales por categoría (los del usuario) y gasto acumulado por (mes, categoría) que se actualiza
+    con cada gasto: comprobar un límite o listar los excedidos de un mes no recorre el ledger
+    """
+    def __init__(self, limites=None):
+        self.limites = dict(limites or {})
+        # {(mes, categoría): importe en la moneda base}
+        self.gastado = {}
+
+    @staticmethod
+    def limites_desde_registros(registros):
+        """
+        {categoría: límite} a partir de las filas guardadas (category, limit)
+        """
+        return {registro["category"]: float(registro["limit"]) for registro in registros
+                if registro.get("category") and registro.get("limit") == registro.get("limit")}
+
+    def registros(self):
+        """
+        Filas para guardar los límites (category, limit)
+        """
+        return [{"category": categoria, "limit": limite} for categoria, limite in self.limites.items()]
+
+    def _acumular(self, transaccion, signo):
+        clave = (_mes(transaccion.get("date", "")), transaccion.get("category"))
+        self.gastado[clave] = self.gastado.get(clave, 0.0) + signo * float(transaccion["amount"])
+
+    def añadir(self, transaccion):
+        self._acumular(transaccion, 1)
+
+    def quitar(self, transaccion):
+        self._acumular(transaccion, -1)
+
+    @classmethod
+    def desde_registros(cls, registros, limites=None):
+        """
+        Construye los contadores de un ledger de gastos completo con un único groupby por mes y categoría
+        """
+        presupuestos = cls(limites)
+        df = pd.DataFrame(registros)
+        if df.empty or not {'amount', 'date', 'category'} <= set(df.columns):
+            return presupuestos
+        meses = pd.to_datetime(df['date']).dt.to_period('M')
+        sumas = df.groupby([meses, df['category']], observed=True, sort=False)['amount'].sum()
+        presupuestos.gastado = {(str(mes), categoria): float(suma) for (mes, categoria), suma in sumas.items()}
+        return presupuestos
+
+    def fijar(self, categoria, limite):
+        """
+        Fija (o con None quita) el límite mensual de una categoría
+        """
+        if limite is None:
+            self.limites.pop(categoria, None)
+        elif limite <= 0:
+            raise ValueError("El límite de un presupuesto debe ser positivo")
+        else:
+            self.limites[categoria] = float(limite)
+
+    def gasto(self, categoria, mes):
+        return self.gastado.get((_mes(mes), categoria), 0.0)
+
+    def restante(self, categoria, mes):
+        """
+        Lo que queda del límite de la categoría en el mes (negativo si se ha pasado); None sin límite
+        """
+        limite = self.limites.get(categoria)
+        return None if limite is None else limite - self.gasto(categoria, mes)
+
+    def excedido(self, categoria, mes):
+        restante = self.restante(categoria, mes)
+        return restante is not None and restante < 0
+
+    def alertas(self, mes):
+        """
+        Categorías con límite que lo superan en el mes: [(categoría, gastado, límite)]
+        """
+        return [(categoria, self.gasto(categoria, mes), limite) for categoria, limite in self.limites.items()
+                if self.gasto(categoria, mes) > limite]
+
+    def tabla(self, mes):
+        """
+        Presupuesto frente a gasto real del mes por categoría con límite (budget, spent, remaining, used en %)
+        """
+        filas = [(categoria, limite, self.gasto(categoria, mes)) for categoria, limite in self.limites.items()]
+        df = pd.DataFrame(filas, columns=['category', 'budget', 'spent'])
+        df['remaining'] = df['budget'] - df['spent']
+        df['used'] = df['spent'] / df['budget'] * 100
+        return df
@@ -0,0 +1,202 @@
+from datetime import datetime
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+MODELOS = ("auto", "media_movil", "lineal", "estacional")
+
+def indice_mes(fechas):
+    """
+    Meses como enteros consecutivos (año * 12 + mes - 1) para indexar columnas sin fechas
+    """
+    fechas = pd.DatetimeIndex(fechas)
+    return fechas.year.to_numpy() * 12 + fechas.month.to_numpy() - 1
+
+def _periodo(mes):
+    return f"{mes // 12:04d}-{mes % 12 + 1:02d}"
+
+def serie_mensual(df, hoy=None):
+    """
+    Importes por serie (type, category) y mes completo: (claves, matriz series x meses, primer mes).
+    El mes en curso no se usa (está a medias) salvo que sea el único con datos. Una sola pasada con bincount
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['type', 'category']), np.zeros((0, 0)), None
+    meses = indice_mes(df['date'])
+    actual = indice_mes([hoy or datetime.now()])[0]
+    completos = meses < actual
+    if not completos.any():
+        completos = meses <= actual
+    df, meses = df[completos], meses[completos]
+    categorias = df['category'] if 'category' in df.columns else pd.Series("Other", index=df.index)
+    codigos, claves = pd.MultiIndex.from_arrays([df['type'].astype(str), categorias.astype(str)]).factorize()
+    primero = int(meses.min())
+    n_meses = int(meses.max()) - primero + 1
+    matriz = np.bincount(codigos * n_meses + (meses - primero), weights=df['amount'].to_numpy(dtype=np.float64),
+                         minlength=len(claves) * n_meses).reshape(len(claves), n_meses)
+    return claves.to_frame(index=False, name=['type', 'category']), matriz, primero
+
+def historia_mensual(df, hoy=None):
+    """
+    serie_mensual con los meses sin transacciones hasta el último mes completo rellenos con ceros:
+    (claves, matriz, primer mes, mes actual); la última columna es siempre el mes anterior al actual
+    (o el actual si es el único con datos)
+    """
+    claves, matriz, primero = serie_mensual(df, hoy)
+    actual = indice_mes([hoy or datetime.now()])[0]
+    if len(claves):
+        vacios = max(actual - 1 - (primero + matriz.shape[1] - 1), 0)
+        matriz = np.pad(matriz, ((0, 0), (0, vacios)))
+    return claves, matriz, primero, actual
+
+def media_movil(matriz, horizonte, ventana=3):
+    """
+    Media de los últimos meses de cada serie, repetida en todo el horizonte
+    """
+    media = matriz[:, -ventana:].mean(axis=1, keepdims=True)
+    return np.repeat(media, horizonte, axis=1)
+
+def _recta(matriz):
+    # Mínimos cuadrados de todas las series a la vez: pendiente y ordenada con un producto matriz-vector
+    x = np.arange(matriz.shape[1], dtype=np.float64)
+    centrado = x - x.mean()
+    pendiente = matriz @ centrado / (centrado @ centrado)
+    return matriz.mean(axis=1) - pendiente * x.mean(), pendiente
+
+def lineal(matriz, horizonte):
+    """
+    Tendencia lineal de cada serie prolongada en el horizonte
+    """
+    ordenada, pendiente = _recta(matriz)
+    futuro = np.arange(matriz.shape[1], matriz.shape[1] + horizonte)
+    return ordenada[:, None] + pendiente[:, None] * futuro
+
+def estacional(matriz, horizonte, primer_mes, periodo=12):
+    """
+    Tendencia lineal más el efecto medio de cada mes del año (residuos de la recta promediados por mes)
+    """
+    ordenada, pendiente = _recta(matriz)
+    n = matriz.shape[1]
+    residuos = matriz - (ordenada[:, None] + pendiente[:, None] * np.arange(n))
+    # Se rellena por delante hasta empezar en enero y por detrás hasta completar años: (series, años, meses)
+    delante = primer_mes % periodo
+    detras = -(delante + n) % periodo
+    rejilla = np.pad(residuos, ((0, 0), (delante, detras)), constant_values=np.nan)
+    with np.errstate(all='ignore'):
+        # Meses del año sin historia: sin efecto
+        efecto = np.nan_to_num(np.nanmean(rejilla.reshape(len(matriz), -1, periodo), axis=1))
+    futuro = np.arange(n, n + horizonte)
+    return lineal(matriz, horizonte) + efecto[:, (primer_mes + futuro) % periodo]
+
+class Proyeccion:
+    """
+    Previsión mensual de cada serie (type, category) desde el mes siguiente al actual.
+    valores es una matriz series x meses (importes en la moneda base, nunca negativos)
+    """
+    def __init__(self, claves, valores, meses, modelo):
+        self.claves = claves
+        self.valores = valores
+        self.meses = meses
+        self.modelo = modelo
+
+    def periodos(self):
+        return [_periodo(mes) for mes in self.meses]
+
+    def por_tipo(self, tipo):
+        """
+        Total previsto de un tipo ("Income" / "Expense") por mes
+        """
+        filas = (self.claves['type'] == tipo).to_numpy()
+        return self.valores[filas].sum(axis=0) if filas.any() else np.zeros(len(self.meses))
+
+    def serie(self, tipo, categoria):
+        filas = np.flatnonzero(((self.claves['type'] == tipo) & (self.claves['category'] == categoria)).to_numpy())
+        return self.valores[filas[0]] if len(filas) else np.zeros(len(self.meses))
+
+    def saldo(self, saldo_actual):
+        """
+        Flujo de caja previsto: ingresos, gastos, neto y saldo acumulado por mes
+        """
+        ingresos, gastos = self.por_tipo("Income"), self.por_tipo("Expense")
+        neto = ingresos - gastos
+        return pd.DataFrame({"period": self.periodos(), "income": ingresos, "expense": gastos,
+                             "net": neto, "balance": saldo_actual + np.cumsum(neto)})
+
+    def tabla(self):
+        """
+        Previsión en formato largo (type, category, period, amount)
+        """
+        return pd.DataFrame({
+            "type": np.repeat(self.claves['type'].to_numpy(), len(self.meses)),
+            "category": np.repeat(self.claves['category'].to_numpy(), len(self.meses)),
+            "period": np.tile(self.periodos(), len(self.claves)),
+            "amount": self.valores.ravel(),
+        })
+
+def proyectar(df, meses=12, modelo="auto", hoy=None):
+    """
+    Proyecta meses hacia delante cada serie (type, category) de un DataFrame de transacciones
+    (type, category, date, amount en la moneda base; p. ej. LibroMayor.df). Con "auto" se elige el modelo
+    según la historia disponible: estacional con dos años, lineal con tres meses y media móvil si hay menos
+    """
+    if modelo not in MODELOS:
+        raise ValueError(f"Modelo de proyección desconocido: {modelo}")
+    claves, matriz, primero, actual = historia_mensual(df, hoy)
+    futuros = np.arange(actual + 1, actual + 1 + meses)
+    if not len(claves):
+        return Proyeccion(claves, np.zeros((0, meses)), futuros, modelo)
+    # Salto hasta el primer mes previsto (el mes actual, a medias, no se muestra)
+    salto = actual + 1 - (primero + matriz.shape[1])
+    if modelo == "auto":
+        modelo = "estacional" if matriz.shape[1] >= 24 else "lineal" if matriz.shape[1] >= 3 else "media_movil"
+    if modelo == "estacional":
+        valores = estacional(matriz, salto + meses, primero)
+    elif modelo == "lineal":
+        valores = lineal(matriz, salto + meses)
+    else:
+        valores = media_movil(matriz, salto + meses)
+    return Proyeccion(claves, np.maximum(valores[:, salto:], 0), futuros, modelo)
+
+def fechas_metas(metas, proyeccion, actuales):
+    """
+    Mes previsto en que cada meta alcanza su objetivo, todas a la vez: (fechas "YYYY-MM" o None, a tiempo o None).
+    Las metas de ahorro suman lo previsto en Income/Savings desde lo ya ahorrado (actuales); las de reducción
+    de gastos no tienen fecha de cumplimiento; el resto avanza con el flujo neto previsto
+    """
+    if not metas:
+        return [], []
+    objetivos = np.array([float(meta.get("target_amount", 0) or 0) for meta in metas])
+    actuales = np.asarray(actuales, dtype=np.float64)
+    # Aportaciones mensuales posibles: ahorro, neto y ninguna; cada meta elige una fila
+    aportaciones = np.vstack([proyeccion.serie("Income", "Savings"),
+                              proyeccion.por_tipo("Income") - proyeccion.por_tipo("Expense"),
+                              np.zeros(len(proyeccion.meses))])
+    filas = np.array([0 if meta.get("category") == "saving" else 2 if meta.get("category") == "expense_reduction" else 1
+                      for meta in metas])
+    acumulado = actuales[:, None] + np.cumsum(aportaciones[filas], axis=1)
+    alcanzada = acumulado >= objetivos[:, None]
+    primera = alcanzada.argmax(axis=1)
+
+    actual = int(proyeccion.meses[0]) - 1 if len(proyeccion.meses) else int(indice_mes([datetime.now()])[0])
+    fechas, a_tiempo = [], []
+    for i, meta in enumerate(metas):
+        if filas[i] == 2:
+            fechas.append(None)
+            a_tiempo.append(None)
+            continue
+        if actuales[i] >= objetivos[i]:
+            mes = actual
+        elif alcanzada[i].any():
+            mes = int(proyeccion.meses[primera[i]])
+        else:
+            mes = None
+        fechas.append(_periodo(mes) if mes is not None else None)
+        limite = pd.to_datetime(meta.get("deadline"), errors='coerce')
+        if pd.isna(limite) or (mes is None and indice_mes([limite])[0] > proyeccion.meses[-1]):
+            # Sin fecha límite, o la fecha límite queda más allá de la proyección
+            a_tiempo.append(None)
+        else:
+            # bool de Python (no numpy.bool_): el resultado va a JSON en el servicio de datos
+            a_tiempo.append(bool(mes is not None and mes <= indice_mes([limite])[0]))
+    return fechas, a_tiempo
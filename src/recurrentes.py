@@ -0,0 +1,108 @@
+from datetime import datetime
+from dateutil.rrule import rrulestr
+from carga_perezosa import importar_perezoso
+
+pd = importar_perezoso("pandas")
+
+# Frecuencias predefinidas (cualquier otra regla se escribe como RRULE de iCalendar, p. ej. FREQ=WEEKLY;INTERVAL=2)
+FRECUENCIAS = {
+    "Weekly": "FREQ=WEEKLY",
+    "Monthly": "FREQ=MONTHLY",
+    "Yearly": "FREQ=YEARLY",
+}
+
+def _fecha(valor):
+    # Fechas de las reglas: texto YYYY-MM-DD; vacío o NaN (CSV) es "sin fecha"
+    if valor is None or valor != valor or valor == "":
+        return None
+    return datetime.strptime(str(valor)[:10], "%Y-%m-%d")
+
+def _fin_de_mes(regla, inicio):
+    """
+    Las frecuencias predefinidas que empiezan un día 29, 30 o 31 caen el último día de los meses que no lo
+    tienen en lugar de saltárselos (RRULE sola se salta esos meses): de los días {inicio, último} del mes, el primero
+    """
+    if inicio is None or inicio.day <= 28:
+        return regla
+    if regla == FRECUENCIAS["Monthly"]:
+        return f"{regla};BYMONTHDAY={inicio.day},-1;BYSETPOS=1"
+    if regla == FRECUENCIAS["Yearly"]:
+        return f"{regla};BYMONTH={inicio.month};BYMONTHDAY={inicio.day},-1;BYSETPOS=1"
+    return regla
+
+def _regla(regla):
+    inicio = _fecha(regla["start"])
+    return rrulestr(_fin_de_mes(regla["rule"], inicio), dtstart=inicio)
+
+def validar_regla(regla):
+    """
+    Comprueba una regla recurrente (type, amount, description, category, start, rule y opcionalmente end)
+    y la devuelve normalizada; lanza ValueError si no es válida
+    """
+    tipo = str(regla.get("type", "")).strip().lower()
+    if tipo not in ("income", "expense"):
+        raise ValueError(f"tipo no válido '{regla.get('type')}' (income/expense)")
+    if float(regla.get("amount", 0)) <= 0:
+        raise ValueError("la cantidad debe ser positiva")
+    if _fecha(regla.get("start")) is None:
+        raise ValueError("la regla necesita una fecha de inicio")
+    fin = _fecha(regla.get("end"))
+    if fin is not None and fin < _fecha(regla["start"]):
+        raise ValueError("la fecha de fin es anterior a la de inicio")
+    normalizada = dict(regla, type=tipo, amount=float(regla["amount"]), rule=str(regla.get("rule", "")).strip())
+    try:
+        _regla(normalizada)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"RRULE no válida '{normalizada['rule']}': {e}") from e
+    return normalizada
+
+def ocurrencias(regla, hasta, desde=None):
+    """
+    Fechas de la regla entre desde (por defecto su inicio) y hasta, ambas incluidas, sin pasar de su fin.
+    Se generan al pedirlas: una regla sin fin no ocupa más que su fila
+    """
+    fin = _fecha(regla.get("end"))
+    hasta = min(hasta, fin) if fin is not None else hasta
+    desde = desde or _fecha(regla["start"])
+    if hasta < desde:
+        return []
+    return _regla(regla).between(desde, hasta, inc=True)
+
+def siguiente(regla, despues=None):
+    """
+    Próxima fecha de la regla después de despues (por defecto, ahora); None si ya terminó
+    """
+    fecha = _regla(regla).after(despues or datetime.now())
+    fin = _fecha(regla.get("end"))
+    return None if fecha is None or (fin is not None and fecha > fin) else fecha
+
+def expandir(reglas, tipo, hasta, desde=None):
+    """
+    Transacciones (DataFrame) que generan las reglas de un tipo ("income" / "expense") hasta una fecha.
+    Solo existen en memoria, en las vistas y agregados que las piden; en disco sigue habiendo una fila por regla
+    """
+    tablas = []
+    for regla in reglas:
+        if str(regla.get("type", "")).lower() != tipo:
+            continue
+        fechas = ocurrencias(regla, hasta, desde)
+        if not fechas:
+            continue
+        tabla = pd.DataFrame({"date": pd.DatetimeIndex(fechas).strftime("%Y-%m-%d")})
+        for campo in ("amount", "description", "category", "currency"):
+            valor = regla.get(campo)
+            if valor is not None and valor == valor:
+                tabla[campo] = valor
+        tablas.append(tabla.assign(recurring=True))
+    if not tablas:
+        return pd.DataFrame()
+    return pd.concat(tablas, ignore_index=True)
+
+def con_recurrentes(registros, reglas, tipo, hasta=None):
+    """
+    Registros de un tipo más las ocurrencias de sus reglas hasta hoy (para Finance y los informes)
+    """
+    if not reglas:
+        return registros
+    generadas = expandir(reglas, tipo, hasta or datetime.now())
+    return registros + generadas.to_dict('records') if not generadas.empty else registros
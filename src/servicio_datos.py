@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agregados import calculate_monthly_totals
+from almacenamiento import cargar_registros, cargar_varios, guardar_registros
+from main import Finance
+from pool_procesos import iniciar_trabajador
+from recurrentes import con_recurrentes
+from usuarios import obtener_ruta_archivos_usuario
+
+# Ledgers ya cargados en cada proceso trabajador: {usuario: (fechas de modificación, Finance)}
+_ledgers_trabajador = {}
+
+def _validar_usuario(username):
+    # El nombre de usuario forma parte de la ruta de sus archivos
+    if not username or username.startswith('.') or os.path.basename(username) != username:
+        raise ValueError(f"Usuario no válido: {username!r}")
+    return username
+
+def _ledger(username):
+    """
+    Finance con los datos del usuario (con las ocurrencias de sus reglas recurrentes hasta hoy),
+    recargado solo si sus archivos cambiaron desde la última petición o cambió el día
+    """
+    rutas = obtener_ruta_archivos_usuario(username)
+    fechas = tuple(os.path.getmtime(ruta) if os.path.exists(ruta) else None for ruta in rutas.values())
+    fechas += (date.today(),)
+    en_cache = _ledgers_trabajador.get(username)
+    if en_cache and en_cache[0] == fechas:
+        return en_cache[1]
+
+    finance = Finance(autoload=False)
+    reglas = cargar_registros(rutas['recurring'])
+    finance.incomes = con_recurrentes(cargar_registros(rutas['incomes']), reglas, "income")
+    finance.expenses = con_recurrentes(cargar_registros(rutas['expenses']), reglas, "expense")
+    finance.goals = cargar_registros(rutas['goals'])
+    finance.budgets = cargar_registros(rutas['budgets'])
+    _ledgers_trabajador[username] = (fechas, finance)
+    return finance
+
+def _a_json(valor):
+    # Tipos de numpy (sumas de pandas) a tipos nativos
+    return valor.item() if hasattr(valor, 'item') else valor
+
+def ejecutar_analisis(username, operacion, parametros):
+    """
+    Se ejecuta en un proceso trabajador: cada operación lee el ledger del usuario y devuelve datos JSON
+    """
+    finance = _ledger(username)
+    if operacion == "balance":
+        return finance.calculate_balance()
+    if operacion == "totals":
+        return {"income": float(finance.total_amount(finance.incomes)),
+                "expense": float(finance.total_amount(finance.expenses)),
+                "debt": float(finance.total_amount(finance.expenses, "Debt"))}
+    if operacion == "recommendations":
+        return finance.generate_recommendations()
+    if operacion == "goals_progress":
+        return finance.track_goals_progress()
+    if operacion == "monthly_totals":
+        datos = finance.incomes if parametros.get("tipo") == "incomes" else finance.expenses
+        return calculate_monthly_totals(datos).to_dict('records')
+    if operacion == "monthly_report":
+        report = finance.generate_monthly_report(month=parametros.get("month"), show_chart=False)
+        if isinstance(report, str):
+            return {"message": report}
+        return {clave: _a_json(valor) for clave, valor in report.items()}
+    raise ValueError(f"Operación desconocida: {operacion}")
+
+class ServicioDatos:
+    """
+    Dueño de los ledgers de todos los usuarios: lecturas y escrituras en memoria, análisis en procesos
+    """
+    def __init__(self, procesos=None):
+        self.pool = ProcessPoolExecutor(max_workers=procesos, initializer=iniciar_trabajador, initargs=(None,))
+        self.ledgers = {}
+        self._cerrojo = threading.Lock()
+        # Las escrituras de un mismo usuario se serializan; las de usuarios distintos no se esperan
+        self._cerrojos_usuario = defaultdict(threading.Lock)
+
+    def cargar(self, username, claves=None):
+        rutas = obtener_ruta_archivos_usuario(_validar_usuario(username))
+        claves = claves or list(rutas)
+        with self._cerrojo:
+            ledger = self.ledgers.setdefault(username, {})
+            pendientes = {clave: rutas[clave] for clave in claves if clave not in ledger}
+        if pendientes:
+            cargados = cargar_varios(pendientes)
+            with self._cerrojo:
+                for clave, registros in cargados.items():
+                    ledger.setdefault(clave, registros)
+        return {clave: ledger[clave] for clave in claves}
+
+    def guardar(self, username, clave, registros):
+        rutas = obtener_ruta_archivos_usuario(_validar_usuario(username))
+        if clave not in rutas:
+            raise ValueError(f"Archivo desconocido: {clave}")
+        with self._cerrojo:
+            cerrojo_usuario = self._cerrojos_usuario[username]
+        with cerrojo_usuario:
+            guardar_registros(registros, rutas[clave])
+            with self._cerrojo:
+                self.ledgers.setdefault(username, {})[clave] = registros
+
+    def analizar(self, username, operacion, parametros=None):
+        return self.pool.submit(ejecutar_analisis, _validar_usuario(username), operacion, parametros or {}).result()
+
+    def cerrar(self):
+        self.pool.shutdown()
+
+def crear_servidor(servicio, puerto, direccion="127.0.0.1"):
+    """
+    API JSON: GET /users/<u>?files=a,b · PUT /users/<u>/<archivo> · POST /users/<u>/analysis/<operación>
+    """
+    class Manejador(BaseHTTPRequestHandler):
+        def _responder(self, estado, datos):
+            cuerpo = json.dumps(datos).encode()
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def _cuerpo(self):
+            longitud = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(longitud) or b"null")
+
+        def _atender(self, metodo):
+            ruta, _, consulta = self.path.partition("?")
+            partes = [parte for parte in ruta.split("/") if parte]
+            try:
+                if metodo == "GET" and len(partes) == 2 and partes[0] == "users":
+                    claves = consulta[len("files="):].split(",") if consulta.startswith("files=") else None
+                    self._responder(200, servicio.cargar(partes[1], claves))
+                elif metodo == "PUT" and len(partes) == 3 and partes[0] == "users":
+                    servicio.guardar(partes[1], partes[2], self._cuerpo())
+                    self._responder(200, {"saved": partes[2]})
+                elif metodo == "POST" and len(partes) == 4 and partes[0] == "users" and partes[2] == "analysis":
+                    self._responder(200, {"result": servicio.analizar(partes[1], partes[3], self._cuerpo())})
+                else:
+                    self._responder(404, {"error": "Ruta no encontrada"})
+            except (ValueError, KeyError) as e:
+                self._responder(400, {"error": str(e)})
+            except Exception as e:
+                self._responder(500, {"error": str(e)})
+
+        def do_GET(self):
+            self._atender("GET")
+
+        def do_PUT(self):
+            self._atender("PUT")
+
+        def do_POST(self):
+            self._atender("POST")
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+class ClienteDatos:
+    """
+    Cliente del servicio de datos para la app de Streamlit
+    """
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _peticion(self, metodo, ruta, datos=None):
+        cuerpo = None if datos is None else json.dumps(datos).encode()
+        peticion = urllib.request.Request(self.url + ruta, data=cuerpo, method=metodo,
+                                          headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.timeout) as respuesta:
+                return json.loads(respuesta.read())
+        except urllib.error.HTTPError as e:
+            raise ValueError(json.loads(e.read() or b"{}").get("error", str(e))) from e
+
+    def cargar(self, username, claves=None):
+        consulta = f"?files={','.join(claves)}" if claves else ""
+        return self._peticion("GET", f"/users/{username}{consulta}")
+
+    def guardar(self, username, clave, registros):
+        self._peticion("PUT", f"/users/{username}/{clave}", registros)
+
+    def analizar(self, username, operacion, **parametros):
+        return self._peticion("POST", f"/users/{username}/analysis/{operacion}", parametros)["result"]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio local de datos y análisis para FinanSmart")
+    parser.add_argument("--direccion", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos de análisis (por defecto, uno por núcleo)")
+    args = parser.parse_args(argv)
+
+    servicio = ServicioDatos(args.procesos)
+    servidor = crear_servidor(servicio, args.puerto, args.direccion)
+    print(f"Servicio de datos en http://{args.direccion}:{args.puerto}", file=sys.stderr)
+    # SIGTERM (systemd, docker stop) cierra el servidor y los procesos trabajadores igual que Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import os
+from pool_procesos import obtener_pool
+from proyecciones import historia_mensual, indice_mes
+from carga_perezosa import importar_perezoso
+
+np = importar_perezoso("numpy")
+pd = importar_perezoso("pandas")
+
+# Caminos por bloque: cada bloque tiene su propia semilla, así que el resultado no depende del número de procesos
+CAMINOS_POR_BLOQUE = 2_500
+
+def flujos_mensuales(df, hoy=None):
+    """
+    Historia de aportaciones mensuales (meses completos) que remuestrea la simulación:
+    fila 0 lo ingresado en Savings y fila 1 el flujo neto (ingresos - gastos)
+    """
+    claves, matriz, _, actual = historia_mensual(df, hoy)
+    if not len(claves):
+        return np.zeros((2, 0)), actual
+    signos = np.where((claves['type'] == "Expense").to_numpy(), -1.0, 1.0)
+    ahorro = ((claves['type'] == "Income") & (claves['category'] == "Savings")).to_numpy()
+    return np.vstack([matriz[ahorro].sum(axis=0), signos @ matriz]), actual
+
+def _simular_bloque(flujos, filas, horizontes, faltan, caminos, semilla):
+    """
+    Se ejecuta en un proceso trabajador (o en el propio proceso): remuestrea caminos de meses de la historia
+    y cuenta, por meta, cuántos caminos llegan a lo que le falta en su horizonte
+    """
+    rng = np.random.default_rng(semilla)
+    maximo = int(horizontes.max())
+    # Los mismos meses sorteados sirven para todas las metas (números aleatorios comunes)
+    meses = rng.integers(0, flujos.shape[1], size=(caminos, maximo))
+    aciertos = np.zeros(len(filas), dtype=np.int64)
+    for fila in np.unique(filas):
+        metas = np.flatnonzero(filas == fila)
+        acumulado = np.cumsum(flujos[fila][meses], axis=1)
+        aciertos[metas] = (acumulado[:, horizontes[metas] - 1] >= faltan[metas]).sum(axis=0)
+    return aciertos
+
+def probabilidades_metas(metas, df, actuales, caminos=10_000, semilla=0, procesos=1, hoy=None):
+    """
+    Probabilidad de que cada meta llegue a target_amount en su deadline, por Monte Carlo: cada camino
+    remuestrea (bootstrap) meses completos de la historia. Las metas de ahorro suman lo ingresado en Savings
+    desde lo ya ahorrado (actuales) y el resto el flujo neto; las de reducción de gastos devuelven None.
+    Con procesos > 1 los bloques de caminos se reparten entre procesos
+    """
+    if not metas:
+        return []
+    flujos, actual = flujos_mensuales(df, hoy)
+    objetivos = np.array([float(meta.get("target_amount", 0) or 0) for meta in metas])
+    faltan = objetivos - np.asarray(actuales, dtype=np.float64)
+    limites = pd.to_datetime(pd.Series([meta.get("deadline") for meta in metas]), errors='coerce')
+    validas = limites.notna().to_numpy()
+    horizontes = np.zeros(len(metas), dtype=np.int64)
+    horizontes[validas] = np.maximum(indice_mes(limites[validas]) - actual, 0)
+    filas = np.array([0 if meta.get("category") == "saving" else 1 for meta in metas])
+    reduccion = np.array([meta.get("category") == "expense_reduction" for meta in metas])
+
+    # Metas ya cumplidas, vencidas o sin historia que remuestrear: 1 o 0 sin simular
+    probabilidades = (faltan <= 0).astype(np.float64)
+    simular = np.flatnonzero(validas & ~reduccion & (faltan > 0) & (horizontes > 0))
+    if flujos.shape[1] and len(simular):
+        bloques = [(CAMINOS_POR_BLOQUE if inicio + CAMINOS_POR_BLOQUE <= caminos else caminos - inicio)
+                   for inicio in range(0, caminos, CAMINOS_POR_BLOQUE)]
+        semillas = np.random.SeedSequence(semilla).spawn(len(bloques))
+        argumentos = (flujos, filas[simular], horizontes[simular], faltan[simular])
+        procesos = min(procesos or os.cpu_count() or 1, len(bloques))
+        if procesos > 1:
+            pool = obtener_pool()
+            aciertos = sum(futuro.result() for futuro in
+                           [pool.submit(_simular_bloque, *argumentos, n, s) for n, s in zip(bloques, semillas)])
+        else:
+            aciertos = sum(_simular_bloque(*argumentos, n, s) for n, s in zip(bloques, semillas))
+        probabilidades[simular] = aciertos / caminos
+    return [None if reduccion[i] or not validas[i] else float(probabilidades[i]) for i in range(len(metas))]
@@ -1,15 +1,52 @@
 import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from contextlib import ExitStack, nullcontext
 from datetime import datetime, timedelta
-import calendar
-import numpy as np
+from carga_perezosa import importar_perezoso
 from main import Finance
 import os
+import sys
 from io import BytesIO
 from pagina_autenticacion import autenticar_usuario
 from usuarios import obtener_ruta_archivos_usuario
+from almacenamiento import cargar_registros, cargar_varios, guardar_registros
+from agregados import calculate_monthly_totals
+from ajustes import cargar_ajustes
+from perfilado import Perfilador, registrar_latencia
+from metricas import REGISTRO, iniciar_servidor
+from servicio_datos import ClienteDatos
+from taxonomia import IndiceAgregados, cargar_taxonomia
+from libro_mayor import LibroMayor
+from paginacion import paginar
+from formato import Formato
+from divisas import cargar_tipos_cambio
+from recurrentes import FRECUENCIAS, con_recurrentes, siguiente, validar_regla
+from proyecciones import MODELOS, fechas_metas
+from presupuestos import UMBRALES_CONSEJOS, Presupuestos
+from anomalias import DetectorAnomalias
+from histogramas import ERROR_RELATIVO
+from categorizacion import cargar_categorizador
+from graficos import MOTORES_GRAFICOS, figura, spec_barras, spec_tarta, spec_lineas, spec_intervalos, spec_indicador
+
+# Heavy libraries are loaded on first use, so the login page doesn't pay for them
+pd = importar_perezoso("pandas")
+np = importar_perezoso("numpy")
+sns = importar_perezoso("seaborn")
+mpatches = importar_perezoso("matplotlib.patches")
+
+# Per-rerun timing (enabled with "perfilado: true" in config/ajustes.yaml)
+ajustes = cargar_ajustes()
+perfil = Perfilador(activo=ajustes['perfilado'])
+
+# Prometheus metrics (enabled with "metricas: true"); the server starts once per process
+DURACION_RERUN = REGISTRO.histograma("finansmart_rerun_seconds", "Duración de cada ejecución del script", ("pagina",))
+DURACION_RENDER = REGISTRO.histograma("finansmart_render_seconds", "Tiempo de envío de cada gráfico", ("motor",))
+SESIONES = REGISTRO.contador("finansmart_sessions_total", "Sesiones autenticadas iniciadas")
+if ajustes['metricas']:
+    try:
+        iniciar_servidor(ajustes['metricas_puerto'], ajustes['metricas_direccion'])
+    except OSError as e:
+        # Port already taken (another app process or any other program): run without the exporter
+        print(f"Metrics exporter disabled: {e}", file=sys.stderr)
 
 # Set page configuration
 st.set_page_config(
@@ -60,19 +97,17 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Autenticar al usuario
-_, authentication_status = autenticar_usuario()
+with perfil.tramo("auth"):
+    _, authentication_status = autenticar_usuario()
 
 # Solo mostrar la aplicación si el usuario está autenticado
 if authentication_status:
     # Inicializar la capa de Finance
-    finance = Finance()
+    with perfil.tramo("Finance()"):
+        finance = Finance()
     
     # Obtener rutas de archivos específicas del usuario
     rutas_archivos = obtener_ruta_archivos_usuario(st.session_state.username)
-    
-    # Asegurarse de que los directorios existan
-    for ruta in rutas_archivos.values():
-        os.makedirs(os.path.dirname(ruta), exist_ok=True)
 
     # Definir rutas de archivos para almacenar los datos del usuario actual
     incomes_file_path = rutas_archivos['incomes']
@@ -83,25 +118,68 @@ if authentication_status:
     sidebar_image_path = os.path.join(os.path.dirname(__file__), 'menu.jpg')
     main_image_path = os.path.join(os.path.dirname(__file__), 'main.jpg')
 
+    # Optional data service: storage and analytics run outside the Streamlit process
+    servicio = ClienteDatos(ajustes['servicio_datos_url']) if ajustes['servicio_datos_url'] else None
+
+    # Currency and locale for every amount shown in the app
+    formato = Formato(ajustes['moneda'], ajustes['locale'])
+
     # Function to load data from CSV
     def load_data(file_path):
-        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-            try:
-                return pd.read_csv(file_path).to_dict('records')
-            except pd.errors.EmptyDataError:
-                return []
-        return []
+        with perfil.tramo("load_data"):
+            if servicio:
+                clave = os.path.splitext(os.path.basename(file_path))[0]
+                return servicio.cargar(st.session_state.username, [clave])[clave]
+            return cargar_registros(file_path)
 
     # Function to save data to CSV
     def save_data(data, file_path):
-        """
-        Guarda los datos en un archivo CSV, creando el directorio si no existe
-        """
-        # Crear el directorio si no existe
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        pd.DataFrame(data).to_csv(file_path, index=False)
+        with perfil.tramo("save_data"):
+            if servicio:
+                servicio.guardar(st.session_state.username, os.path.splitext(os.path.basename(file_path))[0], data)
+            else:
+                guardar_registros(data, file_path)
+
+    # Rollup index per ledger (base-currency amounts): built once per session, then kept up to date on every added transaction
+    def indice_agregados(tipo):
+        clave = f'indice_{tipo}'
+        if clave not in st.session_state:
+            with perfil.tramo(f"build rollup index ({tipo})"):
+                libro = libro_mayor()
+                st.session_state[clave] = IndiceAgregados.desde_registros(libro.ingresos if tipo == 'incomes' else libro.gastos)
+        return st.session_state[clave]
+
+    # Monthly budgets and running spend per (month, category): built once per session, then kept up to date on every added expense
+    def presupuestos():
+        if 'presupuestos' not in st.session_state:
+            with perfil.tramo("build budget counters"):
+                st.session_state['presupuestos'] = Presupuestos.desde_registros(
+                    libro_mayor().gastos, Presupuestos.limites_desde_registros(st.session_state['budgets']))
+        return st.session_state['presupuestos']
+
+    # Per-category running statistics of expenses (suspicious transactions): built once per session, then updated on every added expense
+    def detector_anomalias():
+        if 'anomalias' not in st.session_state:
+            with perfil.tramo("build anomaly detector"):
+                st.session_state['anomalias'] = DetectorAnomalias.desde_registros(
+                    libro_mayor().gastos, umbral_z=ajustes['anomalias_umbral_z'], minimo=ajustes['anomalias_minimo'])
+        return st.session_state['anomalias']
+
+    # Unified income/expense frame: built once per session and dropped whenever a ledger changes
+    def libro_mayor():
+        if 'libro_mayor' not in st.session_state:
+            with perfil.tramo("build unified ledger"):
+                try:
+                    st.session_state['libro_mayor'] = LibroMayor(st.session_state['incomes'], st.session_state['expenses'],
+                                                                 st.session_state['recurring'])
+                except ValueError as e:
+                    # A transaction in a currency without FX rates: totals in the base currency would be wrong
+                    st.error(f"{e}. Add its rates to {ajustes['tipos_cambio_ruta']}.")
+                    st.stop()
+        return st.session_state['libro_mayor']
 
     # Function to export data to Excel
+    @perfil.envolver
     def to_excel(dataframes=None):
         output = BytesIO()
         
@@ -118,32 +196,68 @@ if authentication_status:
         
         return output.getvalue()
 
-    # Function to calculate monthly totals
-    def calculate_monthly_totals(data):
-        if not data:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(data)
-        if 'date' not in df.columns:
-            df['date'] = datetime.now().strftime("%Y-%m-%d")
-        
-        df['date'] = pd.to_datetime(df['date'])
-        df['month'] = df['date'].dt.month
-        df['year'] = df['date'].dt.year
-        
-        monthly_totals = df.groupby(['year', 'month'])['amount'].sum().reset_index()
-        monthly_totals['month_name'] = monthly_totals['month'].apply(lambda x: calendar.month_name[x])
-        return monthly_totals
+    # Timed wrappers for the hot paths shown in the timing panel
+    calculate_monthly_totals = perfil.envolver(calculate_monthly_totals)
 
-    # Load data into session state
-    if 'incomes' not in st.session_state:
-        st.session_state['incomes'] = load_data(incomes_file_path)
+    def mostrar_figura(fig):
+        with perfil.tramo("render: st.pyplot"), DURACION_RENDER.medir(motor="matplotlib"):
+            st.pyplot(fig)
 
-    if 'expenses' not in st.session_state:
-        st.session_state['expenses'] = load_data(expenses_file_path)
-        
-    if 'goals' not in st.session_state:
-        st.session_state['goals'] = load_data(goals_file_path)
+    def mostrar_vega(spec, **kwargs):
+        with perfil.tramo("render: st.vega_lite_chart"), DURACION_RENDER.medir(motor="vega"):
+            st.vega_lite_chart(spec, **kwargs)
+
+    # Paginated table: only the visible page is formatted and sent to the browser
+    def mostrar_tabla(df, clave, formatear=None, estatica=False, **kwargs):
+        clave_cursor = f'cursor_{clave}'
+        filas, anterior, siguiente, (inicio, fin) = paginar(df, st.session_state.get(clave_cursor), ajustes['filas_por_pagina'])
+        if formatear:
+            filas = formatear(filas)
+        with perfil.tramo(f"render table: {clave}"):
+            if estatica:
+                st.table(filas)
+            else:
+                st.dataframe(filas, **kwargs)
+        if anterior or siguiente:
+            col_anterior, col_filas, col_siguiente = st.columns([1, 3, 1])
+            col_anterior.button("◀ Previous", key=f'anterior_{clave}', disabled=anterior is None,
+                                on_click=st.session_state.__setitem__, args=(clave_cursor, anterior))
+            col_filas.caption(f"Rows {inicio + 1}–{fin} of {len(df)}")
+            col_siguiente.button("Next ▶", key=f'siguiente_{clave}', disabled=siguiente is None,
+                                 on_click=st.session_state.__setitem__, args=(clave_cursor, siguiente))
+
+    # Load every per-user file that is not in session state yet, all at once, behind a skeleton
+    pendientes = {clave: ruta for clave, ruta in rutas_archivos.items() if clave not in st.session_state}
+    if pendientes:
+        if 'incomes' in pendientes:
+            SESIONES.inc()
+        for ruta in pendientes.values():
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+        esqueleto = st.empty()
+        esqueleto.markdown("""
+        <style>
+            @keyframes skeleton-pulse { 0% { opacity: 1; } 50% { opacity: 0.4; } 100% { opacity: 1; } }
+            .skeleton { background-color: #e0e0e0; border-radius: 8px; margin: 10px 0px; animation: skeleton-pulse 1.2s infinite; }
+        </style>
+        <div class="skeleton" style="height: 2.5rem; width: 60%; margin: 0 auto;"></div>
+        <div style="display: flex; gap: 20px;">
+            <div class="skeleton" style="height: 90px; flex: 1;"></div>
+            <div class="skeleton" style="height: 90px; flex: 1;"></div>
+            <div class="skeleton" style="height: 90px; flex: 1;"></div>
+        </div>
+        <div class="skeleton" style="height: 300px;"></div>
+        """, unsafe_allow_html=True)
+        with perfil.tramo("load_data (concurrent)"):
+            if servicio:
+                st.session_state.update(servicio.cargar(st.session_state.username, list(pendientes)))
+            else:
+                st.session_state.update(cargar_varios(pendientes))
+        esqueleto.empty()
+
+    # Chart rendering backend (server-side matplotlib or client-side Vega-Lite)
+    if 'motor_graficos' not in st.session_state:
+        st.session_state['motor_graficos'] = ajustes['motor_graficos']
 
     # Initialize dark mode in session state if not present
     if 'dark_mode' not in st.session_state:
@@ -194,10 +308,22 @@ if authentication_status:
         "View Charts", 
         "View Tables", 
         "Financial Goals",
+        "Budgets",
         "Recommendations", 
         "Export Data"
     ])
 
+    motor_graficos = st.sidebar.selectbox(
+        "Chart rendering",
+        MOTORES_GRAFICOS,
+        key='motor_graficos'
+    )
+    usar_vega = motor_graficos == "vega"
+
+    # Everything below belongs to the selected page
+    tramo_pagina = ExitStack()
+    tramo_pagina.enter_context(perfil.tramo(f"page: {menu}"))
+
     # Main image (only on Dashboard)
     if menu == "Dashboard":
         st.image(main_image_path, use_container_width=True)
@@ -244,26 +370,17 @@ if authentication_status:
         current_month = today.strftime("%B")
         current_year = today.year
         
-        # Calculate summary metrics
-        total_income = sum(item["amount"] for item in st.session_state['incomes'])
-        total_expense = sum(item["amount"] for item in st.session_state['expenses'])
+        # Calculate summary metrics (unified ledger: amounts already in the base currency)
+        libro = libro_mayor()
+        total_income = libro.total("Income")
+        total_expense = libro.total("Expense")
         balance = total_income - total_expense
         
         # Current month data
-        current_month_incomes = [
-            income for income in st.session_state['incomes'] 
-            if 'date' in income and datetime.strptime(income['date'], '%Y-%m-%d').month == today.month
-            and datetime.strptime(income['date'], '%Y-%m-%d').year == today.year
-        ]
-        
-        current_month_expenses = [
-            expense for expense in st.session_state['expenses'] 
-            if 'date' in expense and datetime.strptime(expense['date'], '%Y-%m-%d').month == today.month
-            and datetime.strptime(expense['date'], '%Y-%m-%d').year == today.year
-        ]
-        
-        current_month_income = sum(item["amount"] for item in current_month_incomes)
-        current_month_expense = sum(item["amount"] for item in current_month_expenses)
+        month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+        current_month_income = libro.total("Income", inicio=month_start, fin=next_month_start)
+        current_month_expense = libro.total("Expense", inicio=month_start, fin=next_month_start)
         current_month_balance = current_month_income - current_month_expense
         
         # Display key metrics in three columns
@@ -273,19 +390,19 @@ if authentication_status:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.markdown("<h2 class='sub-header'>Total Balance</h2>", unsafe_allow_html=True)
             balance_color = "green" if balance >= 0 else "red"
-            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:{balance_color}'>${balance:.2f}</div><div class='metric-label'>All-time Balance</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:{balance_color}'>{formato.moneda(balance)}</div><div class='metric-label'>All-time Balance</div></div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
         with col2:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.markdown("<h2 class='sub-header'>Total Income</h2>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:blue'>${total_income:.2f}</div><div class='metric-label'>All-time Income</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:blue'>{formato.moneda(total_income)}</div><div class='metric-label'>All-time Income</div></div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
         with col3:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.markdown("<h2 class='sub-header'>Total Expenses</h2>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:purple'>${total_expense:.2f}</div><div class='metric-label'>All-time Expenses</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:purple'>{formato.moneda(total_expense)}</div><div class='metric-label'>All-time Expenses</div></div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
         # Current month metrics
@@ -297,80 +414,80 @@ if authentication_status:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.markdown(f"<h3>{current_month} Balance</h3>", unsafe_allow_html=True)
             month_balance_color = "green" if current_month_balance >= 0 else "red"
-            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:{month_balance_color}'>${current_month_balance:.2f}</div><div class='metric-label'>{current_month} {current_year}</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:{month_balance_color}'>{formato.moneda(current_month_balance)}</div><div class='metric-label'>{current_month} {current_year}</div></div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
         with col2:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.markdown(f"<h3>{current_month} Income</h3>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:blue'>${current_month_income:.2f}</div><div class='metric-label'>{current_month} {current_year}</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:blue'>{formato.moneda(current_month_income)}</div><div class='metric-label'>{current_month} {current_year}</div></div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
         with col3:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.markdown(f"<h3>{current_month} Expenses</h3>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:purple'>${current_month_expense:.2f}</div><div class='metric-label'>{current_month} {current_year}</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='metric-card'><div class='metric-value' style='color:purple'>{formato.moneda(current_month_expense)}</div><div class='metric-label'>{current_month} {current_year}</div></div>", unsafe_allow_html=True)
             st.markdown("</div>", unsafe_allow_html=True)
         
+        # Budget alerts for the current month (running counters: no scan of the ledger)
+        for category, spent, limit in presupuestos().alertas(today):
+            st.warning(f"Over budget in {category}: {formato.moneda(spent)} spent of {formato.moneda(limit)} this month.")
+        
         # Monthly trends
         st.markdown("<h2 class='sub-header' style='margin-top: 30px;'>Monthly Trends</h2>", unsafe_allow_html=True)
         
         # Calculate monthly data
-        monthly_incomes = calculate_monthly_totals(st.session_state['incomes'])
-        monthly_expenses = calculate_monthly_totals(st.session_state['expenses'])
+        if servicio:
+            monthly_incomes = pd.DataFrame(servicio.analizar(st.session_state.username, "monthly_totals", tipo="incomes"))
+            monthly_expenses = pd.DataFrame(servicio.analizar(st.session_state.username, "monthly_totals", tipo="expenses"))
+        else:
+            monthly_incomes = calculate_monthly_totals(con_recurrentes(st.session_state['incomes'], st.session_state['recurring'], "income"))
+            monthly_expenses = calculate_monthly_totals(con_recurrentes(st.session_state['expenses'], st.session_state['recurring'], "expense"))
         
         # Only render if we have data
-        if not monthly_incomes.empty or not monthly_expenses.empty:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            # Plot income
-            if not monthly_incomes.empty:
-                ax.bar(monthly_incomes['month_name'], monthly_incomes['amount'], alpha=0.6, label='Income', color='blue')
+        if (not monthly_incomes.empty or not monthly_expenses.empty) and usar_vega:
+            monthly_data = pd.concat([
+                monthly_incomes.assign(type='Income'),
+                monthly_expenses.assign(type='Expenses')
+            ])[['month_name', 'type', 'amount']]
+            mostrar_vega(
+                spec_barras(monthly_data, 'month_name', 'amount', 'Monthly Income vs Expenses', color='type', orden=None),
+                use_container_width=True
+            )
+        elif not monthly_incomes.empty or not monthly_expenses.empty:
+            with figura(figsize=(10, 6)) as (fig, ax):
+                # Plot income
+                if not monthly_incomes.empty:
+                    ax.bar(monthly_incomes['month_name'], monthly_incomes['amount'], alpha=0.6, label='Income', color='blue')
             
-            # Plot expenses
-            if not monthly_expenses.empty:
-                ax.bar(monthly_expenses['month_name'], monthly_expenses['amount'], alpha=0.6, label='Expenses', color='red')
+                # Plot expenses
+                if not monthly_expenses.empty:
+                    ax.bar(monthly_expenses['month_name'], monthly_expenses['amount'], alpha=0.6, label='Expenses', color='red')
             
-            ax.set_title('Monthly Income vs Expenses')
-            ax.set_xlabel('Month')
-            ax.set_ylabel('Amount ($)')
-            ax.legend()
+                ax.set_title('Monthly Income vs Expenses')
+                ax.set_xlabel('Month')
+                ax.set_ylabel('Amount ($)')
+                ax.legend()
             
-            # Rotate x-axis labels for better readability
-            plt.xticks(rotation=45)
-            plt.tight_layout()
+                # Rotate x-axis labels for better readability
+                ax.tick_params(axis='x', rotation=45)
+                fig.tight_layout()
             
-            st.pyplot(fig)
+                mostrar_figura(fig)
         else:
             st.info("No monthly data available yet. Add income and expenses to see trends.")
         
         # Recent transactions
         st.markdown("<h2 class='sub-header' style='margin-top: 30px;'>Recent Transactions</h2>", unsafe_allow_html=True)
         
-        # Combine and sort transactions
-        all_transactions = []
-        
-        for income in st.session_state['incomes']:
-            transaction = income.copy()
-            transaction['type'] = 'Income'
-            all_transactions.append(transaction)
-        
-        for expense in st.session_state['expenses']:
-            transaction = expense.copy()
-            transaction['type'] = 'Expense'
-            all_transactions.append(transaction)
-        
-        # Sort by date (most recent first)
-        all_transactions.sort(key=lambda x: datetime.strptime(x.get('date', '1900-01-01'), '%Y-%m-%d'), reverse=True)
+        # The 5 most recent transactions of the unified ledger (most recent first)
+        df_recent = libro_mayor().recientes(5)
         
         # Display recent transactions
-        if all_transactions:
-            # Take only the 5 most recent transactions
-            recent_transactions = all_transactions[:5]
-            
+        if not df_recent.empty:
             # Create a dataframe for display
-            df_recent = pd.DataFrame(recent_transactions)
-            df_recent = df_recent[['date', 'type', 'category', 'description', 'amount']]
+            df_recent = df_recent[['date', 'type', 'category', 'description', 'amount']].assign(
+                date=df_recent['date'].dt.strftime('%Y-%m-%d'))
             
             # Style the dataframe
             st.dataframe(df_recent, height=200)
@@ -388,31 +505,8 @@ if authentication_status:
         """)
         st.markdown("</div>", unsafe_allow_html=True)
         
-        # Define categories and descriptions
-        income_categories = ["Salary", "Bonus", "Investment", "Other"]
-        expense_categories = ["Food", "Transportation", "Housing", "Entertainment", "Health", 
-                             "Education", "Utilities", "Insurance", "Debt", "Savings", "Gifts", 
-                             "Travel", "Other"]
-        
-        descriptions = {
-            "Salary": ["Monthly Salary", "Freelance Work", "Part-time Job", "Consulting"],
-            "Bonus": ["Year-end Bonus", "Performance Bonus", "Referral Bonus", "Holiday Bonus"],
-            "Investment": ["Stock Dividends", "Real Estate Income", "Interest Income", "Cryptocurrency Gains"],
-            "Other": ["Gift", "Lottery", "Inheritance", "Found Money"],
-            "Food": ["Groceries", "Dining Out", "Snacks", "Beverages"],
-            "Transportation": ["Gas", "Public Transport", "Car Maintenance", "Parking Fees"],
-            "Housing": ["Rent", "Mortgage", "Property Taxes", "Home Repairs"],
-            "Entertainment": ["Movies", "Concerts", "Streaming Services", "Games"],
-            "Health": ["Doctor Visit", "Medication", "Health Insurance", "Gym Membership"],
-            "Education": ["Tuition", "Books", "Online Courses", "Workshops"],
-            "Utilities": ["Electricity", "Water", "Internet", "Phone"],
-            "Insurance": ["Car Insurance", "Home Insurance", "Life Insurance", "Health Insurance"],
-            "Debt": ["Credit Card Payment", "Loan Payment", "Mortgage Payment", "Student Loan Payment"],
-            "Savings": ["Emergency Fund", "Retirement Fund", "Investment Account", "Savings Account"],
-            "Gifts": ["Birthday Gifts", "Holiday Gifts", "Wedding Gifts", "Charity"],
-            "Travel": ["Flights", "Hotels", "Car Rental", "Activities"],
-            "Other": ["Miscellaneous", "Unexpected Expenses", "Pet Expenses", "Subscriptions"]
-        }
+        # Categories and descriptions come from the configurable taxonomy (config/taxonomia.yaml)
+        taxonomia = cargar_taxonomia()
         
         # Create a form for adding income or expense
         col1, col2 = st.columns(2)
@@ -425,37 +519,58 @@ if authentication_status:
             trans_type = st.selectbox("Select type", ["Income", "Expense"])
             
             # Select category based on transaction type
-            if trans_type == "Income":
-                category = st.selectbox("Select category", income_categories)
-            else:
-                category = st.selectbox("Select category", expense_categories)
+            tipo_taxonomia = "income" if trans_type == "Income" else "expense"
+            category = st.selectbox("Select category", taxonomia.categorias(tipo_taxonomia))
             
             # Select description based on category
-            description = st.selectbox("Select description", descriptions[category])
+            description = st.selectbox("Select description", taxonomia.descripciones(tipo_taxonomia, category))
             
             # Enter amount
             amount = st.number_input("Enter amount", min_value=0.01, step=0.01, format="%.2f")
             
+            # Select currency (only offered when an FX rate table lists other currencies)
+            cambios = cargar_tipos_cambio()
+            currency = None
+            if len(cambios.divisas()) > 1:
+                currency = st.selectbox("Currency", cambios.divisas())
+            
             # Select date
             date = st.date_input("Select date", datetime.now())
             date_str = date.strftime("%Y-%m-%d")
             
             # Add button
             if st.button("Add Transaction"):
+                new_transaction = {"amount": amount, "description": description, 
+                                   "category": category, "date": date_str}
+                if currency:
+                    new_transaction["currency"] = currency
+                amount_text = formato.moneda(amount) if currency in (None, cambios.base) \
+                    else Formato(currency, ajustes['locale']).moneda(amount)
+                # The rollup index works in the base currency
+                converted = dict(new_transaction, amount=amount * cambios.tasa(currency or cambios.base, date_str))
                 if trans_type == "Income":
                     # Add income
-                    new_income = {"amount": amount, "description": description, 
-                                 "category": category, "date": date_str}
-                    st.session_state['incomes'].append(new_income)
+                    indice_agregados('incomes').añadir(converted)
+                    st.session_state.pop('libro_mayor', None)
+                    st.session_state['incomes'].append(new_transaction)
                     save_data(st.session_state['incomes'], incomes_file_path)
-                    st.success(f"Income of ${amount:.2f} added successfully!")
+                    st.success(f"Income of {amount_text} added successfully!")
                 else:
                     # Add expense
-                    new_expense = {"amount": amount, "description": description, 
-                                  "category": category, "date": date_str}
-                    st.session_state['expenses'].append(new_expense)
+                    indice_agregados('expenses').añadir(converted)
+                    presupuestos().añadir(converted)
+                    z_score = detector_anomalias().añadir(converted)
+                    st.session_state.pop('libro_mayor', None)
+                    st.session_state['expenses'].append(new_transaction)
                     save_data(st.session_state['expenses'], expenses_file_path)
-                    st.success(f"Expense of ${amount:.2f} added successfully!")
+                    st.success(f"Expense of {amount_text} added successfully!")
+                    if z_score is not None:
+                        st.warning(f"This expense is unusually large for {category} ({z_score:.1f} standard deviations above "
+                                   f"its average). It has been added to the suspicious transactions in View Tables.")
+                    if presupuestos().excedido(category, date_str):
+                        st.warning(f"You are over your {category} budget for {date.strftime('%B %Y')}: "
+                                   f"{formato.moneda(presupuestos().gasto(category, date_str))} spent of "
+                                   f"{formato.moneda(presupuestos().limites[category])}.")
             
             st.markdown("</div>", unsafe_allow_html=True)
         
@@ -464,55 +579,83 @@ if authentication_status:
             st.subheader("Quick Summary")
             
             # Display total income, expenses and balance
-            total_income = sum(item["amount"] for item in st.session_state['incomes'])
-            total_expense = sum(item["amount"] for item in st.session_state['expenses'])
+            total_income = libro_mayor().total("Income")
+            total_expense = libro_mayor().total("Expense")
             balance = total_income - total_expense
             
-            st.info(f"Total Income: ${total_income:.2f}")
-            st.info(f"Total Expenses: ${total_expense:.2f}")
+            st.info(f"Total Income: {formato.moneda(total_income)}")
+            st.info(f"Total Expenses: {formato.moneda(total_expense)}")
             
             # Show balance with appropriate color
             if balance >= 0:
-                st.success(f"Current Balance: ${balance:.2f}")
+                st.success(f"Current Balance: {formato.moneda(balance)}")
             else:
-                st.error(f"Current Balance: ${balance:.2f}")
+                st.error(f"Current Balance: {formato.moneda(balance)}")
                 
             # Show recent transactions
             st.subheader("Last 3 Transactions")
             
-            # Combine and sort transactions
-            all_transactions = []
-            for income in st.session_state['incomes']:
-                transaction = income.copy()
-                transaction['type'] = 'Income'
-                all_transactions.append(transaction)
-            
-            for expense in st.session_state['expenses']:
-                transaction = expense.copy()
-                transaction['type'] = 'Expense'
-                all_transactions.append(transaction)
-            
-            # Sort by date (most recent first)
-            all_transactions.sort(key=lambda x: datetime.strptime(x.get('date', '1900-01-01'), '%Y-%m-%d'), reverse=True)
+            # The 3 most recent transactions of the unified ledger (most recent first)
+            recent_transactions = libro_mayor().recientes(3)
             
             # Display recent transactions
-            if all_transactions:
-                # Take only the 3 most recent transactions
-                recent_transactions = all_transactions[:3]
-                
-                for idx, transaction in enumerate(recent_transactions):
-                    date = transaction.get('date', 'N/A')
+            if not recent_transactions.empty:
+                for idx, transaction in enumerate(recent_transactions.to_dict('records')):
+                    date = transaction['date'].strftime('%Y-%m-%d')
                     trans_type = transaction.get('type', 'N/A')
                     category = transaction.get('category', 'N/A')
                     amount = transaction.get('amount', 0)
                     
                     type_color = "blue" if trans_type == "Income" else "red"
-                    st.markdown(f"<p>{date} - <span style='color:{type_color}'>{trans_type}</span> - {category} - ${amount:.2f}</p>", unsafe_allow_html=True)
+                    st.markdown(f"<p>{date} - <span style='color:{type_color}'>{trans_type}</span> - {category} - {formato.moneda(amount)}</p>", unsafe_allow_html=True)
             else:
                 st.write("No transactions yet.")
             
             st.markdown("</div>", unsafe_allow_html=True)
 
+        # Recurring transactions: one stored rule each, expanded in memory up to today wherever the ledger is used
+        st.markdown("<h2 class='sub-header' style='margin-top: 30px;'>Recurring Transactions</h2>", unsafe_allow_html=True)
+        with st.expander("Add a recurring transaction"):
+            rec_type = st.selectbox("Type", ["Income", "Expense"], key="recurring_type")
+            rec_tipo = "income" if rec_type == "Income" else "expense"
+            rec_category = st.selectbox("Category", taxonomia.categorias(rec_tipo), key="recurring_category")
+            rec_description = st.selectbox("Description", taxonomia.descripciones(rec_tipo, rec_category), key="recurring_description")
+            rec_amount = st.number_input("Amount", min_value=0.01, step=0.01, format="%.2f", key="recurring_amount")
+            rec_currency = st.selectbox("Currency", cambios.divisas(), key="recurring_currency") if len(cambios.divisas()) > 1 else None
+            rec_frequency = st.selectbox("Frequency", list(FRECUENCIAS) + ["Custom (RRULE)"], index=1, key="recurring_frequency")
+            if rec_frequency in FRECUENCIAS:
+                rec_rule = FRECUENCIAS[rec_frequency]
+            else:
+                rec_rule = st.text_input("RRULE", "FREQ=WEEKLY;INTERVAL=2", key="recurring_rule",
+                                         help="iCalendar recurrence rule, e.g. FREQ=MONTHLY;BYMONTHDAY=1")
+            rec_start = st.date_input("Start date", datetime.now(), key="recurring_start")
+            rec_has_end = st.checkbox("Ends on a date", key="recurring_has_end")
+            rec_end = st.date_input("End date", datetime.now() + timedelta(days=365), key="recurring_end") if rec_has_end else None
+
+            if st.button("Add Recurring Transaction"):
+                rule = {"type": rec_tipo, "amount": rec_amount, "description": rec_description,
+                        "category": rec_category, "start": rec_start.strftime("%Y-%m-%d"),
+                        "end": rec_end.strftime("%Y-%m-%d") if rec_end else "", "rule": rec_rule}
+                if rec_currency:
+                    rule["currency"] = rec_currency
+                try:
+                    rule = validar_regla(rule)
+                except ValueError as e:
+                    st.error(f"Invalid recurring transaction: {e}")
+                else:
+                    st.session_state['recurring'].append(rule)
+                    save_data(st.session_state['recurring'], rutas_archivos['recurring'])
+                    # Its past occurrences change the ledger and every total built from it
+                    for clave in ('libro_mayor', 'indice_incomes', 'indice_expenses', 'presupuestos', 'anomalias'):
+                        st.session_state.pop(clave, None)
+                    st.success(f"Recurring {rec_type.lower()} of {formato.moneda(rec_amount)} added successfully!")
+
+        if st.session_state['recurring']:
+            rules_df = pd.DataFrame(st.session_state['recurring'])
+            rules_df['next'] = [fecha.strftime("%Y-%m-%d") if fecha else "ended" for fecha in map(siguiente, st.session_state['recurring'])]
+            rules_df['amount'] = formato.moneda(rules_df['amount'])
+            st.dataframe(rules_df, hide_index=True)
+
     # View Charts page
     elif menu == "View Charts":
         st.markdown("<h1 class='main-header'>Financial Charts</h1>", unsafe_allow_html=True)
@@ -525,18 +668,12 @@ if authentication_status:
         st.markdown("</div>", unsafe_allow_html=True)
         
         # Create tabs for different chart types
-        chart_tabs = st.tabs(["Income & Expense Overview", "Category Breakdown", "Time Trends", "Custom Analysis"])
-        
-        # Get the data
-        df_incomes = pd.DataFrame(st.session_state['incomes'])
-        df_expenses = pd.DataFrame(st.session_state['expenses'])
+        chart_tabs = st.tabs(["Income & Expense Overview", "Category Breakdown", "Time Trends", "Custom Analysis", "Forecast"])
         
-        # Add date conversion if dataframes aren't empty
-        if not df_incomes.empty and 'date' in df_incomes.columns:
-            df_incomes['date'] = pd.to_datetime(df_incomes['date'])
-        
-        if not df_expenses.empty and 'date' in df_expenses.columns:
-            df_expenses['date'] = pd.to_datetime(df_expenses['date'])
+        # Get the data: per-type views are slices of the unified ledger (dates already parsed)
+        libro = libro_mayor()
+        df_incomes = libro.ingresos
+        df_expenses = libro.gastos
         
         # Tab 1: Income & Expense Overview
         with chart_tabs[0]:
@@ -544,45 +681,59 @@ if authentication_status:
             
             # Create figure with 2 subplots
             if not df_incomes.empty or not df_expenses.empty:
-                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-                
                 # Income vs Expense Bar Chart
                 total_income = df_incomes['amount'].sum() if not df_incomes.empty else 0
                 total_expense = df_expenses['amount'].sum() if not df_expenses.empty else 0
-                
-                ax1.bar(['Income', 'Expense'], [total_income, total_expense], color=['green', 'red'])
-                ax1.set_title('Total Income vs Expense')
-                ax1.set_ylabel('Amount ($)')
-                
-                # Add value labels on the bars
-                for i, v in enumerate([total_income, total_expense]):
-                    ax1.text(i, v + 5, f"${v:.2f}", ha='center')
-                
+
                 # Income vs Expense Pie Chart
                 balance = total_income - total_expense
                 savings_rate = (balance / total_income * 100) if total_income > 0 else 0
-                
-                ax2.pie([total_income, total_expense], 
-                       labels=['Income', 'Expense'], 
-                       autopct='%1.1f%%',
-                       colors=['green', 'red'],
-                       startangle=90)
-                ax2.set_title(f'Income vs Expense (Savings Rate: {savings_rate:.1f}%)')
-                
-                plt.tight_layout()
-                st.pyplot(fig)
+
+                if usar_vega:
+                    totals = pd.Series([total_income, total_expense], index=['Income', 'Expense'])
+                    vega_col1, vega_col2 = st.columns(2)
+                    with vega_col1:
+                        mostrar_vega(
+                            spec_barras(totals.rename('amount').rename_axis('type').reset_index(), 'type', 'amount',
+                                        'Total Income vs Expense', orden=None),
+                            use_container_width=True
+                        )
+                    with vega_col2:
+                        mostrar_vega(
+                            spec_tarta(totals, f'Income vs Expense (Savings Rate: {savings_rate:.1f}%)', colores=['green', 'red']),
+                            use_container_width=True
+                        )
+                else:
+                    with figura(1, 2, figsize=(14, 6)) as (fig, (ax1, ax2)):
+                        ax1.bar(['Income', 'Expense'], [total_income, total_expense], color=['green', 'red'])
+                        ax1.set_title('Total Income vs Expense')
+                        ax1.set_ylabel('Amount ($)')
+
+                        # Add value labels on the bars
+                        for i, v in enumerate([total_income, total_expense]):
+                            ax1.text(i, v + 5, formato.moneda(v), ha='center')
+
+                        ax2.pie([total_income, total_expense],
+                               labels=['Income', 'Expense'],
+                               autopct='%1.1f%%',
+                               colors=['green', 'red'],
+                               startangle=90)
+                        ax2.set_title(f'Income vs Expense (Savings Rate: {savings_rate:.1f}%)')
+
+                        fig.tight_layout()
+                        mostrar_figura(fig)
                 
                 # Additional stats
                 st.markdown("<div class='card'>", unsafe_allow_html=True)
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Total Income", f"${total_income:.2f}")
+                    st.metric("Total Income", formato.moneda(total_income))
                 
                 with col2:
-                    st.metric("Total Expenses", f"${total_expense:.2f}")
+                    st.metric("Total Expenses", formato.moneda(total_expense))
                 
                 with col3:
-                    st.metric("Balance", f"${balance:.2f}", delta=f"{savings_rate:.1f}% of income" if total_income > 0 else "N/A")
+                    st.metric("Balance", formato.moneda(balance), delta=f"{savings_rate:.1f}% of income" if total_income > 0 else "N/A")
                 st.markdown("</div>", unsafe_allow_html=True)
             else:
                 st.info("No data available to generate charts. Please add your income and expenses.")
@@ -596,44 +747,60 @@ if authentication_status:
             
             if category_type == "Income" and not df_incomes.empty:
                 df = df_incomes
+                indice = indice_agregados('incomes')
                 color_palette = "viridis"
             elif category_type == "Expense" and not df_expenses.empty:
                 df = df_expenses
+                indice = indice_agregados('expenses')
                 color_palette = "magma"
             else:
                 st.info(f"No {category_type.lower()} data available to generate charts.")
                 df = pd.DataFrame()
             
             if not df.empty:
-                # Create figure with 2 subplots
-                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-                
                 # Category Bar Chart
-                category_totals = df.groupby('category')['amount'].sum().reset_index()
-                
+                # Category totals come straight from the rollup index (no groupby over the ledger)
+                category_totals = pd.DataFrame(list(indice.desglose().items()), columns=['category', 'amount'])
+
                 # Sort by amount for better visualization
                 category_totals = category_totals.sort_values('amount', ascending=False)
-                
-                sns.barplot(x='category', y='amount', data=category_totals, palette=color_palette, ax=ax1)
-                ax1.set_title(f'{category_type} by Category')
-                ax1.set_xlabel('Category')
-                ax1.set_ylabel('Amount ($)')
-                ax1.tick_params(axis='x', rotation=45)
-                
-                # Add value labels
-                for i, v in enumerate(category_totals['amount']):
-                    ax1.text(i, v + 5, f"${v:.0f}", ha='center')
-                
-                # Category Pie Chart
-                ax2.pie(category_totals['amount'], 
-                       labels=category_totals['category'], 
-                       autopct='%1.1f%%',
-                       colors=sns.color_palette(color_palette, len(category_totals)),
-                       startangle=90)
-                ax2.set_title(f'{category_type} Distribution by Category')
-                
-                plt.tight_layout()
-                st.pyplot(fig)
+
+                if usar_vega:
+                    vega_col1, vega_col2 = st.columns(2)
+                    with vega_col1:
+                        mostrar_vega(
+                            spec_barras(category_totals, 'category', 'amount', f'{category_type} by Category', esquema=color_palette),
+                            use_container_width=True
+                        )
+                    with vega_col2:
+                        mostrar_vega(
+                            spec_tarta(category_totals.set_index('category')['amount'],
+                                       f'{category_type} Distribution by Category', esquema=color_palette),
+                            use_container_width=True
+                        )
+                else:
+                    # Create figure with 2 subplots
+                    with figura(1, 2, figsize=(14, 6)) as (fig, (ax1, ax2)):
+                        sns.barplot(x='category', y='amount', data=category_totals, palette=color_palette, ax=ax1)
+                        ax1.set_title(f'{category_type} by Category')
+                        ax1.set_xlabel('Category')
+                        ax1.set_ylabel('Amount ($)')
+                        ax1.tick_params(axis='x', rotation=45)
+
+                        # Add value labels
+                        for i, v in enumerate(category_totals['amount']):
+                            ax1.text(i, v + 5, formato.moneda(v, decimales=0), ha='center')
+
+                        # Category Pie Chart
+                        ax2.pie(category_totals['amount'],
+                               labels=category_totals['category'],
+                               autopct='%1.1f%%',
+                               colors=sns.color_palette(color_palette, len(category_totals)),
+                               startangle=90)
+                        ax2.set_title(f'{category_type} Distribution by Category')
+
+                        fig.tight_layout()
+                        mostrar_figura(fig)
                 
                 # Display category breakdown as a table
                 st.subheader(f"{category_type} Breakdown by Category")
@@ -644,10 +811,24 @@ if authentication_status:
                 category_totals = category_totals.sort_values('amount', ascending=False)
                 
                 # Format table
-                category_totals['amount'] = category_totals['amount'].apply(lambda x: f"${x:.2f}")
-                category_totals['percentage'] = category_totals['percentage'].apply(lambda x: f"{x:.1f}%")
+                category_totals = formato.columnas(category_totals, monedas=['amount'], porcentajes=['percentage'])
                 
                 st.table(category_totals)
+                
+                # Drill down: description (and merchant) totals are lookups in the same index
+                drill_category = st.selectbox("Drill down into category", list(indice.desglose()), key="drill_down_category")
+                description_totals = pd.DataFrame(list(indice.desglose(drill_category).items()),
+                                                  columns=['description', 'amount']).sort_values('amount', ascending=False)
+                description_totals['share of category'] = description_totals['amount'] / indice.total(drill_category) * 100
+                description_totals = formato.columnas(description_totals, monedas=['amount'], porcentajes=['share of category'])
+                st.table(description_totals)
+                
+                for drill_description in indice.desglose(drill_category):
+                    merchant_totals = indice.desglose(drill_category, drill_description)
+                    if merchant_totals:
+                        st.caption(f"{drill_description} by merchant: " +
+                                   ", ".join(f"{merchant} {formato.moneda(total)}" for merchant, total in
+                                             sorted(merchant_totals.items(), key=lambda item: -item[1])))
             
         # Tab 3: Time Trends
         with chart_tabs[2]:
@@ -656,28 +837,18 @@ if authentication_status:
             # Filter options
             time_period = st.selectbox("Select time period", ["Monthly", "Weekly", "Daily"])
             
+            period_format = {"Monthly": '%Y-%m', "Weekly": '%Y-%W', "Daily": '%Y-%m-%d'}[time_period]
+            
             # Get time series data
             if not df_incomes.empty and 'date' in df_incomes.columns:
-                if time_period == "Monthly":
-                    df_incomes['period'] = df_incomes['date'].dt.strftime('%Y-%m')
-                elif time_period == "Weekly":
-                    df_incomes['period'] = df_incomes['date'].dt.strftime('%Y-%W')
-                else:  # Daily
-                    df_incomes['period'] = df_incomes['date'].dt.strftime('%Y-%m-%d')
-                    
-                incomes_by_period = df_incomes.groupby('period')['amount'].sum()
+                # Grouped by a local key: df_incomes is a view of the cached ledger and is never written to
+                incomes_by_period = df_incomes['amount'].groupby(df_incomes['date'].dt.strftime(period_format)).sum()
             else:
                 incomes_by_period = pd.Series(dtype=float)
             
             if not df_expenses.empty and 'date' in df_expenses.columns:
-                if time_period == "Monthly":
-                    df_expenses['period'] = df_expenses['date'].dt.strftime('%Y-%m')
-                elif time_period == "Weekly":
-                    df_expenses['period'] = df_expenses['date'].dt.strftime('%Y-%W')
-                else:  # Daily
-                    df_expenses['period'] = df_expenses['date'].dt.strftime('%Y-%m-%d')
-                    
-                expenses_by_period = df_expenses.groupby('period')['amount'].sum()
+                # Grouped by a local key: df_expenses is a view of the cached ledger and is never written to
+                expenses_by_period = df_expenses['amount'].groupby(df_expenses['date'].dt.strftime(period_format)).sum()
             else:
                 expenses_by_period = pd.Series(dtype=float)
             
@@ -698,33 +869,37 @@ if authentication_status:
                 df_time['balance'] = df_time['income'] - df_time['expense']
                 
                 # Plot time series
-                fig, ax = plt.subplots(figsize=(12, 6))
-                
-                ax.plot(df_time.index, df_time['income'], marker='o', linestyle='-', color='green', label='Income')
-                ax.plot(df_time.index, df_time['expense'], marker='o', linestyle='-', color='red', label='Expense')
-                ax.plot(df_time.index, df_time['balance'], marker='o', linestyle='-', color='blue', label='Balance')
-                
-                ax.set_title(f'{time_period} Financial Trend')
-                ax.set_xlabel('Period')
-                ax.set_ylabel('Amount ($)')
-                ax.legend()
-                
-                # Rotate x-axis labels for better readability
-                plt.xticks(rotation=45)
-                plt.tight_layout()
-                
-                st.pyplot(fig)
+                if usar_vega:
+                    df_time_long = df_time.rename_axis('period').reset_index().melt(
+                        id_vars='period', var_name='series', value_name='amount'
+                    )
+                    mostrar_vega(
+                        spec_lineas(df_time_long, 'period', 'amount', f'{time_period} Financial Trend', color='series'),
+                        use_container_width=True
+                    )
+                else:
+                    with figura(figsize=(12, 6)) as (fig, ax):
+                        ax.plot(df_time.index, df_time['income'], marker='o', linestyle='-', color='green', label='Income')
+                        ax.plot(df_time.index, df_time['expense'], marker='o', linestyle='-', color='red', label='Expense')
+                        ax.plot(df_time.index, df_time['balance'], marker='o', linestyle='-', color='blue', label='Balance')
+
+                        ax.set_title(f'{time_period} Financial Trend')
+                        ax.set_xlabel('Period')
+                        ax.set_ylabel('Amount ($)')
+                        ax.legend()
+
+                        # Rotate x-axis labels for better readability
+                        ax.tick_params(axis='x', rotation=45)
+                        fig.tight_layout()
+
+                        mostrar_figura(fig)
                 
                 # Show the data as a table
                 st.subheader(f"{time_period} Financial Data")
                 
-                # Format the table
-                display_df = df_time.copy()
-                display_df['income'] = display_df['income'].apply(lambda x: f"${x:.2f}")
-                display_df['expense'] = display_df['expense'].apply(lambda x: f"${x:.2f}")
-                display_df['balance'] = display_df['balance'].apply(lambda x: f"${x:.2f}")
-                
-                st.table(display_df)
+                # Format the table (only the rows of the visible page)
+                mostrar_tabla(df_time, 'time_trends', estatica=True,
+                              formatear=lambda display_df: formato.columnas(display_df, monedas=['income', 'expense', 'balance']))
             else:
                 st.info("Not enough time series data to generate charts. Please add dated income and expenses.")
         
@@ -742,32 +917,15 @@ if authentication_status:
             data_type = st.radio("Select data to analyze", ["Income", "Expense", "Both"])
             
             if data_type == "Income" and not df_incomes.empty:
-                df_analysis = df_incomes.copy()
+                df_analysis = df_incomes
                 analysis_possible = True
             elif data_type == "Expense" and not df_expenses.empty:
-                df_analysis = df_expenses.copy()
+                df_analysis = df_expenses
                 analysis_possible = True
             elif data_type == "Both" and (not df_incomes.empty or not df_expenses.empty):
                 # Combine income and expense data
-                if not df_incomes.empty:
-                    df_incomes_copy = df_incomes.copy()
-                    df_incomes_copy['type'] = 'Income'
-                else:
-                    df_incomes_copy = pd.DataFrame()
-                
-                if not df_expenses.empty:
-                    df_expenses_copy = df_expenses.copy()
-                    df_expenses_copy['type'] = 'Expense'
-                else:
-                    df_expenses_copy = pd.DataFrame()
-                
-                # Combine the data
-                if not df_incomes_copy.empty and not df_expenses_copy.empty:
-                    df_analysis = pd.concat([df_incomes_copy, df_expenses_copy])
-                elif not df_incomes_copy.empty:
-                    df_analysis = df_incomes_copy
-                else:
-                    df_analysis = df_expenses_copy
+                # The unified ledger already carries the type column: no copies, no concat
+                df_analysis = libro.todo
                     
                 analysis_possible = True
             else:
@@ -775,6 +933,9 @@ if authentication_status:
                 analysis_possible = False
             
             if analysis_possible:
+                # The same filters as (types, categories, start, end) for the histogram sketch index
+                sketch_filters = [None if data_type == "Both" else [data_type], None, None, None]
+
                 # Date range filter
                 if 'date' in df_analysis.columns:
                     min_date = df_analysis['date'].min().date()
@@ -789,6 +950,7 @@ if authentication_status:
                     
                     if len(date_range) == 2:
                         start_date, end_date = date_range
+                        sketch_filters[2:] = [start_date, end_date]
                         df_analysis = df_analysis[
                             (df_analysis['date'].dt.date >= start_date) &
                             (df_analysis['date'].dt.date <= end_date)
@@ -804,6 +966,7 @@ if authentication_status:
                     )
                     
                     if selected_categories:
+                        sketch_filters[1] = selected_categories
                         df_analysis = df_analysis[df_analysis['category'].isin(selected_categories)]
                 
                 # Generate custom chart
@@ -813,104 +976,185 @@ if authentication_status:
                         options=["Bar Chart", "Pie Chart", "Line Chart", "Histogram"]
                     )
                     
-                    fig, ax = plt.subplots(figsize=(12, 6))
-                    
-                    if chart_type == "Bar Chart":
-                        # Group data
-                        if 'category' in df_analysis.columns:
-                            group_by = st.selectbox("Group by", ["category", "description"])
-                            df_grouped = df_analysis.groupby(group_by)['amount'].sum().reset_index()
-                            
-                            # Sort by amount for better visualization
-                            df_grouped = df_grouped.sort_values('amount', ascending=False)
+                    # Vega-Lite spec for client-side rendering, otherwise a matplotlib figure
+                    chart_spec = None
+                    with nullcontext((None, None)) if usar_vega else figura(figsize=(12, 6)) as (fig, ax):
+                        if chart_type == "Bar Chart":
+                            # Group data
+                            if 'category' in df_analysis.columns:
+                                group_by = st.selectbox("Group by", ["category", "description"])
+                                df_grouped = libro.sumar_por_grupo(group_by, *sketch_filters).reset_index()
                             
-                            # Plot bar chart
-                            sns.barplot(x=group_by, y='amount', data=df_grouped, palette='viridis', ax=ax)
-                            ax.set_title(f'{data_type} by {group_by.capitalize()}')
-                            ax.set_xlabel(group_by.capitalize())
-                            ax.set_ylabel('Amount ($)')
-                            ax.tick_params(axis='x', rotation=45)
+                                # Sort by amount for better visualization
+                                df_grouped = df_grouped.sort_values('amount', ascending=False)
                             
-                            # Add value labels
-                            for i, v in enumerate(df_grouped['amount']):
-                                ax.text(i, v + 5, f"${v:.0f}", ha='center')
-                        else:
-                            st.info("Not enough categorical data for a bar chart.")
+                                if usar_vega:
+                                    chart_spec = spec_barras(df_grouped, group_by, 'amount', f'{data_type} by {group_by.capitalize()}')
+                                else:
+                                    # Plot bar chart
+                                    sns.barplot(x=group_by, y='amount', data=df_grouped, palette='viridis', ax=ax)
+                                    ax.set_title(f'{data_type} by {group_by.capitalize()}')
+                                    ax.set_xlabel(group_by.capitalize())
+                                    ax.set_ylabel('Amount ($)')
+                                    ax.tick_params(axis='x', rotation=45)
+                                
+                                    # Add value labels
+                                    for i, v in enumerate(df_grouped['amount']):
+                                        ax.text(i, v + 5, formato.moneda(v, decimales=0), ha='center')
+                            else:
+                                st.info("Not enough categorical data for a bar chart.")
                     
-                    elif chart_type == "Pie Chart":
-                        # Group data
-                        if 'category' in df_analysis.columns:
-                            group_by = st.selectbox("Group by", ["category", "description"])
-                            df_grouped = df_analysis.groupby(group_by)['amount'].sum()
+                        elif chart_type == "Pie Chart":
+                            # Group data
+                            if 'category' in df_analysis.columns:
+                                group_by = st.selectbox("Group by", ["category", "description"])
+                                df_grouped = libro.sumar_por_grupo(group_by, *sketch_filters)
                             
-                            # Plot pie chart
-                            ax.pie(df_grouped, 
-                                  labels=df_grouped.index, 
-                                  autopct='%1.1f%%',
-                                  colors=sns.color_palette('viridis', len(df_grouped)),
-                                  startangle=90)
-                            ax.set_title(f'{data_type} Distribution by {group_by.capitalize()}')
-                        else:
-                            st.info("Not enough categorical data for a pie chart.")
+                                if usar_vega:
+                                    chart_spec = spec_tarta(df_grouped, f'{data_type} Distribution by {group_by.capitalize()}')
+                                else:
+                                    # Plot pie chart
+                                    ax.pie(df_grouped, 
+                                          labels=df_grouped.index, 
+                                          autopct='%1.1f%%',
+                                          colors=sns.color_palette('viridis', len(df_grouped)),
+                                          startangle=90)
+                                    ax.set_title(f'{data_type} Distribution by {group_by.capitalize()}')
+                            else:
+                                st.info("Not enough categorical data for a pie chart.")
                     
-                    elif chart_type == "Line Chart":
-                        # Check if we have date data
-                        if 'date' in df_analysis.columns:
-                            # Group by time period
-                            time_period = st.selectbox("Time period", ["Daily", "Weekly", "Monthly"])
+                        elif chart_type == "Line Chart":
+                            # Check if we have date data
+                            if 'date' in df_analysis.columns:
+                                # Group by time period
+                                time_period = st.selectbox("Time period", ["Daily", "Weekly", "Monthly"])
                             
-                            if time_period == "Daily":
-                                df_analysis['period'] = df_analysis['date'].dt.strftime('%Y-%m-%d')
-                            elif time_period == "Weekly":
-                                df_analysis['period'] = df_analysis['date'].dt.strftime('%Y-%W')
-                            else:  # Monthly
-                                df_analysis['period'] = df_analysis['date'].dt.strftime('%Y-%m')
+                                period_format = {"Daily": '%Y-%m-%d', "Weekly": '%Y-%W', "Monthly": '%Y-%m'}[time_period]
+                                # assign returns a new frame: df_analysis may be the cached ledger itself
+                                df_analysis = df_analysis.assign(period=df_analysis['date'].dt.strftime(period_format))
                             
-                            # Group by period
-                            if data_type == "Both" and 'type' in df_analysis.columns:
-                                # Group by period and type
-                                df_grouped = df_analysis.groupby(['period', 'type'])['amount'].sum().reset_index()
+                                # Group by period
+                                if data_type == "Both" and 'type' in df_analysis.columns:
+                                    # Group by period and type
+                                    df_grouped = df_analysis.groupby(['period', 'type'])['amount'].sum().reset_index()
                                 
-                                # Get periods sorted
-                                periods = sorted(df_grouped['period'].unique())
+                                    if usar_vega:
+                                        chart_spec = spec_lineas(df_grouped, 'period', 'amount', f'{time_period} {data_type} Trend', color='type')
+                                    else:
+                                        # Plot lines by type
+                                        for t in df_grouped['type'].unique():
+                                            df_type = df_grouped[df_grouped['type'] == t]
+                                            ax.plot(df_type['period'], df_type['amount'], 
+                                                   marker='o', linestyle='-', 
+                                                   label=t)
+                                else:
+                                    # Group by period only
+                                    df_grouped = df_analysis.groupby('period')['amount'].sum()
+                                    if usar_vega:
+                                        chart_spec = spec_lineas(df_grouped.reset_index(), 'period', 'amount', f'{time_period} {data_type} Trend')
+                                    else:
+                                        ax.plot(df_grouped.index, df_grouped.values, 
+                                               marker='o', linestyle='-')
+                            
+                                if not usar_vega:
+                                    ax.set_title(f'{time_period} {data_type} Trend')
+                                    ax.set_xlabel('Period')
+                                    ax.set_ylabel('Amount ($)')
+                                    ax.legend()
                                 
-                                # Plot lines by type
-                                for t in df_grouped['type'].unique():
-                                    df_type = df_grouped[df_grouped['type'] == t]
-                                    ax.plot(df_type['period'], df_type['amount'], 
-                                           marker='o', linestyle='-', 
-                                           label=t)
+                                    # Rotate x-axis labels for better readability
+                                    ax.tick_params(axis='x', rotation=45)
                             else:
-                                # Group by period only
-                                df_grouped = df_analysis.groupby('period')['amount'].sum()
-                                ax.plot(df_grouped.index, df_grouped.values, 
-                                       marker='o', linestyle='-')
-                            
-                            ax.set_title(f'{time_period} {data_type} Trend')
-                            ax.set_xlabel('Period')
-                            ax.set_ylabel('Amount ($)')
-                            ax.legend()
-                            
-                            # Rotate x-axis labels for better readability
-                            plt.xticks(rotation=45)
-                        else:
-                            st.info("No date data available for a line chart.")
+                                st.info("No date data available for a line chart.")
                     
-                    elif chart_type == "Histogram":
-                        # Plot histogram of amounts
-                        sns.histplot(df_analysis['amount'], bins=20, kde=True, ax=ax)
-                        ax.set_title(f'{data_type} Amount Distribution')
-                        ax.set_xlabel('Amount ($)')
-                        ax.set_ylabel('Frequency')
+                        elif chart_type == "Histogram":
+                            # Pre-binned from the ledger's per-category, per-month sketches: no pass over the rows
+                            sketch = libro.indice_distribuciones().boceto(*sketch_filters)
+                            counts, edges = sketch.intervalos(bins=20)
+                            # The density curve is opt-in and binned (one kernel per sketch bucket)
+                            show_kde = st.checkbox("Show density curve (KDE)", value=False)
+                            curve = None
+                            if show_kde:
+                                kde_x, kde_y = sketch.densidad()
+                                curve = (kde_x, kde_y * sketch.n * (edges[1] - edges[0]))
+                            if usar_vega:
+                                chart_spec = spec_intervalos(counts, edges, f'{data_type} Amount Distribution', curva=curve)
+                            else:
+                                # Plot histogram of amounts
+                                ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='white')
+                                if curve is not None:
+                                    ax.plot(*curve, color='#d62728')
+                                ax.set_title(f'{data_type} Amount Distribution')
+                                ax.set_xlabel('Amount ($)')
+                                ax.set_ylabel('Frequency')
+                            st.caption(f"Median {formato.moneda(sketch.cuantil(0.5))} · "
+                                       f"90th percentile {formato.moneda(sketch.cuantil(0.9))} "
+                                       f"(within {ERROR_RELATIVO:.0%})")
                     
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                        if usar_vega:
+                            if chart_spec is not None:
+                                mostrar_vega(chart_spec, use_container_width=True)
+                        else:
+                            fig.tight_layout()
+                            mostrar_figura(fig)
                     
                     # Show the data
                     st.subheader("Filtered Data")
-                    st.dataframe(df_analysis)
+                    mostrar_tabla(df_analysis, 'custom_analysis')
                 else:
                     st.info("No data available for the selected filters.")
+        
+        # Tab 5: Forecast
+        with chart_tabs[4]:
+            st.subheader("Cash-Flow Forecast")
+            
+            col_meses, col_modelo = st.columns(2)
+            with col_meses:
+                forecast_months = st.slider("Months ahead", 1, 36, ajustes['proyeccion_meses'], key="forecast_months")
+            with col_modelo:
+                forecast_model = st.selectbox("Model", MODELOS, index=MODELOS.index(ajustes['proyeccion_modelo']),
+                                              format_func=lambda m: m.replace('_', ' ').capitalize(), key="forecast_model")
+            
+            # Every category is projected at once from the monthly totals of the unified ledger
+            proyeccion = libro.proyeccion(forecast_months, forecast_model)
+            if len(proyeccion.claves):
+                df_forecast = proyeccion.saldo(libro.total("Income") - libro.total("Expense"))
+                st.caption(f"Model used: {proyeccion.modelo.replace('_', ' ')}. Projected from next month, in {ajustes['moneda']}.")
+                
+                if usar_vega:
+                    df_forecast_long = df_forecast[['period', 'income', 'expense', 'balance']].melt(
+                        id_vars='period', var_name='series', value_name='amount'
+                    )
+                    mostrar_vega(
+                        spec_lineas(df_forecast_long, 'period', 'amount', 'Projected Cash Flow', color='series'),
+                        use_container_width=True
+                    )
+                else:
+                    with figura(figsize=(12, 6)) as (fig, ax):
+                        ax.plot(df_forecast['period'], df_forecast['income'], marker='o', linestyle='--', color='green', label='Income')
+                        ax.plot(df_forecast['period'], df_forecast['expense'], marker='o', linestyle='--', color='red', label='Expense')
+                        ax.plot(df_forecast['period'], df_forecast['balance'], marker='o', linestyle='-', color='blue', label='Balance')
+                        
+                        ax.set_title('Projected Cash Flow')
+                        ax.set_xlabel('Period')
+                        ax.set_ylabel('Amount ($)')
+                        ax.legend()
+                        
+                        ax.tick_params(axis='x', rotation=45)
+                        fig.tight_layout()
+                        
+                        mostrar_figura(fig)
+                
+                st.subheader("Projected Balance")
+                mostrar_tabla(df_forecast.set_index('period'), 'forecast', estatica=True,
+                              formatear=lambda display_df: formato.columnas(display_df, monedas=['income', 'expense', 'net', 'balance']))
+                
+                st.subheader("Projection by Category")
+                df_categories = proyeccion.tabla().pivot(index=['type', 'category'], columns='period', values='amount')
+                mostrar_tabla(df_categories.reset_index(), 'forecast_categories',
+                              formatear=lambda display_df: formato.columnas(display_df, monedas=proyeccion.periodos()))
+            else:
+                st.info("Not enough history to build a forecast. Add dated income and expenses.")
 
     # View Tables page
     elif menu == "View Tables":
@@ -924,25 +1168,27 @@ if authentication_status:
         st.markdown("</div>", unsafe_allow_html=True)
         
         # Create tabs for different data tables
-        table_tabs = st.tabs(["Income", "Expenses", "Data Management"])
+        table_tabs = st.tabs(["Income", "Expenses", "Suspicious Transactions", "Data Management"])
         
         # Tab 1: Income Data
         with table_tabs[0]:
             st.subheader("Income Data")
             
             if st.session_state['incomes']:
-                # Convert to DataFrame
-                df_incomes = pd.DataFrame(st.session_state['incomes'])
+                # Indexed view of the unified ledger: sorted dates, per-category posting lists, sorted amounts
+                indice = libro_mayor().indice_filtros("Income")
+                df_incomes = indice.df
                 
                 # Add filters
                 st.markdown("<div class='card'>", unsafe_allow_html=True)
                 st.subheader("Filters")
                 
-                # Date filter
-                if 'date' in df_incomes.columns:
-                    df_incomes['date'] = pd.to_datetime(df_incomes['date'])
-                    min_date = df_incomes['date'].min().date()
-                    max_date = df_incomes['date'].max().date()
+                # Date filter (binary search on the sorted dates)
+                start_date = end_date = None
+                fecha_min, fecha_max = indice.fechas_extremas()
+                if fecha_min is not None:
+                    min_date = fecha_min.date()
+                    max_date = fecha_max.date()
                     
                     date_range = st.date_input(
                         "Filter by date range",
@@ -954,59 +1200,44 @@ if authentication_status:
                     
                     if len(date_range) == 2:
                         start_date, end_date = date_range
-                        mask = ((df_incomes['date'].dt.date >= start_date) & 
-                               (df_incomes['date'].dt.date <= end_date))
-                        df_incomes_filtered = df_incomes.loc[mask]
-                    else:
-                        df_incomes_filtered = df_incomes
-                else:
-                    df_incomes_filtered = df_incomes
                 
-                # Category filter
-                if 'category' in df_incomes.columns:
-                    categories = ['All'] + sorted(df_incomes['category'].unique().tolist())
-                    selected_category = st.selectbox("Filter by category", categories, key="income_category_filter")
-                    
-                    if selected_category != 'All':
-                        df_incomes_filtered = df_incomes_filtered[df_incomes_filtered['category'] == selected_category]
+                # Category filter (posting list of the category)
+                categories = ['All'] + indice.categorias()
+                selected_category = st.selectbox("Filter by category", categories, key="income_category_filter")
                 
                 # Amount filter
                 col1, col2 = st.columns(2)
                 with col1:
                     min_amount = st.number_input("Minimum amount", value=0.0, step=10.0, key="income_min_amount")
                 with col2:
-                    if 'amount' in df_incomes.columns:
-                        max_income = float(df_incomes['amount'].max())
-                    else:
+                    max_income = indice.importe_maximo()
+                    if max_income is None:
                         max_income = 1000.0
                     max_amount = st.number_input("Maximum amount", value=max_income, step=10.0, key="income_max_amount")
                 
-                if 'amount' in df_incomes_filtered.columns:
-                    df_incomes_filtered = df_incomes_filtered[
-                        (df_incomes_filtered['amount'] >= min_amount) & 
-                        (df_incomes_filtered['amount'] <= max_amount)
-                    ]
+                seleccion = indice.seleccionar(start_date, end_date, None if selected_category == 'All' else selected_category,
+                                               min_amount, max_amount)
                 
                 st.markdown("</div>", unsafe_allow_html=True)
                 
                 # Show data
                 st.subheader("Income Records")
                 
-                if not df_incomes_filtered.empty:
+                if len(seleccion[0]):
                     # Sort data
-                    sort_options = df_incomes_filtered.columns.tolist()
+                    sort_options = df_incomes.columns.tolist()
                     selected_sort = st.selectbox("Sort by", sort_options, 
                                                index=sort_options.index('date') if 'date' in sort_options else 0,
                                                key="income_sort_field")
                     sort_order = st.radio("Sort order", ["Descending", "Ascending"], 
                                         horizontal=True, key="income_sort_order")
                     
-                    # Apply sorting
+                    # Apply sorting (only the selected rows are sorted; date/amount orders come from the index)
                     ascending = sort_order == "Ascending"
-                    df_incomes_filtered = df_incomes_filtered.sort_values(by=selected_sort, ascending=ascending)
+                    df_incomes_filtered = indice.tabla(seleccion, selected_sort, ascending)
                     
                     # Display the table
-                    st.dataframe(df_incomes_filtered, use_container_width=True)
+                    mostrar_tabla(df_incomes_filtered, 'income_records', use_container_width=True)
                     
                     # Show summary statistics
                     st.subheader("Income Summary")
@@ -1015,8 +1246,8 @@ if authentication_status:
                     count = len(df_incomes_filtered)
                     
                     col1, col2, col3 = st.columns(3)
-                    col1.metric("Total Income", f"${total_income:.2f}")
-                    col2.metric("Average Income", f"${avg_income:.2f}")
+                    col1.metric("Total Income", formato.moneda(total_income))
+                    col2.metric("Average Income", formato.moneda(avg_income))
                     col3.metric("Number of Entries", count)
                     
                     # Download data as CSV
@@ -1038,18 +1269,20 @@ if authentication_status:
             st.subheader("Expense Data")
             
             if st.session_state['expenses']:
-                # Convert to DataFrame
-                df_expenses = pd.DataFrame(st.session_state['expenses'])
+                # Indexed view of the unified ledger: sorted dates, per-category posting lists, sorted amounts
+                exp_indice = libro_mayor().indice_filtros("Expense")
+                df_expenses = exp_indice.df
                 
                 # Add filters
                 st.markdown("<div class='card'>", unsafe_allow_html=True)
                 st.subheader("Filters")
                 
-                # Date filter
-                if 'date' in df_expenses.columns:
-                    df_expenses['date'] = pd.to_datetime(df_expenses['date'])
-                    exp_min_date = df_expenses['date'].min().date()
-                    exp_max_date = df_expenses['date'].max().date()
+                # Date filter (binary search on the sorted dates)
+                exp_start_date = exp_end_date = None
+                exp_fecha_min, exp_fecha_max = exp_indice.fechas_extremas()
+                if exp_fecha_min is not None:
+                    exp_min_date = exp_fecha_min.date()
+                    exp_max_date = exp_fecha_max.date()
                     
                     exp_date_range = st.date_input(
                         "Filter by date range",
@@ -1061,59 +1294,45 @@ if authentication_status:
                     
                     if len(exp_date_range) == 2:
                         exp_start_date, exp_end_date = exp_date_range
-                        exp_mask = ((df_expenses['date'].dt.date >= exp_start_date) & 
-                                   (df_expenses['date'].dt.date <= exp_end_date))
-                        df_expenses_filtered = df_expenses.loc[exp_mask]
-                    else:
-                        df_expenses_filtered = df_expenses
-                else:
-                    df_expenses_filtered = df_expenses
                 
-                # Category filter
-                if 'category' in df_expenses.columns:
-                    exp_categories = ['All'] + sorted(df_expenses['category'].unique().tolist())
-                    exp_selected_category = st.selectbox("Filter by category", exp_categories, key="expense_category_filter")
-                    
-                    if exp_selected_category != 'All':
-                        df_expenses_filtered = df_expenses_filtered[df_expenses_filtered['category'] == exp_selected_category]
+                # Category filter (posting list of the category)
+                exp_categories = ['All'] + exp_indice.categorias()
+                exp_selected_category = st.selectbox("Filter by category", exp_categories, key="expense_category_filter")
                 
                 # Amount filter
                 exp_col1, exp_col2 = st.columns(2)
                 with exp_col1:
                     exp_min_amount = st.number_input("Minimum amount", value=0.0, step=10.0, key="expense_min_amount")
                 with exp_col2:
-                    if 'amount' in df_expenses.columns:
-                        max_expense = float(df_expenses['amount'].max())
-                    else:
+                    max_expense = exp_indice.importe_maximo()
+                    if max_expense is None:
                         max_expense = 1000.0
                     exp_max_amount = st.number_input("Maximum amount", value=max_expense, step=10.0, key="expense_max_amount")
                 
-                if 'amount' in df_expenses_filtered.columns:
-                    df_expenses_filtered = df_expenses_filtered[
-                        (df_expenses_filtered['amount'] >= exp_min_amount) & 
-                        (df_expenses_filtered['amount'] <= exp_max_amount)
-                    ]
+                exp_seleccion = exp_indice.seleccionar(exp_start_date, exp_end_date,
+                                                       None if exp_selected_category == 'All' else exp_selected_category,
+                                                       exp_min_amount, exp_max_amount)
                 
                 st.markdown("</div>", unsafe_allow_html=True)
                 
                 # Show data
                 st.subheader("Expense Records")
                 
-                if not df_expenses_filtered.empty:
+                if len(exp_seleccion[0]):
                     # Sort data
-                    exp_sort_options = df_expenses_filtered.columns.tolist()
+                    exp_sort_options = df_expenses.columns.tolist()
                     exp_selected_sort = st.selectbox("Sort by", exp_sort_options, 
-                                                   index=exp_sort_options.index('date') if 'date' in exp_sort_options else 0,
-                                                   key="expense_sort_field")
+                                               index=exp_sort_options.index('date') if 'date' in exp_sort_options else 0,
+                                               key="expense_sort_field")
                     exp_sort_order = st.radio("Sort order", ["Descending", "Ascending"], 
-                                            horizontal=True, key="expense_sort_order")
+                                        horizontal=True, key="expense_sort_order")
                     
-                    # Apply sorting
+                    # Apply sorting (only the selected rows are sorted; date/amount orders come from the index)
                     exp_ascending = exp_sort_order == "Ascending"
-                    df_expenses_filtered = df_expenses_filtered.sort_values(by=exp_selected_sort, ascending=exp_ascending)
+                    df_expenses_filtered = exp_indice.tabla(exp_seleccion, exp_selected_sort, exp_ascending)
                     
                     # Display the table
-                    st.dataframe(df_expenses_filtered, use_container_width=True)
+                    mostrar_tabla(df_expenses_filtered, 'expense_records', use_container_width=True)
                     
                     # Show summary statistics
                     st.subheader("Expense Summary")
@@ -1122,8 +1341,8 @@ if authentication_status:
                     exp_count = len(df_expenses_filtered)
                     
                     exp_col1, exp_col2, exp_col3 = st.columns(3)
-                    exp_col1.metric("Total Expenses", f"${total_expense:.2f}")
-                    exp_col2.metric("Average Expense", f"${avg_expense:.2f}")
+                    exp_col1.metric("Total Expenses", formato.moneda(total_expense))
+                    exp_col2.metric("Average Expense", formato.moneda(avg_expense))
                     exp_col3.metric("Number of Entries", exp_count)
                     
                     # Download data as CSV
@@ -1139,6 +1358,27 @@ if authentication_status:
                     st.info("No expense data available for the selected filters.")
             else:
                 st.info("No expense data available. Please add your expenses in the 'Add Income/Expense' section.")
+        
+        # Tab 3: Suspicious Transactions
+        with table_tabs[2]:
+            st.subheader("Suspicious Transactions")
+            st.write(f"""
+            Expenses that are unusually large for their category: more than {ajustes['anomalias_umbral_z']:g} standard
+            deviations above the category average and above its upper quartile fence. Categories need at least
+            {ajustes['anomalias_minimo']} expenses before they are judged.
+            """)
+            
+            # Kept up to date on every added expense: no rescan of the ledger
+            df_suspicious = detector_anomalias().tabla()
+            if not df_suspicious.empty:
+                columns = [column for column in ('date', 'category', 'description', 'amount', 'z_score') if column in df_suspicious.columns]
+                df_suspicious = df_suspicious[columns]
+                if 'date' in columns:
+                    df_suspicious['date'] = pd.to_datetime(df_suspicious['date']).dt.strftime('%Y-%m-%d')
+                mostrar_tabla(df_suspicious, 'suspicious', formatear=lambda display_df: display_df.assign(
+                    amount=formato.moneda(display_df['amount']), z_score=display_df['z_score'].round(1)))
+            else:
+                st.info("No suspicious expenses found.")
 
     # Financial Goals page
     elif menu == "Financial Goals":
@@ -1162,22 +1402,17 @@ if authentication_status:
                 # Convert to DataFrame for display
                 df_goals = pd.DataFrame(st.session_state['goals'])
                 
-                # Calculate progress for each goal
+                # Calculate progress for each goal (and the amount already reached, for the projected dates)
+                current_amounts = []
                 for i, goal in enumerate(st.session_state['goals']):
                     if goal.get('category') == 'saving':
                         # For saving goals, calculate based on income with Savings category
-                        current_savings = sum(
-                            item["amount"] for item in st.session_state['incomes'] 
-                            if item.get("category") == "Savings"
-                        )
+                        current_savings = libro_mayor().total("Income", categoria="Savings")
                         progress = min(100, max(0, (current_savings / goal.get('target_amount', 1)) * 100))
                     elif goal.get('category') == 'expense_reduction':
                         # For expense reduction goals, calculate how close we are to the target
                         category = goal.get('subcategory', '')
-                        current_expense = sum(
-                            item["amount"] for item in st.session_state['expenses'] 
-                            if item.get("category") == category
-                        )
+                        current_expense = libro_mayor().total("Expense", categoria=category)
                         progress = min(100, max(0, 100 - (current_expense / goal.get('target_amount', 1)) * 100))
                     else:
                         # Generic goals - just use stored progress if available
@@ -1185,10 +1420,23 @@ if authentication_status:
                     
                     # Update progress in the session state
                     st.session_state['goals'][i]['progress'] = progress
+                    current_amounts.append(current_savings if goal.get('category') == 'saving'
+                                           else goal.get('target_amount', 0) * progress / 100)
                 
                 # Save updated goals
                 save_data(st.session_state['goals'], goals_file_path)
                 
+                # Projected completion month of every goal, all at once, from the cash-flow forecast
+                projected_dates, on_track = fechas_metas(
+                    st.session_state['goals'],
+                    libro_mayor().proyeccion(max(ajustes['proyeccion_meses'], 24), ajustes['proyeccion_modelo']),
+                    current_amounts)
+                # Chance of reaching each target by its deadline (Monte Carlo over past months; fixed seed, stable across reruns)
+                with perfil.tramo("goal simulation"):
+                    # Cached on the session's ledger, so reruns with the same data and goals don't simulate again
+                    chances = libro_mayor().probabilidades_metas(st.session_state['goals'], current_amounts,
+                                                                 ajustes['simulacion_caminos'], procesos=ajustes['simulacion_procesos'])
+                
                 # Display goals as cards
                 for i, goal in enumerate(st.session_state['goals']):
                     col1, col2 = st.columns([3, 1])
@@ -1198,7 +1446,7 @@ if authentication_status:
                         st.subheader(goal.get('name', 'Unnamed Goal'))
                         
                         # Show goal details
-                        st.write(f"**Target:** ${goal.get('target_amount', 0):.2f}")
+                        st.write(f"**Target:** {formato.moneda(goal.get('target_amount', 0))}")
                         st.write(f"**Deadline:** {goal.get('deadline', 'No deadline')}")
                         st.write(f"**Category:** {goal.get('category', 'General')}")
                         
@@ -1214,6 +1462,17 @@ if authentication_status:
                         except:
                             st.write("**Deadline format:** Invalid")
                         
+                        # Projected completion (expense reduction goals have no completion date)
+                        if projected_dates[i]:
+                            if on_track[i] is False:
+                                st.write(f"**Projected completion:** {projected_dates[i]} ⚠️ after the deadline")
+                            else:
+                                st.write(f"**Projected completion:** {projected_dates[i]}")
+                        elif goal.get('category') != 'expense_reduction':
+                            st.write("**Projected completion:** not within the forecast at the current pace")
+                        if chances[i] is not None:
+                            st.write(f"**Chance of reaching it by the deadline:** {formato.porcentaje(chances[i] * 100)}")
+                        
                         # Show progress bar
                         progress = goal.get('progress', 0)
                         st.progress(progress / 100)
@@ -1229,31 +1488,34 @@ if authentication_status:
                         st.markdown("</div>", unsafe_allow_html=True)
                     
                     with col2:
-                        # Visualize progress with a small chart
-                        fig, ax = plt.subplots(figsize=(3, 3))
-                        
                         # Create a simple gauge chart
                         progress = goal.get('progress', 0)
                         colors = ['red', 'orange', 'yellow', 'lightgreen', 'green']
                         color_idx = min(int(progress / 20), 4)
+
+                        if usar_vega:
+                            mostrar_vega(spec_indicador(progress, colors[color_idx], "Goal Progress"),
+                                               use_container_width=True)
+                        else:
+                            # Visualize progress with a small chart
+                            with figura(figsize=(3, 3)) as (fig, ax):
+                                ax.pie([progress, 100-progress], 
+                                      colors=[colors[color_idx], '#f0f0f0'],
+                                      startangle=90, 
+                                      counterclock=False)
                         
-                        ax.pie([progress, 100-progress], 
-                              colors=[colors[color_idx], '#f0f0f0'],
-                              startangle=90, 
-                              counterclock=False)
-                        
-                        # Add a circle in the center to make it look like a gauge
-                        circle = plt.Circle((0, 0), 0.7, fc='white')
-                        ax.add_artist(circle)
+                                # Add a circle in the center to make it look like a gauge
+                                circle = mpatches.Circle((0, 0), 0.7, fc='white')
+                                ax.add_artist(circle)
                         
-                        # Add text in center
-                        ax.text(0, 0, f"{progress:.1f}%", 
-                               ha='center', va='center', 
-                               fontsize=12, fontweight='bold')
+                                # Add text in center
+                                ax.text(0, 0, f"{progress:.1f}%", 
+                                       ha='center', va='center', 
+                                       fontsize=12, fontweight='bold')
                         
-                        ax.set_title(f"Goal Progress")
-                        ax.axis('equal')
-                        st.pyplot(fig)
+                                ax.set_title(f"Goal Progress")
+                                ax.axis('equal')
+                                mostrar_figura(fig)
             else:
                 st.info("You don't have any financial goals yet. Create one in the 'Add New Goal' tab.")
             
@@ -1276,8 +1538,8 @@ if authentication_status:
                         # Additional fields based on category
                         if goal_category == "expense_reduction":
                             # For expense reduction, select which expense category to reduce
-                            expense_categories = ["Food", "Transportation", "Housing", "Entertainment", "Health", 
-                                                "Education", "Utilities", "Insurance", "Debt", "Travel", "Other"]
+                            expense_categories = [categoria for categoria in cargar_taxonomia().categorias("expense")
+                                                  if categoria not in ("Savings", "Gifts")]
                             subcategory = st.selectbox("Expense Category to Reduce", expense_categories)
                         else:
                             subcategory = ""
@@ -1372,28 +1634,85 @@ if authentication_status:
                             
                             # Visualize progress over time if there are multiple entries
                             if len(history) > 1:
-                                fig, ax = plt.subplots(figsize=(10, 5))
-                                
-                                # Convert dates to datetime for proper sorting
-                                df_history['date'] = pd.to_datetime(df_history['date'])
-                                df_history = df_history.sort_values('date')
+                                with figura(figsize=(10, 5)) as (fig, ax):
+                                    # Convert dates to datetime for proper sorting
+                                    df_history['date'] = pd.to_datetime(df_history['date'])
+                                    df_history = df_history.sort_values('date')
                                 
-                                ax.plot(df_history['date'], df_history['progress'], marker='o', linestyle='-')
-                                ax.set_title('Goal Progress Over Time')
-                                ax.set_xlabel('Date')
-                                ax.set_ylabel('Progress (%)')
-                                ax.grid(True, linestyle='--', alpha=0.7)
+                                    ax.plot(df_history['date'], df_history['progress'], marker='o', linestyle='-')
+                                    ax.set_title('Goal Progress Over Time')
+                                    ax.set_xlabel('Date')
+                                    ax.set_ylabel('Progress (%)')
+                                    ax.grid(True, linestyle='--', alpha=0.7)
                                 
-                                # Rotate x-axis labels for better readability
-                                plt.xticks(rotation=45)
-                                plt.tight_layout()
+                                    # Rotate x-axis labels for better readability
+                                    ax.tick_params(axis='x', rotation=45)
+                                    fig.tight_layout()
                                 
-                                st.pyplot(fig)
+                                    mostrar_figura(fig)
                         
                         st.markdown("</div>", unsafe_allow_html=True)
                     else:
                         st.info("You don't have any financial goals yet. Create one in the 'Add New Goal' tab.")
 
+    # Budgets page
+    elif menu == "Budgets":
+        st.markdown("<h1 class='main-header'>Monthly Budgets</h1>", unsafe_allow_html=True)
+        
+        st.markdown("<div class='card'>", unsafe_allow_html=True)
+        st.write("""
+        Set a monthly spending limit for any expense category and compare it with what you actually spent.
+        Limits are in your base currency and apply to every month.
+        """)
+        st.markdown("</div>", unsafe_allow_html=True)
+        
+        budgets = presupuestos()
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("<div class='card'>", unsafe_allow_html=True)
+            st.subheader("Set a Budget")
+            
+            budget_category = st.selectbox("Expense category", cargar_taxonomia().categorias("expense"), key="budget_category")
+            budget_limit = st.number_input("Monthly limit", min_value=0.0, step=10.0, format="%.2f",
+                                           value=float(budgets.limites.get(budget_category, 0.0)))
+            
+            col_save, col_remove = st.columns(2)
+            with col_save:
+                if st.button("Save Budget"):
+                    try:
+                        budgets.fijar(budget_category, budget_limit)
+                    except ValueError:
+                        st.error("The monthly limit must be greater than zero.")
+                    else:
+                        st.session_state['budgets'] = budgets.registros()
+                        save_data(st.session_state['budgets'], rutas_archivos['budgets'])
+                        st.success(f"{budget_category} budget set to {formato.moneda(budget_limit)} per month.")
+            with col_remove:
+                if budget_category in budgets.limites and st.button("Remove Budget"):
+                    budgets.fijar(budget_category, None)
+                    st.session_state['budgets'] = budgets.registros()
+                    save_data(st.session_state['budgets'], rutas_archivos['budgets'])
+                    st.success(f"{budget_category} budget removed.")
+            
+            st.markdown("</div>", unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown("<div class='card'>", unsafe_allow_html=True)
+            st.subheader("Budget vs Actual")
+            
+            budget_month = st.date_input("Month", datetime.now(), key="budget_month")
+            if budgets.limites:
+                df_budget = budgets.tabla(budget_month)
+                for category, spent, limit in budgets.alertas(budget_month):
+                    st.warning(f"Over budget in {category}: {formato.moneda(spent)} spent of {formato.moneda(limit)}.")
+                st.dataframe(formato.columnas(df_budget, monedas=['budget', 'spent', 'remaining'], porcentajes=['used']),
+                             hide_index=True)
+            else:
+                st.info("No budgets yet. Set one on the left to start tracking it.")
+            
+            st.markdown("</div>", unsafe_allow_html=True)
+
     # Recommendations page
     elif menu == "Recommendations":
         st.markdown("<h1 class='main-header'>Financial Recommendations</h1>", unsafe_allow_html=True)
@@ -1405,9 +1724,10 @@ if authentication_status:
         """)
         st.markdown("</div>", unsafe_allow_html=True)
         
-        # Load data into finance class for analysis
-        finance.incomes = st.session_state['incomes']
-        finance.expenses = st.session_state['expenses']
+        # Load data into finance class for analysis (recurring rules expanded up to today, in memory only)
+        finance.incomes = con_recurrentes(st.session_state['incomes'], st.session_state['recurring'], "income")
+        finance.expenses = con_recurrentes(st.session_state['expenses'], st.session_state['recurring'], "expense")
+        finance.budgets = st.session_state['budgets']
         
         if st.button("Generate Recommendations"):
             # Check if there's data available
@@ -1415,18 +1735,27 @@ if authentication_status:
                 st.warning("No financial data available to generate recommendations. Please add your income and expenses first.")
             else:
                 # Get recommendations
-                recommendations = finance.generate_recommendations()
+                if servicio:
+                    recommendations = servicio.analizar(st.session_state.username, "recommendations")
+                else:
+                    recommendations = finance.generate_recommendations()
                 
                 if recommendations:
                     # Create some analytics for display
-                    total_income = sum(item["amount"] for item in finance.incomes)
-                    total_expense = sum(item["amount"] for item in finance.expenses)
+                    if servicio:
+                        totals = servicio.analizar(st.session_state.username, "totals")
+                    else:
+                        totals = {"income": finance.total_amount(finance.incomes),
+                                  "expense": finance.total_amount(finance.expenses),
+                                  "debt": finance.total_amount(finance.expenses, "Debt")}
+                    total_income = totals["income"]
+                    total_expense = totals["expense"]
                     balance = total_income - total_expense
                     
                     # Financial health score (simple calculation)
                     if total_income > 0:
                         savings_rate = max(0, balance) / total_income * 100
-                        debt_payments = sum(item["amount"] for item in finance.expenses if item.get("category") == "Debt")
+                        debt_payments = totals["debt"]
                         debt_ratio = (debt_payments / total_income * 100) if total_income > 0 else 0
                         
                         # Score based on savings rate and debt ratio
@@ -1453,45 +1782,50 @@ if authentication_status:
                         score_color = "red"
                         status = "Needs Improvement"
                     
-                    # Display score as a gauge chart
-                    fig, ax = plt.subplots(figsize=(6, 3))
-                    
-                    # Create gauge chart using a partial pie chart
-                    gauge_colors = ['red', 'orange', 'yellow', 'lightgreen', 'green']
-                    background = ax.pie([1], 
-                                       radius=1, 
-                                       colors=['lightgrey'], 
-                                       startangle=90, 
-                                       counterclock=False, 
-                                       wedgeprops=dict(width=0.2, edgecolor='white'))[0]
-                    
-                    # Add colored progress arc
-                    progress_arc = ax.pie([financial_health, 100-financial_health], 
-                                         radius=1, 
-                                         colors=[score_color, 'white'], 
-                                         startangle=90, 
-                                         counterclock=False, 
-                                         wedgeprops=dict(width=0.2, edgecolor='white'))[0]
+                    col1, col2 = st.columns([1, 2])
+                    with col1:
+                        # Display score as a gauge chart
+                        if usar_vega:
+                            mostrar_vega(
+                                spec_indicador(financial_health, score_color, "", texto=f"{financial_health:.0f} - {status}"),
+                                use_container_width=True
+                            )
+                        else:
+                            with figura(figsize=(6, 3)) as (fig, ax):
+                                # Create gauge chart using a partial pie chart
+                                gauge_colors = ['red', 'orange', 'yellow', 'lightgreen', 'green']
+                                background = ax.pie([1], 
+                                                   radius=1, 
+                                                   colors=['lightgrey'], 
+                                                   startangle=90, 
+                                                   counterclock=False, 
+                                                   wedgeprops=dict(width=0.2, edgecolor='white'))[0]
                     
-                    # Add a circle in the center to make it look like a gauge
-                    center_circle = plt.Circle((0, 0), 0.7, fc='white')
-                    ax.add_artist(center_circle)
+                                # Add colored progress arc
+                                progress_arc = ax.pie([financial_health, 100-financial_health], 
+                                                     radius=1, 
+                                                     colors=[score_color, 'white'], 
+                                                     startangle=90, 
+                                                     counterclock=False, 
+                                                     wedgeprops=dict(width=0.2, edgecolor='white'))[0]
                     
-                    # Add score text in center
-                    ax.text(0, 0, f"{financial_health:.0f}", 
-                           ha='center', va='center', 
-                           fontsize=24, fontweight='bold', color=score_color)
+                                # Add a circle in the center to make it look like a gauge
+                                center_circle = mpatches.Circle((0, 0), 0.7, fc='white')
+                                ax.add_artist(center_circle)
                     
-                    ax.text(0, -0.2, status, 
-                           ha='center', va='center', 
-                           fontsize=12, color=score_color)
+                                # Add score text in center
+                                ax.text(0, 0, f"{financial_health:.0f}", 
+                                       ha='center', va='center', 
+                                       fontsize=24, fontweight='bold', color=score_color)
                     
-                    ax.set_aspect('equal')
-                    ax.axis('off')
+                                ax.text(0, -0.2, status, 
+                                       ha='center', va='center', 
+                                       fontsize=12, color=score_color)
                     
-                    col1, col2 = st.columns([1, 2])
-                    with col1:
-                        st.pyplot(fig)
+                                ax.set_aspect('equal')
+                                ax.axis('off')
+
+                                mostrar_figura(fig)
                     
                     with col2:
                         st.write(f"**Status:** {status}")
@@ -1522,12 +1856,21 @@ if authentication_status:
                     if total_expense > 0:
                         st.markdown("<h2 class='sub-header'>Spending Insights</h2>", unsafe_allow_html=True)
                         
-                        # Convert to DataFrame for analysis
-                        df_expenses = pd.DataFrame(finance.expenses)
+                        # Advice shown when a top category goes over its threshold (presupuestos.UMBRALES_CONSEJOS)
+                        SPENDING_ADVICE = {
+                            "Food": "🍔 **Food Spending:** Consider meal planning and cooking at home more often to reduce food expenses.",
+                            "Housing": "🏠 **Housing Costs:** Your housing costs are high relative to your expenses. Consider if there are ways to reduce this major expense.",
+                            "Entertainment": "🎭 **Entertainment:** Look for free or low-cost entertainment options to reduce spending in this area.",
+                            "Transportation": "🚗 **Transportation:** Consider carpooling, public transit, or other alternatives to reduce transportation costs.",
+                            "Shopping": "🛍️ **Shopping:** Try implementing a 24-hour rule before making non-essential purchases to reduce impulse buying.",
+                        }
+                        
+                        # Expenses of the unified ledger (base currency, like total_expense)
+                        df_expenses = libro_mayor().gastos
                         
                         if not df_expenses.empty and 'category' in df_expenses.columns:
                             # Analyze by category
-                            category_totals = df_expenses.groupby('category')['amount'].sum().reset_index()
+                            category_totals = libro_mayor().sumar_por_grupo('category', ["Expense"]).reset_index()
                             category_totals['percentage'] = category_totals['amount'] / total_expense * 100
                             top_categories = category_totals.sort_values('amount', ascending=False).head(3)
                             
@@ -1535,47 +1878,46 @@ if authentication_status:
                             st.markdown("<div class='card'>", unsafe_allow_html=True)
                             st.subheader("Top Spending Categories")
                             
-                            fig, ax = plt.subplots(figsize=(8, 5))
-                            
-                            # Create horizontal bar chart of top categories
-                            bars = ax.barh(
-                                top_categories['category'], 
-                                top_categories['percentage'], 
-                                color=sns.color_palette("viridis", len(top_categories))
-                            )
-                            
-                            # Add percentage labels
-                            for i, bar in enumerate(bars):
-                                width = bar.get_width()
-                                ax.text(
-                                    width + 1, 
-                                    bar.get_y() + bar.get_height()/2, 
-                                    f"{width:.1f}%", 
-                                    ha='left', 
-                                    va='center'
+                            if usar_vega:
+                                mostrar_vega(
+                                    spec_barras(top_categories[['category', 'percentage']], 'category', 'percentage',
+                                                'Where Your Money Goes', horizontal=True,
+                                                titulo_valor='Percentage of Total Expenses'),
+                                    use_container_width=True
                                 )
+                            else:
+                                with figura(figsize=(8, 5)) as (fig, ax):
+                                    # Create horizontal bar chart of top categories
+                                    bars = ax.barh(
+                                        top_categories['category'], 
+                                        top_categories['percentage'], 
+                                        color=sns.color_palette("viridis", len(top_categories))
+                                    )
+                            
+                                    # Add percentage labels
+                                    for i, bar in enumerate(bars):
+                                        width = bar.get_width()
+                                        ax.text(
+                                            width + 1, 
+                                            bar.get_y() + bar.get_height()/2, 
+                                            f"{width:.1f}%", 
+                                            ha='left', 
+                                            va='center'
+                                        )
                             
-                            ax.set_xlabel('Percentage of Total Expenses')
-                            ax.set_title('Where Your Money Goes')
-                            ax.set_xlim(0, 100)
+                                    ax.set_xlabel('Percentage of Total Expenses')
+                                    ax.set_title('Where Your Money Goes')
+                                    ax.set_xlim(0, 100)
                             
-                            st.pyplot(fig)
+                                    mostrar_figura(fig)
                             
                             # Add spending advice based on top categories
                             for _, row in top_categories.iterrows():
                                 category = row['category']
                                 percentage = row['percentage']
                                 
-                                if category == "Food" and percentage > 20:
-                                    st.write("🍔 **Food Spending:** Consider meal planning and cooking at home more often to reduce food expenses.")
-                                elif category == "Housing" and percentage > 40:
-                                    st.write("🏠 **Housing Costs:** Your housing costs are high relative to your expenses. Consider if there are ways to reduce this major expense.")
-                                elif category == "Entertainment" and percentage > 15:
-                                    st.write("🎭 **Entertainment:** Look for free or low-cost entertainment options to reduce spending in this area.")
-                                elif category == "Transportation" and percentage > 15:
-                                    st.write("🚗 **Transportation:** Consider carpooling, public transit, or other alternatives to reduce transportation costs.")
-                                elif category == "Shopping" and percentage > 10:
-                                    st.write("🛍️ **Shopping:** Try implementing a 24-hour rule before making non-essential purchases to reduce impulse buying.")
+                                if category in SPENDING_ADVICE and percentage > UMBRALES_CONSEJOS[category]:
+                                    st.write(SPENDING_ADVICE[category])
                                 else:
                                     st.write(f"💰 **{category}:** This is one of your top spending categories at {percentage:.1f}% of expenses.")
                             
@@ -1689,10 +2031,23 @@ if authentication_status:
         import_type = st.radio("What data would you like to import?", ["Incomes", "Expenses", "Goals"])
         uploaded_file = st.file_uploader(f"Upload {import_type} CSV file", type="csv")
         
+        # Raw bank exports have no category: rows without one are categorized by the rules in
+        # config/categorizacion.yaml and the taxonomy merchants, chunk by chunk as the file is read
+        auto_categorize = import_type != "Goals" and st.checkbox(
+            "Auto-categorize rows without a category", value=True,
+            help="Keyword and regex rules from config/categorizacion.yaml, plus the merchants in the category taxonomy")
+        
         if uploaded_file is not None:
             try:
                 # Read the uploaded CSV
-                imported_df = pd.read_csv(uploaded_file)
+                if auto_categorize:
+                    categorizer = cargar_categorizador()
+                    transaction_type = "income" if import_type == "Incomes" else "expense"
+                    imported_df = pd.concat([categorizer.categorizar_df(chunk, transaction_type)
+                                             for chunk in pd.read_csv(uploaded_file, chunksize=100_000)],
+                                            ignore_index=True)
+                else:
+                    imported_df = pd.read_csv(uploaded_file)
                 
                 # Show preview of imported data
                 st.subheader("Data Preview")
@@ -1702,6 +2057,11 @@ if authentication_status:
                 if st.button(f"Import {import_type} Data"):
                     # Convert to list of dictionaries
                     imported_data = imported_df.to_dict('records')
+                    # The rollup index is rebuilt from the new ledger on next use
+                    st.session_state.pop(f'indice_{import_type.lower()}', None)
+                    st.session_state.pop('libro_mayor', None)
+                    st.session_state.pop('presupuestos', None)
+                    st.session_state.pop('anomalias', None)
                     
                     # Update session state based on import type
                     if import_type == "Incomes":
@@ -1722,6 +2082,21 @@ if authentication_status:
         
         st.markdown("</div>", unsafe_allow_html=True)
 
+    tramo_pagina.close()
+    DURACION_RERUN.observe(perfil.total_ms() / 1000, pagina=menu)
+    if ajustes['metricas_ruta']:
+        REGISTRO.volcar(ajustes['metricas_ruta'])
+
+    # Timing panel for administrators
+    if perfil.activo:
+        registrar_latencia(menu, perfil.total_ms(), ajustes['perfilado_ruta'])
+        if st.session_state.username in ajustes['perfilado_usuarios']:
+            with st.sidebar.expander("⏱️ Rerun timing"):
+                st.metric("Total", f"{perfil.total_ms():.0f} ms")
+                st.dataframe(pd.DataFrame(perfil.resumen()).round(2), hide_index=True, use_container_width=True)
+
 else:
+    if perfil.activo:
+        registrar_latencia("Login", perfil.total_ms(), ajustes['perfilado_ruta'])
     # No mostrar nada aquí, ya que la página de autenticación ya se muestra en la función autenticar_usuario
     pass
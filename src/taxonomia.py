@@ -0,0 +1,160 @@
+import os
+import yaml
+from yaml.loader import SafeLoader
+from carga_perezosa import importar_perezoso
+
+pd = importar_perezoso("pandas")
+
+# Árbol de categorías configurable: tipo → categoría → descripción → comercios
+TAXONOMIA_PATH = os.path.join('config', 'taxonomia.yaml')
+
+# Árbol por defecto (las categorías y descripciones de siempre, sin comercios)
+TAXONOMIA_POR_DEFECTO = {
+    "income": {
+        "Salary": {"Monthly Salary": [], "Freelance Work": [], "Part-time Job": [], "Consulting": []},
+        "Bonus": {"Year-end Bonus": [], "Performance Bonus": [], "Referral Bonus": [], "Holiday Bonus": []},
+        "Investment": {"Stock Dividends": [], "Real Estate Income": [], "Interest Income": [], "Cryptocurrency Gains": []},
+        "Other": {"Gift": [], "Lottery": [], "Inheritance": [], "Found Money": []},
+    },
+    "expense": {
+        "Food": {"Groceries": [], "Dining Out": [], "Snacks": [], "Beverages": []},
+        "Transportation": {"Gas": [], "Public Transport": [], "Car Maintenance": [], "Parking Fees": []},
+        "Housing": {"Rent": [], "Mortgage": [], "Property Taxes": [], "Home Repairs": []},
+        "Entertainment": {"Movies": [], "Concerts": [], "Streaming Services": [], "Games": []},
+        "Health": {"Doctor Visit": [], "Medication": [], "Health Insurance": [], "Gym Membership": []},
+        "Education": {"Tuition": [], "Books": [], "Online Courses": [], "Workshops": []},
+        "Utilities": {"Electricity": [], "Water": [], "Internet": [], "Phone": []},
+        "Insurance": {"Car Insurance": [], "Home Insurance": [], "Life Insurance": [], "Health Insurance": []},
+        "Debt": {"Credit Card Payment": [], "Loan Payment": [], "Mortgage Payment": [], "Student Loan Payment": []},
+        "Savings": {"Emergency Fund": [], "Retirement Fund": [], "Investment Account": [], "Savings Account": []},
+        "Gifts": {"Birthday Gifts": [], "Holiday Gifts": [], "Wedding Gifts": [], "Charity": []},
+        "Travel": {"Flights": [], "Hotels": [], "Car Rental": [], "Activities": []},
+        "Other": {"Miscellaneous": [], "Unexpected Expenses": [], "Pet Expenses": [], "Subscriptions": []},
+    },
+}
+
+class Taxonomia:
+    """
+    Consulta del árbol de categorías de un tipo de transacción (income / expense)
+    """
+    def __init__(self, arbol):
+        self.arbol = arbol
+
+    def categorias(self, tipo):
+        return list(self.arbol[tipo])
+
+    def descripciones(self, tipo, categoria):
+        return list(self.arbol[tipo].get(categoria) or {})
+
+    def descripciones_por_categoria(self, tipo):
+        return {categoria: self.descripciones(tipo, categoria) for categoria in self.arbol[tipo]}
+
+    def comercios(self, tipo, categoria, descripcion):
+        return list((self.arbol[tipo].get(categoria) or {}).get(descripcion) or [])
+
+def _normalizar(arbol):
+    # En el YAML una descripción puede no tener comercios (valor vacío) o venir como lista simple
+    normalizado = {}
+    for tipo, categorias in arbol.items():
+        normalizado[tipo] = {}
+        for categoria, descripciones in (categorias or {}).items():
+            if isinstance(descripciones, list):
+                descripciones = {descripcion: [] for descripcion in descripciones}
+            normalizado[tipo][categoria] = {
+                descripcion: list(comercios or []) for descripcion, comercios in (descripciones or {}).items()
+            }
+    return normalizado
+
+_cache = {"clave": None, "taxonomia": None}
+
+def cargar_taxonomia():
+    """
+    Devuelve la taxonomía de config/taxonomia.yaml (cada tipo definido sustituye al de por defecto);
+    se vuelve a leer solo si el archivo cambia
+    """
+    fecha = os.path.getmtime(TAXONOMIA_PATH) if os.path.exists(TAXONOMIA_PATH) else None
+    clave = (os.path.abspath(TAXONOMIA_PATH), fecha)
+    if _cache["clave"] != clave:
+        arbol = dict(TAXONOMIA_POR_DEFECTO)
+        if fecha is not None:
+            with open(TAXONOMIA_PATH, 'r') as file:
+                arbol.update(yaml.load(file, Loader=SafeLoader) or {})
+        _cache["clave"], _cache["taxonomia"] = clave, Taxonomia(_normalizar(arbol))
+    return _cache["taxonomia"]
+
+def _vacio(valor):
+    return valor is None or valor != valor or valor == ""
+
+class IndiceAgregados:
+    """
+    Totales acumulados por nodo del árbol (categoría, descripción, comercio) que se actualizan con cada
+    transacción; el desglose de un nodo es una consulta y no un groupby sobre todo el ledger
+    """
+    def __init__(self):
+        # {ruta: [importe total, número de transacciones]}; la raíz es la ruta vacía
+        self.totales = {(): [0.0, 0]}
+        self.hijos = {(): {}}
+
+    @staticmethod
+    def _ruta(transaccion):
+        ruta = []
+        for campo in ("category", "description", "merchant"):
+            valor = transaccion.get(campo)
+            if _vacio(valor):
+                break
+            ruta.append(valor)
+        return tuple(ruta)
+
+    def _acumular(self, ruta, importe, cantidad):
+        for nivel in range(len(ruta) + 1):
+            nodo = ruta[:nivel]
+            if nodo not in self.totales:
+                self.totales[nodo] = [0.0, 0]
+                self.hijos[nodo] = {}
+                self.hijos[nodo[:-1]][nodo[-1]] = None
+            total = self.totales[nodo]
+            total[0] += importe
+            total[1] += cantidad
+        # Los nodos que se quedan sin transacciones salen del árbol (de la hoja hacia arriba)
+        for nivel in range(len(ruta), 0, -1):
+            nodo = ruta[:nivel]
+            if self.totales[nodo][1] > 0:
+                break
+            del self.totales[nodo], self.hijos[nodo]
+            del self.hijos[nodo[:-1]][nodo[-1]]
+
+    def añadir(self, transaccion):
+        self._acumular(self._ruta(transaccion), float(transaccion["amount"]), 1)
+
+    def quitar(self, transaccion):
+        self._acumular(self._ruta(transaccion), -float(transaccion["amount"]), -1)
+
+    @classmethod
+    def desde_registros(cls, registros):
+        """
+        Construye el índice de un ledger completo con un único groupby por hoja del árbol
+        """
+        indice = cls()
+        df = pd.DataFrame(registros)
+        if df.empty or 'amount' not in df.columns:
+            return indice
+        df = df[df['amount'].notna()]
+        campos = [campo for campo in ("category", "description", "merchant") if campo in df.columns]
+        if not campos:
+            indice._acumular((), float(df['amount'].sum()), len(df))
+            return indice
+
+        hojas = df.groupby(campos, dropna=False, sort=False, observed=True)['amount'].agg(['sum', 'count'])
+        for clave, suma, cantidad in zip(hojas.index, hojas['sum'], hojas['count']):
+            clave = clave if isinstance(clave, tuple) else (clave,)
+            indice._acumular(cls._ruta(dict(zip(campos, clave))), float(suma), int(cantidad))
+        return indice
+
+    def total(self, *ruta):
+        return self.totales.get(tuple(ruta), [0.0, 0])[0]
+
+    def desglose(self, *ruta):
+        """
+        Totales de los hijos de un nodo: desglose() por categoría, desglose(categoría) por descripción...
+        """
+        return {hijo: self.totales[tuple(ruta) + (hijo,)][0] for hijo in self.hijos.get(tuple(ruta), {})}
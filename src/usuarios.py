@@ -2,7 +2,13 @@ import os
 import yaml
 import bcrypt
 from yaml.loader import SafeLoader
-import pandas as pd
+from carga_perezosa import importar_perezoso
+from metricas import REGISTRO
+
+pd = importar_perezoso("pandas")
+
+DURACION_HASH = REGISTRO.histograma("finansmart_bcrypt_hash_seconds", "Tiempo de bcrypt.hashpw al crear un usuario")
+USUARIOS_REGISTRADOS = REGISTRO.indicador("finansmart_users", "Usuarios registrados en config/config.yaml")
 
 def cargar_configuracion():
     """
@@ -16,7 +22,10 @@ def cargar_configuracion():
     
     # Cargar configuración existente
     with open(config_path, 'r') as file:
-        return yaml.load(file, Loader=SafeLoader)
+        config = yaml.load(file, Loader=SafeLoader)
+    if config and 'credentials' in config:
+        USUARIOS_REGISTRADOS.set(len(config['credentials']['usernames']))
+    return config
 
 def guardar_configuracion(config):
     """
@@ -38,7 +47,8 @@ def crear_usuario(username, name, email, password):
         return False, "El nombre de usuario ya existe"
     
     # Hashear la contraseña
-    hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    with DURACION_HASH.medir():
+        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
     
     # Agregar el nuevo usuario
     config['credentials']['usernames'][username] = {
@@ -107,5 +117,7 @@ def obtener_ruta_archivos_usuario(username):
     return {
         'incomes': os.path.join(user_data_path, 'incomes.csv'),
         'expenses': os.path.join(user_data_path, 'expenses.csv'),
-        'goals': os.path.join(user_data_path, 'goals.csv')
+        'goals': os.path.join(user_data_path, 'goals.csv'),
+        'recurring': os.path.join(user_data_path, 'recurring.csv'),
+        'budgets': os.path.join(user_data_path, 'budgets.csv')
     } 
\ No newline at end of file
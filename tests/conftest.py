@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de la aplicación se importan desde src, como al lanzarla con streamlit run o python src/...
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,16 @@
+import pytest
+
+from anomalias import DetectorAnomalias
+
+def gastos(previos):
+    normales = [{"amount": 10.0 + i % 3, "category": "Food", "date": f"2025-01-{i + 1:02d}"} for i in range(previos)]
+    return normales + [{"amount": 100.0, "category": "Food", "date": "2025-02-01"}]
+
+@pytest.mark.parametrize("previos, marcado", [(9, False), (10, True), (20, True)])
+def test_el_mismo_umbral_al_insertar_y_al_cargar(previos, marcado):
+    insertado = DetectorAnomalias(umbral_z=2.0, minimo=10)
+    for gasto in gastos(previos):
+        insertado.añadir(gasto)
+    cargado = DetectorAnomalias.desde_registros(gastos(previos), umbral_z=2.0, minimo=10)
+    assert [g["amount"] for g in insertado.sospechosas] == [g["amount"] for g in cargado.sospechosas] == \
+        ([100.0] if marcado else [])
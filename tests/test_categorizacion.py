@@ -0,0 +1,40 @@
+import io
+
+import pandas as pd
+
+from categorizacion import Categorizador
+
+REGLAS = [
+    {"type": "expense", "category": "Food", "description": "Groceries", "merchant": "Mercadona",
+     "keywords": ["MERCADONA"]},
+    {"type": "expense", "category": "Transportation", "regex": r"UBER\s+TRIP"},
+]
+
+def importar(texto, columna="description"):
+    # Como la importación de la app: el CSV por bloques y cada bloque categorizado
+    categorizador = Categorizador(REGLAS, columna)
+    return pd.concat([categorizador.categorizar_df(bloque, "expense")
+                      for bloque in pd.read_csv(io.StringIO(texto), chunksize=2)], ignore_index=True)
+
+def test_csv_con_columna_category_vacia():
+    df = importar("date,amount,description,category\n"
+                  "2025-01-01,10,MERCADONA 123,\n"
+                  "2025-01-02,5,UBER TRIP 77,\n"
+                  "2025-01-03,7,TRANSFER,\n")
+    assert df['category'].tolist() == ["Food", "Transportation", "Other"]
+    assert df['description'].tolist() == ["Groceries", "UBER TRIP 77", "TRANSFER"]
+    assert df.loc[0, 'merchant'] == "Mercadona"
+
+def test_csv_con_columnas_category_y_description_vacias():
+    df = importar("date,amount,concept,description,category\n"
+                  "2025-01-01,10,MERCADONA 123,,\n"
+                  "2025-01-02,5,UBER TRIP 77,,\n", columna="concept")
+    assert df['category'].tolist() == ["Food", "Transportation"]
+    # Sin descripción en la regla, el texto del concepto
+    assert df['description'].tolist() == ["Groceries", "UBER TRIP 77"]
+
+def test_las_filas_con_categoria_se_respetan():
+    df = importar("date,amount,description,category\n"
+                  "2025-01-01,10,MERCADONA 123,Shopping\n"
+                  "2025-01-02,5,UBER TRIP 77,\n")
+    assert df['category'].tolist() == ["Shopping", "Transportation"]
@@ -0,0 +1,26 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import benchmark_figuras
+from benchmark_figuras import figuras_vivas
+
+# Reruns de cada prueba: una fuga por rerun se ve en el recuento de figuras desde el primero
+RERUNS = 200
+
+def test_los_reruns_no_dejan_figuras_vivas():
+    antes = figuras_vivas()
+    for _ in range(RERUNS):
+        benchmark_figuras.rerun_figura()
+    assert figuras_vivas() == antes
+    assert plt.get_fignums() == []
+
+def test_el_recuento_detecta_la_fuga_de_pyplot():
+    antes = figuras_vivas()
+    try:
+        for _ in range(5):
+            benchmark_figuras.rerun_pyplot()
+        assert figuras_vivas() == antes + 5
+        assert len(plt.get_fignums()) == 5
+    finally:
+        plt.close("all")
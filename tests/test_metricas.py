@@ -0,0 +1,7 @@
+from benchmark_metricas import medir
+
+def test_las_metricas_cuestan_menos_del_1_por_ciento_de_una_peticion():
+    resultado = medir(filas=1000, peticiones=50)
+    assert resultado["scrapes"] > 0
+    assert resultado["exposition_ok"]
+    assert resultado["overhead"] < 0.01
@@ -0,0 +1,39 @@
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from main import Finance
+
+@pytest.fixture
+def finance(tmp_path, monkeypatch):
+    # Sin config/ ni datos del usuario: ajustes y taxonomía por defecto
+    monkeypatch.chdir(tmp_path)
+    finance = Finance(autoload=False)
+    # Un año de historia hasta hoy: la proyección y la simulación tienen meses con los que trabajar
+    meses = [(date.today().replace(day=1) - timedelta(days=30 * i)).strftime("%Y-%m-05") for i in range(12)]
+    finance.incomes = [{"amount": 3000.0, "description": "Salary", "category": "Salary", "date": mes} for mes in meses] + \
+                      [{"amount": 500.0, "description": "Savings", "category": "Savings", "date": mes} for mes in meses]
+    finance.expenses = [{"amount": 1200.0, "description": "Rent", "category": "Housing", "date": mes} for mes in meses]
+    limite = (date.today() + timedelta(days=3 * 365)).isoformat()
+    finance.goals = [
+        # Ya cumplida (6000 ahorrados), alcanzable con el flujo neto y sin fecha prevista
+        {"name": "Emergency fund", "category": "saving", "target_amount": 5000.0, "deadline": limite},
+        {"name": "Car", "category": "other", "target_amount": 20000.0, "deadline": limite},
+        {"name": "reduce_Food", "category": "expense_reduction", "target_amount": 300.0, "deadline": limite},
+    ]
+    return finance
+
+def nativos(valor):
+    if isinstance(valor, dict):
+        return all(nativos(v) for v in valor.values())
+    if isinstance(valor, list):
+        return all(nativos(v) for v in valor)
+    return not isinstance(valor, np.generic)
+
+def test_el_progreso_de_las_metas_se_serializa_a_json(finance):
+    progreso = finance.track_goals_progress()
+    assert nativos(progreso)
+    assert json.loads(json.dumps(progreso))[0]["name"] == "Emergency fund"
+    assert [meta["on_track"] for meta in progreso] == [True, True, None]
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from recurrentes import FRECUENCIAS, expandir, ocurrencias, siguiente
+
+def regla(inicio, frecuencia="Monthly", **campos):
+    return dict({"type": "expense", "amount": 900.0, "description": "Rent", "category": "Housing",
+                 "start": inicio, "rule": FRECUENCIAS[frecuencia]}, **campos)
+
+def dias(fechas):
+    return [fecha.strftime("%Y-%m-%d") for fecha in fechas]
+
+def test_mensual_desde_fin_de_mes_cae_el_ultimo_dia_de_los_meses_cortos():
+    fechas = ocurrencias(regla("2025-01-31"), datetime(2025, 7, 31))
+    assert dias(fechas) == ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30",
+                            "2025-05-31", "2025-06-30", "2025-07-31"]
+
+def test_mensual_desde_el_dia_30_vuelve_al_30_tras_febrero():
+    fechas = ocurrencias(regla("2024-01-30"), datetime(2024, 4, 30))
+    assert dias(fechas) == ["2024-01-30", "2024-02-29", "2024-03-30", "2024-04-30"]
+
+def test_mensual_hasta_dia_28_no_cambia():
+    fechas = ocurrencias(regla("2025-01-15"), datetime(2025, 3, 31))
+    assert dias(fechas) == ["2025-01-15", "2025-02-15", "2025-03-15"]
+
+def test_anual_desde_29_de_febrero_cae_el_28_los_anos_no_bisiestos():
+    fechas = ocurrencias(regla("2024-02-29", "Yearly"), datetime(2028, 12, 31))
+    assert dias(fechas) == ["2024-02-29", "2025-02-28", "2026-02-28", "2027-02-28", "2028-02-29"]
+
+def test_siguiente_y_expandir_usan_la_misma_regla():
+    alquiler = regla("2025-01-31")
+    assert siguiente(alquiler, datetime(2025, 2, 1)) == datetime(2025, 2, 28)
+    tabla = expandir([alquiler], "expense", datetime(2025, 4, 30))
+    assert tabla["date"].tolist() == ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30"]